@@ -25,6 +25,9 @@ class BaseAgent(abc.ABC):
         self.index = index
         self.kwargs = kwargs
 
+        # How long (in seconds) a move may take before the game warns about it (if known).
+        self._moveWarningTime = None
+
     @abc.abstractmethod
     def getAction(self, state):
         """
@@ -34,6 +37,14 @@ class BaseAgent(abc.ABC):
 
         pass
 
+    def getMoveWarningTime(self):
+        """
+        Get the time (in seconds) a move may take before the game warns about it,
+        or None if the game did not say.
+        """
+
+        return self._moveWarningTime
+
     def registerInitialState(self, state):
         """
         Inspect the starting state.
@@ -41,6 +52,14 @@ class BaseAgent(abc.ABC):
 
         pass
 
+    def setMoveWarningTime(self, seconds):
+        """
+        Called by the game (before `BaseAgent.registerInitialState`) with the time a move may take
+        before the game warns about it.
+        """
+
+        self._moveWarningTime = seconds
+
     def observationFunction(self, state):
         """
         Make an observation on the state of the game.
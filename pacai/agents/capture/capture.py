@@ -13,7 +13,7 @@ class CaptureAgent(BaseAgent):
     and implement `CaptureAgent.chooseAction`.
     """
 
-    def __init__(self, index, timeForComputing = 0.1, **kwargs):
+    def __init__(self, index, timeForComputing = 0.1, lazyDistances = False, **kwargs):
         super().__init__(index, **kwargs)
 
         # Whether or not you're on the red team
@@ -31,6 +31,10 @@ class CaptureAgent(BaseAgent):
         # Time to spend each turn on computing maze distances
         self.timeForComputing = timeForComputing
 
+        # Compute maze distances from a position only when it is first queried
+        # (see `pacai.core.distanceCalculator.Distancer`).
+        self.lazyDistances = lazyDistances
+
     def registerInitialState(self, gameState):
         """
         This method handles the initial setup of the agent and populates useful fields,
@@ -38,7 +42,8 @@ class CaptureAgent(BaseAgent):
         """
 
         self.red = gameState.isOnRedTeam(self.index)
-        self.distancer = distanceCalculator.Distancer(gameState.getInitialLayout())
+        self.distancer = distanceCalculator.Distancer(gameState.getInitialLayout(),
+                lazy = self.lazyDistances)
 
         self.distancer.getMazeDistances()
 
@@ -95,6 +100,17 @@ class CaptureAgent(BaseAgent):
         else:
             return gameState.getRedFood()
 
+    def getFoodList(self, gameState):
+        """
+        Returns a list of positions (x, y) of the food you're meant to eat.
+        This is not a copy, so do not modify it.
+        """
+
+        if (self.red):
+            return gameState.getBlueFoodList()
+        else:
+            return gameState.getRedFoodList()
+
     def getFoodYouAreDefending(self, gameState):
         """
         Returns the food you're meant to protect (i.e., that your opponent is supposed to eat).
@@ -160,6 +176,31 @@ class CaptureAgent(BaseAgent):
 
         return self.distancer.getDistance(pos1, pos2)
 
+    def getMazeDistancesTo(self, pos, targets):
+        """
+        Returns the distances from a point to each of the targets as a NumPy array,
+        see `pacai.core.distanceCalculator.Distancer.getDistancesTo`.
+        """
+
+        return self.distancer.getDistancesTo(pos, targets)
+
+    def getKNearestMazeTargets(self, pos, targets, k):
+        """
+        Returns the (at most) k targets closest to a point (nearest first)
+        and a NumPy array of their distances,
+        see `pacai.core.distanceCalculator.Distancer.getKNearestTargets`.
+        """
+
+        return self.distancer.getKNearestTargets(pos, targets, k)
+
+    def getNearestMazeTarget(self, pos, targets):
+        """
+        Returns the target closest to a point and its distance,
+        see `pacai.core.distanceCalculator.Distancer.getNearestTarget`.
+        """
+
+        return self.distancer.getNearestTarget(pos, targets)
+
     def getPreviousObservation(self):
         """
         Returns the `pacai.core.gamestate.AbstractGameState` object corresponding to
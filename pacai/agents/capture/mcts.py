@@ -0,0 +1,134 @@
+import logging
+
+from pacai.agents.capture.capture import CaptureAgent
+from pacai.core import distanceCalculator
+from pacai.core.adversarial import mcts
+from pacai.util import reflection
+
+# The part of the game's move warning time that a search may use.
+DEFAULT_TIME_FRACTION = 0.5
+
+# The time (in seconds) a move may search for if the game did not give a move warning time.
+DEFAULT_MOVE_TIME = 0.5
+
+# How much each step closer to the food a team is attacking is worth (in points).
+DISTANCE_WEIGHT = 0.05
+
+class TeamEvaluation(object):
+    """
+    Evaluates capture states for one team:
+    the score (from the team's side) minus a little for how far its agents are from the food
+    they are attacking.
+    """
+
+    def __init__(self, red):
+        self.red = red
+
+    def __call__(self, state):
+        if (self.red):
+            score = state.getScore()
+            team = state.getRedTeamIndices()
+            food = state.getBlueFoodList()
+        else:
+            score = -state.getScore()
+            team = state.getBlueTeamIndices()
+            food = state.getRedFoodList()
+
+        if (len(food) == 0):
+            return score
+
+        table = distanceCalculator.getDistances(state.getInitialLayout())
+        for agentIndex in team:
+            distances = table.getDistancesFrom(state.getAgentPosition(agentIndex), food)
+            if (distances is not None):
+                score -= DISTANCE_WEIGHT * distances.min()
+
+        return score
+
+class MCTSCaptureAgent(CaptureAgent):
+    """
+    A capture agent that picks moves with Monte Carlo Tree Search
+    (see `pacai.core.adversarial.mcts`), keeping its tree between turns.
+
+    Each move may take `timeFraction` of the game's move warning time,
+    or `moveTime` seconds if that is given.
+    `rollout` is the qualified name of a rollout policy
+    (by default, `pacai.core.adversarial.mcts.randomRollout`).
+    With `numWorkers` above 0, that many worker processes search alongside this one
+    (root parallelism).
+    """
+
+    def __init__(self, index, moveTime = None, timeFraction = DEFAULT_TIME_FRACTION,
+            rollout = None, numWorkers = 0, exploration = mcts.DEFAULT_EXPLORATION,
+            rolloutDepth = mcts.DEFAULT_ROLLOUT_DEPTH, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self.moveTime = None if (moveTime is None) else float(moveTime)
+        self.timeFraction = float(timeFraction)
+        self.rollout = None if (rollout is None) else reflection.qualifiedImport(rollout)
+        self.numWorkers = int(numWorkers)
+        self.exploration = float(exploration)
+        self.rolloutDepth = int(rolloutDepth)
+
+        self._engine = None
+        self._parallel = None
+
+    def chooseAction(self, gameState):
+        timeLimit = self.getTimeLimit()
+
+        if (self._parallel is not None):
+            action = self._parallel.search(gameState, self.index, timeLimit)
+            stats = self._parallel.getStats()
+        else:
+            action = self._engine.search(gameState, self.index, timeLimit = timeLimit)
+            stats = self._engine.getStats()
+
+        logging.debug('[MCTSCaptureAgent] %d: %s' % (self.index, stats))
+
+        if (action is None):
+            return gameState.getLegalActions(self.index)[0]
+
+        return action
+
+    def final(self, gameState):
+        super().final(gameState)
+
+        if (self._parallel is not None):
+            self._parallel.shutdown()
+            self._parallel = None
+
+    def getStats(self):
+        """
+        Get the stats of the last search
+        (iterations, iterationsPerSecond, treeSize, reuseRatio, and seconds,
+        plus workers, totalIterations, and totalIterationsPerSecond with root parallelism).
+        """
+
+        if (self._parallel is not None):
+            return self._parallel.getStats()
+
+        return self._engine.getStats()
+
+    def getTimeLimit(self):
+        """
+        Get the time (in seconds) a single move may search for.
+        """
+
+        if (self.moveTime is not None):
+            return self.moveTime
+
+        if (self.getMoveWarningTime() is None):
+            return DEFAULT_MOVE_TIME
+
+        return self.getMoveWarningTime() * self.timeFraction
+
+    def registerInitialState(self, gameState):
+        super().registerInitialState(gameState)
+
+        self._engine = mcts.MCTSEngine(TeamEvaluation(self.red), self.getTeam(gameState),
+                rolloutPolicy = self.rollout, exploration = self.exploration,
+                rolloutDepth = self.rolloutDepth)
+
+        if (self.numWorkers > 0):
+            self._parallel = mcts.ParallelMCTS(self._engine, self.numWorkers)
+            self._parallel.start()
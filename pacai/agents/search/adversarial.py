@@ -0,0 +1,145 @@
+import logging
+
+from pacai.agents.base import BaseAgent
+from pacai.agents.search.multiagent import MultiAgentSearchAgent
+from pacai.core.adversarial.alphabeta import AlphaBetaEngine
+from pacai.core.adversarial.alphabeta import DEFAULT_TABLE_SIZE
+from pacai.core.adversarial.expectimax import ExpectimaxEngine
+from pacai.core.adversarial.parallel import ParallelAlphaBeta
+
+# The part of the game's move warning time that a search may use.
+DEFAULT_TIME_FRACTION = 0.5
+
+class CachedExpectimaxAgent(MultiAgentSearchAgent):
+    """
+    An agent that picks moves with `pacai.core.adversarial.expectimax.ExpectimaxEngine`.
+
+    `ghost` is the name of the ghost agent used to model every ghost
+    (e.g. `DirectionalGhost`), or `uniform` for ghosts that move uniformly at random.
+    `topK` limits how many of each ghost's moves are searched
+    (fewer is faster but less accurate), by default all of them are.
+    """
+
+    def __init__(self, index, ghost = 'uniform', topK = None, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self.ghost = ghost
+        self.topK = None if (topK is None) else int(topK)
+
+        self._engine = None
+
+    def getAction(self, state):
+        action = self._engine.search(state, self.index)
+        logging.debug('[CachedExpectimaxAgent] %s' % (self._engine.getStats()))
+
+        return action
+
+    def getEngine(self):
+        return self._engine
+
+    def registerInitialState(self, state):
+        ghostModels = {}
+        if (self.ghost != 'uniform'):
+            for ghostIndex in range(1, state.getNumAgents()):
+                ghostModels[ghostIndex] = BaseAgent.loadAgent(self.ghost, ghostIndex)
+
+        self._engine = ExpectimaxEngine(self.getEvaluationFunction(),
+                maxDepth = self.getTreeDepth(), ghostModels = ghostModels, topK = self.topK)
+
+class IterativeDeepeningAlphaBetaAgent(MultiAgentSearchAgent):
+    """
+    An agent that picks moves with `pacai.core.adversarial.alphabeta.AlphaBetaEngine`,
+    deepening up to `pacai.agents.search.multiagent.MultiAgentSearchAgent.getTreeDepth`.
+
+    Each move may take `timeFraction` of the game's move warning time
+    (see `pacai.agents.base.BaseAgent.getMoveWarningTime`),
+    or `moveTime` seconds if that is given.
+    Without either, every move is searched to the full depth.
+    """
+
+    def __init__(self, index, moveTime = None, timeFraction = DEFAULT_TIME_FRACTION,
+            tableSize = DEFAULT_TABLE_SIZE, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self.moveTime = None if (moveTime is None) else float(moveTime)
+        self.timeFraction = float(timeFraction)
+
+        self._engine = AlphaBetaEngine(self.getEvaluationFunction(), maximizers = [self.index],
+                maxDepth = self.getTreeDepth(), tableSize = int(tableSize))
+
+    def getAction(self, state):
+        action = self._engine.search(state, self.index, timeLimit = self.getTimeLimit())
+        logging.debug('[IterativeDeepeningAlphaBetaAgent] %s' % (self._engine.getStats()))
+
+        return action
+
+    def getEngine(self):
+        return self._engine
+
+    def getTimeLimit(self):
+        """
+        Get the time (in seconds) a single move may search for, or None if there is no limit.
+        """
+
+        if (self.moveTime is not None):
+            return self.moveTime
+
+        if (self.getMoveWarningTime() is None):
+            return None
+
+        return self.getMoveWarningTime() * self.timeFraction
+
+class ParallelAlphaBetaAgent(MultiAgentSearchAgent):
+    """
+    An agent that picks moves with `pacai.core.adversarial.parallel.ParallelAlphaBeta`,
+    searching the root's moves in `numWorkers` worker processes
+    (by default, one per CPU).
+    Every move is searched to the full depth,
+    and picks the same move a sequential search to that depth would.
+
+    With `compare` set, every move is also searched sequentially,
+    so the measured speedup (sequential time over parallel time) gets logged.
+    """
+
+    def __init__(self, index, numWorkers = None, tableSize = DEFAULT_TABLE_SIZE,
+            compare = False, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self.numWorkers = None if (numWorkers is None) else int(numWorkers)
+        self.compare = (str(compare).lower() == 'true')
+
+        self._search = ParallelAlphaBeta(self.getEvaluationFunction(), maximizers = [self.index],
+                maxDepth = self.getTreeDepth(), numWorkers = self.numWorkers,
+                tableSize = int(tableSize))
+
+        self._sequential = None
+        if (self.compare):
+            self._sequential = AlphaBetaEngine(self.getEvaluationFunction(),
+                    maximizers = [self.index], maxDepth = self.getTreeDepth(),
+                    tableSize = int(tableSize))
+
+    def final(self, state):
+        super().final(state)
+        self._search.shutdown()
+
+    def getAction(self, state):
+        action = self._search.search(state, self.index)
+        stats = self._search.getStats()
+
+        if (self._sequential is not None):
+            sequentialAction = self._sequential.search(state, self.index)
+            sequentialSeconds = self._sequential.getStats()['seconds']
+
+            stats['sequentialSeconds'] = sequentialSeconds
+            stats['speedup'] = sequentialSeconds / max(stats.get('seconds', 0.0), 1e-9)
+
+            if (sequentialAction != action):
+                logging.warning('[ParallelAlphaBetaAgent] Picked %s, but sequential picked %s.'
+                        % (action, sequentialAction))
+
+        logging.debug('[ParallelAlphaBetaAgent] %s' % (stats))
+
+        return action
+
+    def getSearch(self):
+        return self._search
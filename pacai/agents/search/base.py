@@ -5,12 +5,19 @@ from typing import Callable, Union
 from pacai.agents.base import BaseAgent
 from pacai.core.directions import Directions
 from pacai.core.gamestate import AbstractGameState
+from pacai.core.search import engine
 from pacai.core.search.heuristic import null as nullHeuristic
 from pacai.core.search.position import PositionSearchProblem
 from pacai.core.search.problem import SearchProblem
 from pacai.student.search import depthFirstSearch
 from pacai.util import reflection
 
+# The searches in `pacai.core.search.engine` that can be picked by their bare name.
+# `pacai.core.search.engine.bestFirstSearch` is left out, since it needs a priority function.
+ENGINE_FUNCTIONS = ('astar', 'bfs', 'greedy', 'ucs', 'wastar',
+        'aStarSearch', 'breadthFirstSearch', 'greedySearch', 'uniformCostSearch',
+        'weightedAStarSearch')
+
 class SearchAgent(BaseAgent):
     """
     A general search agent that finds a path using a supplied search algorithm for a
@@ -19,12 +26,18 @@ class SearchAgent(BaseAgent):
 
     As a default, this agent runs `pacai.student.search.depthFirstSearch` on a
     `pacai.core.search.position.PositionSearchProblem` to find location (1, 1).
+
+    `fn` may be a fully qualified name, or just the name of a search in
+    `pacai.core.search.engine` (e.g. `fn=astar`).
+    A `weight` (for weighted A*) and `trackMemory` are passed on to searches that take them
+    (e.g. `fn=wastar,weight=1.5,trackMemory=true`).
     """
 
     def __init__(self, index,
             fn: Union[str, Callable[[SearchProblem], any]] = depthFirstSearch,
             prob: Union[str, Callable[[AbstractGameState], SearchProblem]] = PositionSearchProblem,
             heuristic: Union[str, Callable] = nullHeuristic,
+            weight = None, trackMemory = False,
             **kwargs):
         super().__init__(index, **kwargs)
 
@@ -36,9 +49,16 @@ class SearchAgent(BaseAgent):
             self.searchType = prob
         logging.info('[SearchAgent] using problem type %s.' % (self.searchType))
 
+        searchOptions = {}
+        if (weight is not None):
+            searchOptions['weight'] = float(weight)
+
+        if (str(trackMemory).lower() in ('true', '1')):
+            searchOptions['trackMemory'] = True
+
         if isinstance(fn, str):
-            # Get the search function from the name and heuristic.
-            self.searchFunction = self._fetchSearchFunction(fn, heuristic)
+            # Get the search function from the name, heuristic, and other options.
+            self.searchFunction = self._fetchSearchFunction(fn, heuristic, searchOptions)
         else:
             # Use provided search function and ignore heuristic.
             self.searchFunction = fn
@@ -65,9 +85,14 @@ class SearchAgent(BaseAgent):
         starttime = time.time()
         problem = self.searchType(state)  # Makes a new search problem.
 
-        self._actions = self.searchFunction(problem)  # Find a path.
+        # Find a path (and turn it into per-step actions).
+        self._actions = problem.expandActions(self.searchFunction(problem))
         self._actionIndex = 0
 
+        if (self._actions is None):
+            logging.warning('No path found.')
+            self._actions = []
+
         totalCost = problem.actionsCost(self._actions)
 
         state.setHighlightLocations(problem.getVisitHistory())
@@ -77,6 +102,9 @@ class SearchAgent(BaseAgent):
 
         logging.info('Search nodes expanded: %d' % problem.getExpandedCount())
 
+        if (problem.getSearchStats() is not None):
+            logging.info(str(problem.getSearchStats()))
+
     def getAction(self, state):
         """
         Returns the next action in the path chosen earlier (in registerInitialState).
@@ -91,20 +119,36 @@ class SearchAgent(BaseAgent):
 
         return action
 
-    def _fetchSearchFunction(self, functionName: str, heuristic: Union[str, Callable]):
+    def _fetchSearchFunction(self, functionName: str, heuristic: Union[str, Callable],
+            searchOptions = {}):
         """
         Get the specified search function by name.
         If that function also takes a heurisitc (i.e. has a parameter called "heuristic"),
         then return a lambda that binds the heuristic to the function.
+        Any search options (e.g. "weight") are bound the same way,
+        and must be taken by the function.
         """
 
         # Locate the function.
-        function = reflection.qualifiedImport(functionName)
+        if ('.' not in functionName):
+            if (functionName not in ENGINE_FUNCTIONS):
+                raise ValueError('Unknown search engine function: %s.' % (functionName))
+
+            function = getattr(engine, functionName)
+        else:
+            function = reflection.qualifiedImport(functionName)
+
+        for option in searchOptions:
+            if (option not in function.__code__.co_varnames):
+                raise ValueError('Search function %s does not take %s.' % (functionName, option))
 
         # Check if the function has a heuristic.
         if 'heuristic' not in function.__code__.co_varnames:
             logging.info('[SearchAgent] using function %s.' % (functionName))
-            return function
+            if (len(searchOptions) == 0):
+                return function
+
+            return lambda x: function(x, **searchOptions)
 
         if isinstance(heuristic, str):
             # Fetch the heuristic.
@@ -113,4 +157,4 @@ class SearchAgent(BaseAgent):
                 (functionName, heuristic))
 
         # Bind the heuristic.
-        return lambda x: function(x, heuristic = heuristic)
+        return lambda x: function(x, heuristic = heuristic, **searchOptions)
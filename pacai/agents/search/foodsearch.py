@@ -1,5 +1,8 @@
+import logging
+
 from pacai.agents.search.base import SearchAgent
 from pacai.core.search import search
+from pacai.core.search import tour
 from pacai.core.search.food import FoodSearchProblem
 from pacai.student import searchAgents
 
@@ -14,3 +17,29 @@ class AStarFoodSearchAgent(SearchAgent):
                          fn = lambda prob: search.astar(prob, searchAgents.foodHeuristic),
                          prob = FoodSearchProblem,
                          **kwargs)
+
+class TourFoodSearchAgent(SearchAgent):
+    """
+    An agent that eats all the food by following a tour (see `pacai.core.search.tour`),
+    which is exact (shortest) when there are at most `maxExactFood` pellets.
+    """
+
+    def __init__(self, index, maxExactFood = tour.DEFAULT_MAX_EXACT_TARGETS, **kwargs):
+        super().__init__(index, **kwargs)
+
+        self.maxExactFood = int(maxExactFood)
+
+    # Override
+    def registerInitialState(self, state):
+        foodTour = tour.solveTour(state.getInitialLayout(), state.getPacmanPosition(),
+                state.getFoodList(), maxExactTargets = self.maxExactFood)
+
+        self._actionIndex = 0
+        if (foodTour is None):
+            logging.warning('Some food cannot be reached.')
+            self._actions = []
+            return
+
+        self._actions = foodTour.actions
+        logging.info('Tour found with total cost of %d (exact: %s).'
+                % (foodTour.cost, foodTour.isExact))
@@ -5,6 +5,7 @@ On your side of the map, you are a ghost and can eat pacmen.
 On your opponents side of the map, you are a pacman and can eat food and capsules.
 """
 
+import bisect
 import logging
 import os
 import pickle
@@ -19,6 +20,7 @@ from pacai.core.distance import manhattan
 from pacai.core.game import Game
 from pacai.core.gamestate import AbstractGameState
 from pacai.core.grid import Grid
+from pacai.core.grid import GridView
 from pacai.core.layout import Layout
 from pacai.core.layout import getLayout
 from pacai.ui.capture.null import CaptureNullView
@@ -43,6 +45,13 @@ class CaptureGameState(AbstractGameState):
     A game state specific to capture.
     """
 
+    _MOVE_FIELDS = AbstractGameState._MOVE_FIELDS + ('_timeleft',
+            '_redFood', '_blueFood', '_redFoodList', '_blueFoodList',
+            '_redCapsules', '_blueCapsules')
+
+    _FOOD_FIELDS = AbstractGameState._FOOD_FIELDS + ('_redFood', '_blueFood',
+            '_redFoodList', '_blueFoodList')
+
     def __init__(self, layout, timeleft):
         super().__init__(layout)
 
@@ -81,15 +90,17 @@ class CaptureGameState(AbstractGameState):
         self._redFood = Grid(self._food.getWidth(), self._food.getHeight(), initialValue = False)
         self._blueFood = Grid(self._food.getWidth(), self._food.getHeight(), initialValue = False)
 
-        for x in range(self._food.getWidth()):
-            for y in range(self._food.getHeight()):
-                if (not self._food[x][y]):
-                    continue
+        # Like the full food list, these are kept sorted.
+        self._redFoodList = []
+        self._blueFoodList = []
 
-                if (self.isOnRedSide((x, y))):
-                    self._redFood[x][y] = True
-                else:
-                    self._blueFood[x][y] = True
+        for (x, y) in self._foodList:
+            if (self.isOnRedSide((x, y))):
+                self._redFood.set(x, y, True)
+                self._redFoodList.append((x, y))
+            else:
+                self._blueFood.set(x, y, True)
+                self._blueFoodList.append((x, y))
 
     # Override
     def generateSuccessor(self, agentIndex, action):
@@ -124,16 +135,16 @@ class CaptureGameState(AbstractGameState):
 
     # Override
     def eatFood(self, x, y):
-        if (not self._foodCopied):
-            self._redFood = self._redFood.copy()
-            self._blueFood = self._blueFood.copy()
-
         super().eatFood(x, y)
 
         if (self.isOnRedSide((x, y))):
-            self._redFood[x][y] = False
+            self._redFood.set(x, y, False)
+            foodList = self._redFoodList
         else:
-            self._blueFood[x][y] = False
+            self._blueFood.set(x, y, False)
+            foodList = self._blueFoodList
+
+        del foodList[bisect.bisect_left(foodList, (x, y))]
 
     def getBlueCapsules(self):
         """
@@ -148,10 +159,20 @@ class CaptureGameState(AbstractGameState):
         Returns a grid of food that corresponds to the food on the blue team's side.
         For the grid g, g[x][y] = True if there is food in (x, y) that belongs to
         blue (meaning blue is protecting it, red is trying to eat it).
-        The caller should not modify the grid.
+        The grid is a read-only `pacai.core.grid.GridView`.
+        """
+
+        self._foodCopied = False
+        return GridView(self._blueFood)
+
+    def getBlueFoodList(self):
+        """
+        Returns a list of positions (x, y) of the food on the blue team's side,
+        in the same order as `pacai.core.grid.Grid.asList`.
+        The caller should not modify the list.
         """
 
-        return self._blueFood
+        return self._blueFoodList
 
     def getBlueTeamIndices(self):
         """
@@ -174,10 +195,20 @@ class CaptureGameState(AbstractGameState):
         Returns a grid of food that corresponds to the food on the red team's side.
         For the grid g, g[x][y] = True if there is food in (x, y) that belongs to
         red (meaning red is protecting it, blue is trying to eat it).
-        The caller should not modify the grid.
+        The grid is a read-only `pacai.core.grid.GridView`.
+        """
+
+        self._foodCopied = False
+        return GridView(self._redFood)
+
+    def getRedFoodList(self):
+        """
+        Returns a list of positions (x, y) of the food on the red team's side,
+        in the same order as `pacai.core.grid.Grid.asList`.
+        The caller should not modify the list.
         """
 
-        return self._redFood
+        return self._redFoodList
 
     def getRedTeamIndices(self):
         """
@@ -224,15 +255,37 @@ class CaptureGameState(AbstractGameState):
 
         return self._teams[agentIndex]
 
-    def _applySuccessorAction(self, agentIndex, action):
+    # Override
+    def _copyFood(self):
+        super()._copyFood()
+
+        self._redFood = self._redFood.copy()
+        self._blueFood = self._blueFood.copy()
+        self._redFoodList = self._redFoodList.copy()
+        self._blueFoodList = self._blueFoodList.copy()
+
+    # Override
+    def _restoreFood(self, x, y):
+        super()._restoreFood(x, y)
+
+        if (self.isOnRedSide((x, y))):
+            self._redFood.set(x, y, True)
+            bisect.insort(self._redFoodList, (x, y))
+        else:
+            self._blueFood.set(x, y, True)
+            bisect.insort(self._blueFoodList, (x, y))
+
+    # Override
+    def _applySuccessorAction(self, agentIndex, action, validate = True, checkCollisions = True):
         """
         Apply the action to the context state (self).
         """
 
         # Find appropriate rules for the agent.
-        AgentRules.applyAction(self, action, agentIndex)
-        AgentRules.checkDeath(self, agentIndex)
-        AgentRules.decrementTimer(self.getAgentState(agentIndex))
+        AgentRules.applyAction(self, action, agentIndex, validate = validate)
+        if (checkCollisions):
+            AgentRules.checkDeath(self, agentIndex)
+        AgentRules.decrementTimer(self.editAgentState(agentIndex))
 
         # Book keeping.
         self._lastAgentMoved = agentIndex
@@ -240,6 +293,24 @@ class CaptureGameState(AbstractGameState):
 
         self._hash = None
 
+    # Override
+    def _canCollide(self, agentIndex):
+        # Agents can only collide with the other team, and a move covers at most one unit.
+        reach = AgentRules.AGENT_SPEED + COLLISION_TOLERANCE
+        position = self._agentStates[agentIndex].getPosition()
+
+        if (self.isOnRedTeam(agentIndex)):
+            otherTeam = self._blueTeam
+        else:
+            otherTeam = self._redTeam
+
+        for otherIndex in otherTeam:
+            otherPosition = self._agentStates[otherIndex].getPosition()
+            if (otherPosition is not None and manhattan(position, otherPosition) <= reach):
+                return True
+
+        return False
+
 class CaptureRules:
     """
     These game rules manage the control flow of a game, deciding when
@@ -255,8 +326,8 @@ class CaptureRules:
         game.state = initState
         game.length = length
 
-        self._totalBlueFood = initState.getBlueFood().count()
-        self._totalRedFood = initState.getRedFood().count()
+        self._totalBlueFood = len(initState.getBlueFoodList())
+        self._totalRedFood = len(initState.getRedFoodList())
 
         return game
 
@@ -279,10 +350,10 @@ class CaptureRules:
         redWin = False
         blueWin = False
 
-        if (state.getRedFood().count() <= MIN_FOOD):
+        if (len(state.getRedFoodList()) <= MIN_FOOD):
             logging.info("The Blue team ate all but %d of the opponents' dots." % MIN_FOOD)
             blueWin = True
-        elif (state.getBlueFood().count() <= MIN_FOOD):
+        elif (len(state.getBlueFoodList()) <= MIN_FOOD):
             logging.info("The Red team ate all but %d of the opponents' dots." % MIN_FOOD)
             redWin = True
         else:
@@ -342,20 +413,20 @@ class AgentRules:
         """
 
         agentState = state.getAgentState(agentIndex)
-        return Actions.getPossibleActions(agentState.getPosition(), agentState.getDirection(),
-                state.getWalls())
+        return state.getInitialLayout().getMoveTable().getPossibleActions(
+                agentState.getPosition(), agentState.getDirection())
 
     @staticmethod
-    def applyAction(state, action, agentIndex):
+    def applyAction(state, action, agentIndex, validate = True):
         """
         Edits the state to reflect the results of the action.
+        Without `validate`, the action is assumed to be legal.
         """
 
-        legal = AgentRules.getLegalActions(state, agentIndex)
-        if (action not in legal):
+        if (validate and action not in AgentRules.getLegalActions(state, agentIndex)):
             raise ValueError('Illegal action: ' + str(action))
 
-        agentState = state.getAgentState(agentIndex)
+        agentState = state.editAgentState(agentIndex)
 
         # Update position.
         vector = Actions.directionToVector(action, AgentRules.AGENT_SPEED)
@@ -392,8 +463,8 @@ class AgentRules:
             else:
                 state.addScore(-FOOD_POINTS)
 
-            if ((isRed and state.getBlueFood().count() <= MIN_FOOD)
-                    or (not isRed and state.getRedFood().count() <= MIN_FOOD)):
+            if ((isRed and len(state.getBlueFoodList()) <= MIN_FOOD)
+                    or (not isRed and len(state.getRedFoodList()) <= MIN_FOOD)):
                 state.endGame(True)
 
             return
@@ -414,7 +485,7 @@ class AgentRules:
                 otherTeam = state.getRedTeamIndices()
 
             for agentIndex in otherTeam:
-                state.getAgentState(agentIndex).setScaredTimer(SCARED_TIME)
+                state.editAgentState(agentIndex).setScaredTimer(SCARED_TIME)
 
     @staticmethod
     def decrementTimer(agentState):
@@ -455,10 +526,10 @@ class AgentRules:
             # Otherwise, we are being eatten.
             if (agentState.isBraveGhost() or otherAgentState.isScaredGhost()):
                 state.addScore(teamPointModifier * KILL_POINTS)
-                otherAgentState.respawn()
+                state.editAgentState(otherAgentIndex).respawn()
             else:
                 state.addScore(teamPointModifier * -KILL_POINTS)
-                agentState.respawn()
+                state.editAgentState(agentIndex).respawn()
 
 #############################
 # FRAMEWORK TO START A GAME #
@@ -18,7 +18,6 @@ from pacai.agents.ghost.random import RandomGhost
 from pacai.agents.greedy import GreedyAgent
 from pacai.bin.arguments import getParser
 from pacai.core.actions import Actions
-from pacai.core.directions import Directions
 from pacai.core.distance import manhattan
 from pacai.core.game import Game
 from pacai.core.gamestate import AbstractGameState
@@ -118,32 +117,51 @@ class PacmanGameState(AbstractGameState):
 
         return self._agentStates[PACMAN_AGENT_INDEX]
 
-    def _applySuccessorAction(self, agentIndex, action):
+    # Override
+    def _applySuccessorAction(self, agentIndex, action, validate = True, checkCollisions = True):
         """
         Apply the action to the context state (self).
         """
 
         # Let the agent's logic deal with its action's effects on the board.
         if (agentIndex == PACMAN_AGENT_INDEX):
-            PacmanRules.applyAction(self, action)
+            PacmanRules.applyAction(self, action, validate = validate)
         else:
-            GhostRules.applyAction(self, action, agentIndex)
+            GhostRules.applyAction(self, action, agentIndex, validate = validate)
 
         # Time passes.
         if (agentIndex == PACMAN_AGENT_INDEX):
             # Penalty for waiting around.
             self.addScore(-TIME_PENALTY)
         else:
-            GhostRules.decrementTimer(self.getAgentState(agentIndex))
+            GhostRules.decrementTimer(self.editAgentState(agentIndex))
 
         # Resolve multi-agent effects.
-        GhostRules.checkDeath(self, agentIndex)
+        if (checkCollisions):
+            GhostRules.checkDeath(self, agentIndex)
 
         # Book keeping.
         self._lastAgentMoved = agentIndex
 
         self._hash = None
 
+    # Override
+    def _canCollide(self, agentIndex):
+        # Pacman can only collide with ghosts, and a move covers at most one unit.
+        reach = max(PacmanRules.PACMAN_SPEED, GhostRules.GHOST_SPEED) + COLLISION_TOLERANCE
+        pacmanPosition = self.getPacmanPosition()
+
+        if (agentIndex == PACMAN_AGENT_INDEX):
+            ghostIndexes = self.getGhostIndexes()
+        else:
+            ghostIndexes = [agentIndex]
+
+        for ghostIndex in ghostIndexes:
+            if (manhattan(pacmanPosition, self._agentStates[ghostIndex].getPosition()) <= reach):
+                return True
+
+        return False
+
 class ClassicGameRules(object):
     """
     These game rules manage the control flow of a game, deciding when
@@ -217,20 +235,20 @@ class PacmanRules:
         """
 
         agentState = state.getPacmanState()
-        return Actions.getPossibleActions(agentState.getPosition(), agentState.getDirection(),
-                state.getWalls())
+        return state.getInitialLayout().getMoveTable().getPossibleActions(
+                agentState.getPosition(), agentState.getDirection())
 
     @staticmethod
-    def applyAction(state, action):
+    def applyAction(state, action, validate = True):
         """
         Edits the state to reflect the results of the action.
+        Without `validate`, the action is assumed to be legal.
         """
 
-        legal = PacmanRules.getLegalActions(state)
-        if (action not in legal):
+        if (validate and action not in PacmanRules.getLegalActions(state)):
             raise ValueError('Illegal pacman action: ' + str(action))
 
-        pacmanState = state.getPacmanState()
+        pacmanState = state.editAgentState(PACMAN_AGENT_INDEX)
 
         # Update position.
         vector = Actions.directionToVector(action, PacmanRules.PACMAN_SPEED)
@@ -260,8 +278,8 @@ class PacmanRules:
             state.eatCapsule(x, y)
 
             # Reset all ghosts' scared timers.
-            for ghostState in state.getGhostStates():
-                ghostState.setScaredTimer(SCARED_TIME)
+            for index in state.getGhostIndexes():
+                state.editAgentState(index).setScaredTimer(SCARED_TIME)
 
 class GhostRules:
     """
@@ -278,25 +296,15 @@ class GhostRules:
         """
 
         agentState = state.getGhostState(ghostIndex)
-        possibleActions = Actions.getPossibleActions(agentState.getPosition(),
-                agentState.getDirection(), state.getWalls())
-        reverse = Actions.reverseDirection(agentState.getDirection())
-
-        if (Directions.STOP in possibleActions):
-            possibleActions.remove(Directions.STOP)
-
-        if (reverse in possibleActions and len(possibleActions) > 1):
-            possibleActions.remove(reverse)
-
-        return possibleActions
+        return state.getInitialLayout().getMoveTable().getGhostActions(
+                agentState.getPosition(), agentState.getDirection())
 
     @staticmethod
-    def applyAction(state, action, ghostIndex):
-        legal = GhostRules.getLegalActions(state, ghostIndex)
-        if (action not in legal):
+    def applyAction(state, action, ghostIndex, validate = True):
+        if (validate and action not in GhostRules.getLegalActions(state, ghostIndex)):
             raise ValueError('Illegal ghost action: ' + str(action))
 
-        ghostState = state.getGhostState(ghostIndex)
+        ghostState = state.editAgentState(ghostIndex)
         speed = GhostRules.GHOST_SPEED
         if (ghostState.isScared()):
             speed /= 2.0
@@ -341,7 +349,7 @@ class GhostRules:
         if (ghostState.isScared()):
             # Pacman ate a ghost.
             state.addScore(GHOST_POINTS)
-            ghostState.respawn()
+            state.editAgentState(agentIndex).respawn()
         elif (not state.isOver()):
             # A ghost ate pacman.
             state.addScore(LOSE_POINTS)
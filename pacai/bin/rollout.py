@@ -0,0 +1,411 @@
+"""
+A batched engine for classic pacman that steps many games at once.
+
+This is meant for Monte Carlo evaluation, where thousands of (random) games need to be played
+out from a single state.
+Instead of a `pacai.bin.pacman.PacmanGameState` per game,
+all the games are held in NumPy arrays (one entry/row per game) and every step is applied
+to all of the games at the same time, following the same rules as
+`pacai.bin.pacman.PacmanRules` and `pacai.bin.pacman.GhostRules`.
+
+To run a batch of random games from the command line:
+```
+python3 -m pacai.bin.rollout --layout smallClassic --num-games 1000
+```
+"""
+
+import argparse
+import logging
+import sys
+import time
+
+import numpy
+
+from pacai.bin import pacman
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.core.layout import getLayout
+from pacai.util.logs import initLogging
+from pacai.util.logs import updateLoggingLevel
+
+# Actions are stored as indexes into this list (in the same order as `Actions`).
+DIRECTIONS = [direction for (direction, vector) in Actions._directionsAsList]
+DIRECTION_INDEXES = {direction: index for (index, direction) in enumerate(DIRECTIONS)}
+STOP = DIRECTION_INDEXES[Directions.STOP]
+
+_DX = numpy.array([Actions._directions[direction][0] for direction in DIRECTIONS], dtype = float)
+_DY = numpy.array([Actions._directions[direction][1] for direction in DIRECTIONS], dtype = float)
+_REVERSE = numpy.array([DIRECTION_INDEXES[Actions.reverseDirection(direction)]
+        for direction in DIRECTIONS])
+
+class BatchPacmanState(object):
+    """
+    Many copies of a classic pacman game that are advanced together.
+
+    Positions, directions, and scared timers are (numGames x numAgents) arrays,
+    food is a (numGames x width x height) array of booleans (one bit plane per game),
+    and capsules are a (numGames x numCapsules) array of booleans over the layout's capsules.
+    Actions are passed in and returned as indexes into `DIRECTIONS`.
+
+    Games that are over are simply left alone by further steps.
+
+    In conformance mode, every game is also played on a normal `pacai.bin.pacman.PacmanGameState`
+    and the results are checked after every step.
+    This is slow, and only meant for testing.
+    """
+
+    def __init__(self, state, numGames, seed = None, conformance = False):
+        """
+        Args:
+            state: The `pacai.bin.pacman.PacmanGameState` that all games start from.
+            numGames: The number of games in the batch.
+            seed: The seed for the random actions (see `BatchPacmanState.getRandomActions`).
+            conformance: Also play the games with the scalar engine and check the results.
+        """
+
+        if (state.isOver()):
+            raise ValueError("Can't start a batch from a terminal state.")
+
+        layout = state.getInitialLayout()
+        walls = state.getWalls()
+
+        self._numGames = numGames
+        self._numAgents = state.getNumAgents()
+        self._games = numpy.arange(numGames)
+        self._random = numpy.random.default_rng(seed)
+
+        # Static information about the board.
+
+        self._legal = numpy.zeros((walls.getWidth(), walls.getHeight(), len(DIRECTIONS)),
+                dtype = bool)
+        moves = layout.getMoveTable()
+        for (x, y) in walls.asList(False):
+            for action in moves.getPossibleActions((x, y), Directions.STOP):
+                self._legal[x, y, DIRECTION_INDEXES[action]] = True
+
+        self._capsuleX = numpy.array([x for (x, y) in layout.capsules], dtype = int)
+        self._capsuleY = numpy.array([y for (x, y) in layout.capsules], dtype = int)
+
+        self._startX = numpy.array([layout.agentPositions[index][1][0]
+                for index in range(self._numAgents)], dtype = float)
+        self._startY = numpy.array([layout.agentPositions[index][1][1]
+                for index in range(self._numAgents)], dtype = float)
+
+        # The games.
+
+        agentStates = state.getAgentStates()
+
+        self._x = numpy.tile(numpy.array([agentState.getPosition()[0]
+                for agentState in agentStates], dtype = float), (numGames, 1))
+        self._y = numpy.tile(numpy.array([agentState.getPosition()[1]
+                for agentState in agentStates], dtype = float), (numGames, 1))
+        self._directions = numpy.tile(numpy.array([DIRECTION_INDEXES[agentState.getDirection()]
+                for agentState in agentStates]), (numGames, 1))
+        self._scaredTimers = numpy.tile(numpy.array([agentState.getScaredTimer()
+                for agentState in agentStates]), (numGames, 1))
+
+        food = numpy.zeros((walls.getWidth(), walls.getHeight()), dtype = bool)
+        for (x, y) in state.getFoodList():
+            food[x, y] = True
+
+        self._food = numpy.tile(food, (numGames, 1, 1))
+        self._numFood = numpy.full(numGames, state.getNumFood())
+
+        capsules = numpy.array([position in state.getCapsules() for position in layout.capsules],
+                dtype = bool)
+        self._capsules = numpy.tile(capsules, (numGames, 1))
+
+        self._scores = numpy.full(numGames, state.getScore(), dtype = float)
+        self._over = numpy.zeros(numGames, dtype = bool)
+        self._wins = numpy.zeros(numGames, dtype = bool)
+
+        self._scalarStates = None
+        if (conformance):
+            self._scalarStates = [state] * numGames
+
+    def getLegalActionMask(self, agentIndex):
+        """
+        Get a (numGames x len(DIRECTIONS)) array where entry [game, action]
+        is True if the action is legal for the agent in that game.
+        Games that are over have no legal actions.
+        """
+
+        x = self._x[:, agentIndex]
+        y = self._y[:, agentIndex]
+        direction = self._directions[:, agentIndex]
+
+        cellX = (x + 0.5).astype(int)
+        cellY = (y + 0.5).astype(int)
+
+        # In between grid points, all agents must continue straight.
+        between = (numpy.abs(x - cellX) + numpy.abs(y - cellY)) > Actions.TOLERANCE
+
+        mask = self._legal[cellX, cellY]
+        mask[between] = False
+        mask[self._games[between], direction[between]] = True
+
+        if (agentIndex != pacman.PACMAN_AGENT_INDEX):
+            # Ghosts cannot stop, and cannot turn around unless they reach a dead end.
+            mask[:, STOP] = False
+
+            reverse = _REVERSE[direction]
+            drop = (~between) & mask[self._games, reverse] & (mask.sum(axis = 1) > 1)
+            mask[self._games[drop], reverse[drop]] = False
+
+        mask[self._over] = False
+
+        return mask
+
+    def getNumFood(self):
+        return self._numFood
+
+    def getNumGames(self):
+        return self._numGames
+
+    def getRandomActions(self, agentIndex):
+        """
+        Pick a legal action uniformly at random for the agent in every game
+        (the same policy as `pacai.agents.ghost.random.RandomGhost`).
+        Games that are over get STOP.
+        """
+
+        mask = self.getLegalActionMask(agentIndex)
+
+        # Every legal action is equally likely to get the largest draw.
+        draws = self._random.random(mask.shape) * mask
+        actions = numpy.argmax(draws, axis = 1)
+        actions[~mask.any(axis = 1)] = STOP
+
+        return actions
+
+    def getScores(self):
+        return self._scores
+
+    def isOver(self):
+        return self._over
+
+    def isWin(self):
+        return self._wins
+
+    def rollout(self, startingIndex = pacman.PACMAN_AGENT_INDEX, maxMoves = None):
+        """
+        Play all the games with random actions for every agent,
+        until they are over or each agent has moved maxMoves times.
+        Returns the final scores.
+        """
+
+        moves = 0
+        agentIndex = startingIndex
+
+        while (not self._over.all()):
+            if (maxMoves is not None and moves >= maxMoves * self._numAgents):
+                break
+
+            self.step(agentIndex, self.getRandomActions(agentIndex))
+
+            moves += 1
+            agentIndex = (agentIndex + 1) % self._numAgents
+
+        return self._scores
+
+    def step(self, agentIndex, actions):
+        """
+        Have the specified agent take an action in every game.
+        The actions must be legal for every game that is not over.
+        """
+
+        actions = numpy.asarray(actions)
+        active = ~self._over
+
+        if (agentIndex == pacman.PACMAN_AGENT_INDEX):
+            self._stepPacman(actions, active)
+        else:
+            self._stepGhost(agentIndex, actions, active)
+
+        if (self._scalarStates is not None):
+            self._checkConformance(agentIndex, actions, active)
+
+    def _collide(self, ghostIndex, active):
+        """
+        Resolve pacman touching the ghost (in the active games).
+        """
+
+        distance = (numpy.abs(self._x[:, ghostIndex] - self._x[:, pacman.PACMAN_AGENT_INDEX])
+                + numpy.abs(self._y[:, ghostIndex] - self._y[:, pacman.PACMAN_AGENT_INDEX]))
+        touching = active & (distance <= pacman.COLLISION_TOLERANCE)
+
+        scared = self._scaredTimers[:, ghostIndex] > 0
+
+        # Pacman ate a ghost.
+        eaten = touching & scared
+        self._scores[eaten] += pacman.GHOST_POINTS
+        self._x[eaten, ghostIndex] = self._startX[ghostIndex]
+        self._y[eaten, ghostIndex] = self._startY[ghostIndex]
+        self._directions[eaten, ghostIndex] = STOP
+        self._scaredTimers[eaten, ghostIndex] = 0
+
+        # A ghost ate pacman.
+        lost = touching & ~scared & ~self._over
+        self._scores[lost] += pacman.LOSE_POINTS
+        self._over[lost] = True
+        self._wins[lost] = False
+
+    def _move(self, agentIndex, actions, active, speed):
+        self._x[:, agentIndex] += _DX[actions] * speed * active
+        self._y[:, agentIndex] += _DY[actions] * speed * active
+
+        turned = active & (actions != STOP)
+        self._directions[turned, agentIndex] = actions[turned]
+
+    def _stepGhost(self, ghostIndex, actions, active):
+        scared = self._scaredTimers[:, ghostIndex] > 0
+
+        speed = numpy.where(scared, pacman.GhostRules.GHOST_SPEED / 2.0,
+                pacman.GhostRules.GHOST_SPEED)
+        self._move(ghostIndex, actions, active, speed)
+
+        # Time passes.
+        ticking = active & scared
+        self._scaredTimers[ticking, ghostIndex] -= 1
+
+        # If the ghost is done being scared, snap it to the closest point.
+        snap = ticking & (self._scaredTimers[:, ghostIndex] == 0)
+        self._x[snap, ghostIndex] = (self._x[snap, ghostIndex] + 0.5).astype(int)
+        self._y[snap, ghostIndex] = (self._y[snap, ghostIndex] + 0.5).astype(int)
+
+        self._collide(ghostIndex, active)
+
+    def _stepPacman(self, actions, active):
+        index = pacman.PACMAN_AGENT_INDEX
+        self._move(index, actions, active, pacman.PacmanRules.PACMAN_SPEED)
+
+        # Pacman moves a whole cell at a time, so it is always on a grid point.
+        x = self._x[:, index].astype(int)
+        y = self._y[:, index].astype(int)
+
+        # Eat food.
+        eatFood = active & self._food[self._games, x, y]
+        self._food[self._games[eatFood], x[eatFood], y[eatFood]] = False
+        self._numFood[eatFood] -= 1
+        self._scores[eatFood] += pacman.FOOD_POINTS
+
+        cleared = eatFood & (self._numFood == 0)
+        self._scores[cleared] += pacman.BOARD_CLEAR_POINTS
+        self._over[cleared] = True
+        self._wins[cleared] = True
+
+        # Eat a capsule (only if there was no food).
+        capsules = (self._capsules & (~eatFood & active)[:, numpy.newaxis]
+                & (self._capsuleX == x[:, numpy.newaxis]) & (self._capsuleY == y[:, numpy.newaxis]))
+        self._capsules[capsules] = False
+
+        eatCapsule = capsules.any(axis = 1)
+        self._scaredTimers[eatCapsule, 1:] = pacman.SCARED_TIME
+
+        # Penalty for waiting around.
+        self._scores[active] -= pacman.TIME_PENALTY
+
+        for ghostIndex in range(1, self._numAgents):
+            self._collide(ghostIndex, active)
+
+    def _checkConformance(self, agentIndex, actions, active):
+        """
+        Make the same moves with the scalar engine and ensure that the games match.
+        """
+
+        for game in range(self._numGames):
+            if (not active[game]):
+                continue
+
+            state = self._scalarStates[game].generateSuccessor(agentIndex,
+                    DIRECTIONS[actions[game]])
+            self._scalarStates[game] = state
+
+            expected = {
+                'score': state.getScore(),
+                'over': state.isOver(),
+                'win': state.isWin(),
+                'food': sorted(state.getFoodList()),
+                'capsules': sorted(state.getCapsules()),
+                'agents': [(agentState.getPosition(), agentState.getDirection(),
+                        agentState.getScaredTimer()) for agentState in state.getAgentStates()],
+            }
+
+            actual = {
+                'score': self._scores[game],
+                'over': bool(self._over[game]),
+                'win': bool(self._wins[game]),
+                'food': [(int(x), int(y)) for (x, y) in numpy.argwhere(self._food[game])],
+                'capsules': sorted([(int(self._capsuleX[i]), int(self._capsuleY[i]))
+                        for i in numpy.flatnonzero(self._capsules[game])]),
+                'agents': [((self._x[game, i], self._y[game, i]),
+                        DIRECTIONS[self._directions[game, i]], self._scaredTimers[game, i])
+                        for i in range(self._numAgents)],
+            }
+
+            if (expected != actual):
+                raise RuntimeError("Batch game %d does not match the scalar engine after agent %d"
+                        " moved %s. Expected: %s, Found: %s." % (game, agentIndex,
+                        DIRECTIONS[actions[game]], expected, actual))
+
+def main(argv):
+    """
+    Entry point for a batch of random pacman games.
+    The args are a blind pass of `sys.argv` with the executable stripped.
+    """
+
+    initLogging()
+
+    parser = argparse.ArgumentParser(description = 'Play a batch of random classic pacman games.',
+            prog = 'rollout')
+
+    parser.add_argument('-k', '--num-ghosts', dest = 'numGhosts',
+            action = 'store', type = int, default = 4,
+            help = 'set the maximum number of ghosts (default: %(default)s)')
+
+    parser.add_argument('-l', '--layout', dest = 'layout',
+            action = 'store', type = str, default = 'mediumClassic',
+            help = 'use the specified map layout (default: %(default)s)')
+
+    parser.add_argument('-m', '--max-moves', dest = 'maxMoves',
+            action = 'store', type = int, default = None,
+            help = 'stop games after every agent has made this many moves (default: %(default)s)')
+
+    parser.add_argument('-n', '--num-games', dest = 'numGames',
+            action = 'store', type = int, default = 1000,
+            help = 'play the specified number of games (default: %(default)s)')
+
+    parser.add_argument('-q', '--quiet', dest = 'quiet',
+            action = 'store_true', default = False,
+            help = 'set logging level to warning (default: %(default)s)')
+
+    parser.add_argument('-s', '--seed', dest = 'seed',
+            action = 'store', type = int, default = None,
+            help = 'Enter seed value to randomize the games')
+
+    parser.add_argument('--conformance', dest = 'conformance',
+            action = 'store_true', default = False,
+            help = 'check every game against the scalar engine (slow) (default: %(default)s)')
+
+    options = parser.parse_args(argv)
+
+    if (options.quiet):
+        updateLoggingLevel(logging.WARNING)
+
+    layout = getLayout(options.layout, maxGhosts = options.numGhosts)
+    batch = BatchPacmanState(pacman.PacmanGameState(layout), options.numGames,
+            seed = options.seed, conformance = options.conformance)
+
+    startTime = time.time()
+    scores = batch.rollout(maxMoves = options.maxMoves)
+    totalTime = time.time() - startTime
+
+    logging.info('Played %d games in %.2f seconds.' % (options.numGames, totalTime))
+    logging.info('Average Score: %s', scores.mean())
+    logging.info('Win Rate:      %d/%d (%.2f)' % (batch.isWin().sum(), options.numGames,
+            batch.isWin().mean()))
+
+    return batch
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
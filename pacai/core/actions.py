@@ -97,3 +97,76 @@ class Actions:
         dx, dy = Actions.directionToVector(action)
         x, y = position
         return (x + dx, y + dy)
+
+class MoveTable(object):
+    """
+    The results of `Actions.getPossibleActions` and `Actions.getLegalNeighbors`
+    precomputed for every open cell of a wall grid.
+
+    Lookups on integral positions are a single dict access.
+    Fractional positions (agents in between cells) fall back to `Actions`.
+    Callers get a fresh list on every lookup, so they are free to modify it.
+    """
+
+    def __init__(self, walls):
+        self._walls = walls
+
+        # {(x, y): (action, ...)}
+        self._actions = {}
+
+        # {(x, y): ((x, y), ...)}
+        self._neighbors = {}
+
+        # {(x, y): {direction: (action, ...)}}
+        self._ghostActions = {}
+
+        for position in walls.asList(False):
+            # Cells on the edge of the board are left to the fallback.
+            x, y = position
+            if (x in (0, walls.getWidth() - 1) or y in (0, walls.getHeight() - 1)):
+                continue
+
+            actions = Actions.getPossibleActions(position, Directions.STOP, walls)
+
+            self._actions[position] = tuple(actions)
+            self._neighbors[position] = tuple(Actions.getLegalNeighbors(position, walls))
+            self._ghostActions[position] = {direction: tuple(MoveTable._removeGhostMoves(actions,
+                    direction)) for direction in Actions._directions}
+
+    def getGhostActions(self, position, direction):
+        """
+        Get the possible actions for a ghost,
+        which cannot stop and cannot turn around unless they are in a dead end.
+        """
+
+        actions = self._ghostActions.get(position)
+        if (actions is not None):
+            return list(actions[direction])
+
+        actions = Actions.getPossibleActions(position, direction, self._walls)
+        return MoveTable._removeGhostMoves(actions, direction)
+
+    def getLegalNeighbors(self, position):
+        x, y = position
+        neighbors = self._neighbors.get((int(x + 0.5), int(y + 0.5)))
+        if (neighbors is not None):
+            return list(neighbors)
+
+        return Actions.getLegalNeighbors(position, self._walls)
+
+    def getPossibleActions(self, position, direction):
+        actions = self._actions.get(position)
+        if (actions is not None):
+            return list(actions)
+
+        return Actions.getPossibleActions(position, direction, self._walls)
+
+    @staticmethod
+    def _removeGhostMoves(actions, direction):
+        actions = [action for action in actions if action != Directions.STOP]
+
+        reverse = Actions.reverseDirection(direction)
+        if (reverse in actions and len(actions) > 1):
+            actions.remove(reverse)
+
+        return actions
@@ -0,0 +1,3 @@
+"""
+The `pacai.core.adversarial` package contains reusable game tree searches for pacai game states.
+"""
@@ -0,0 +1,340 @@
+"""
+An iterative deepening alpha-beta search for pacai game states.
+
+Agents take turns in index order (wrapping around), and one level of depth is a full round
+(every agent moving once), the same as `pacai.agents.search.multiagent.MultiAgentSearchAgent`.
+Agents in the engine's `maximizers` maximize the evaluation, all the others minimize it.
+
+The search deepens one round at a time until it runs out of depth or time,
+and keeps what it learns between iterations (and between moves):
+ - a transposition table of bounded size, keyed by the state's (Zobrist) hash and the agent to move
+   (each entry also holds a cheap summary of its state, so two different states
+   with the same hash also need the same score, food count, and agents to be mixed up),
+ - killer moves (actions that caused a cutoff at the same ply),
+ - and a history score for each (agent, position, action) that caused cutoffs.
+These are used to search the most promising moves first, which makes the cutoffs come sooner.
+The root is the exception: it searches the previous iteration's best move first
+and the rest in `getLegalActions` order.
+Table values are only trusted when they were searched to exactly the depth being asked for
+(deeper entries still help order the moves), so every value is the depth-limited one.
+Together, this means the move picked at a given depth (the first one with the best value)
+does not depend on what earlier searches learned.
+
+The search walks the tree with `pacai.core.gamestate.AbstractGameState.applyMove`
+on the state it is given, and undoes every move before returning (even when it runs out of time).
+"""
+
+import time
+
+DEFAULT_MAX_DEPTH = 8
+
+# The number of transposition table slots.
+DEFAULT_TABLE_SIZE = 1 << 16
+
+# Transposition table bounds.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+# The number of killer moves remembered for each ply.
+NUM_KILLERS = 2
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when time has run out.
+    """
+
+    pass
+
+class AlphaBetaEngine(object):
+    """
+    A reusable alpha-beta search (see `pacai.core.adversarial.alphabeta`).
+
+    The transposition table has a fixed number of slots, and each state goes in the slot picked by
+    its hash.
+    When two entries want the same slot, the new one replaces the old one if it was searched
+    at least as deep, or if the old one was stored by an earlier call to `AlphaBetaEngine.search`.
+    """
+
+    def __init__(self, evaluationFunction, maximizers = (0,), maxDepth = DEFAULT_MAX_DEPTH,
+            tableSize = DEFAULT_TABLE_SIZE):
+        self.evaluationFunction = evaluationFunction
+        self.maximizers = frozenset(maximizers)
+        self.maxDepth = maxDepth
+
+        self._tableSize = tableSize
+        self._table = [None] * tableSize
+
+        # Bumped on every search, so entries from old searches are replaced first.
+        self._generation = 0
+
+        self._killers = []
+        self._history = {}
+
+        self._deadline = None
+        self._stats = {}
+
+    def clear(self):
+        """
+        Forget everything learned in previous searches.
+        """
+
+        self._table = [None] * self._tableSize
+        self._killers = []
+        self._history = {}
+
+    def getStats(self):
+        """
+        Get the stats of the last search.
+        """
+
+        return dict(self._stats)
+
+    def search(self, state, agentIndex = 0, timeLimit = None):
+        """
+        Search for the best action for the agent,
+        deepening until `maxDepth` is reached or `timeLimit` seconds have passed.
+        When time runs out, the best action found so far is returned.
+        """
+
+        startTime = time.perf_counter()
+        self._deadline = None if (timeLimit is None) else startTime + timeLimit
+        self._generation += 1
+
+        self._stats = {
+            'nodes': 0,
+            'tableHits': 0,
+            'cutoffs': 0,
+            'depth': 0,
+            'value': None,
+            'timedOut': False,
+        }
+
+        # Age the history, so it favors what worked recently.
+        for key in self._history:
+            self._history[key] //= 2
+
+        legalActions = state.getLegalActions(agentIndex)
+        if (len(legalActions) == 0):
+            return None
+
+        bestAction = legalActions[0]
+        previousAction = None
+
+        for depth in range(1, self.maxDepth + 1):
+            plies = depth * state.getNumAgents()
+
+            try:
+                value, action = self._searchRoot(state, agentIndex, plies, previousAction)
+            except SearchTimeout as timeout:
+                # Anything the unfinished iteration proved to beat the old best is still better.
+                if (timeout.args[0] is not None):
+                    bestAction = timeout.args[0]
+
+                self._stats['timedOut'] = True
+                break
+
+            bestAction = action
+            previousAction = action
+            self._stats['depth'] = depth
+            self._stats['value'] = value
+
+            if (self._deadline is not None and time.perf_counter() > self._deadline):
+                break
+
+        self._stats['seconds'] = time.perf_counter() - startTime
+        return bestAction
+
+    def searchValue(self, state, agentIndex, plies, alpha = float('-inf'), beta = float('inf')):
+        """
+        Get the value of a state searched `plies` moves deep (with no time limit),
+        keeping the transposition table, killers and history.
+        Like the rest of the search, this is fail-soft:
+        a value at or below alpha is an upper bound, and one at or above beta is a lower bound.
+        """
+
+        self._deadline = None
+        self._stats = {
+            'nodes': 0,
+            'tableHits': 0,
+            'cutoffs': 0,
+        }
+
+        return self._alphaBeta(state, agentIndex, plies, 1, alpha, beta)
+
+    def _alphaBeta(self, state, agentIndex, plies, ply, alpha, beta):
+        self._stats['nodes'] += 1
+        if (self._deadline is not None and time.perf_counter() > self._deadline):
+            raise SearchTimeout(None)
+
+        if (plies == 0 or state.isOver()):
+            return self.evaluationFunction(state)
+
+        legalActions = state.getLegalActions(agentIndex)
+        if (len(legalActions) == 0):
+            return self.evaluationFunction(state)
+
+        originalAlpha, originalBeta = alpha, beta
+
+        key = (hash(state), agentIndex, _getVerificationKey(state))
+        slot = key[0] % self._tableSize
+        entry = self._table[slot]
+
+        tableAction = None
+        if (entry is not None and entry[0] == key):
+            tableAction = entry[5]
+
+            # A deeper value may differ from this depth's, so only the same depth is used.
+            if (entry[2] == plies):
+                self._stats['tableHits'] += 1
+
+                value, bound = entry[3], entry[4]
+                if (bound == EXACT):
+                    return value
+                elif (bound == LOWER):
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+
+                if (alpha >= beta):
+                    return value
+
+        isMax = agentIndex in self.maximizers
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+
+        bestValue = float('-inf') if isMax else float('inf')
+        bestAction = None
+
+        for action in self._orderActions(state, agentIndex, legalActions, ply, tableAction):
+            record = state.applyMove(agentIndex, action)
+            try:
+                value = self._alphaBeta(state, nextAgent, plies - 1, ply + 1, alpha, beta)
+            finally:
+                state.undoMove(record)
+
+            if (isMax):
+                if (value > bestValue):
+                    bestValue = value
+                    bestAction = action
+                alpha = max(alpha, value)
+            else:
+                if (value < bestValue):
+                    bestValue = value
+                    bestAction = action
+                beta = min(beta, value)
+
+            if (alpha >= beta):
+                self._recordCutoff(state, agentIndex, action, plies, ply)
+                break
+
+        if (bestValue <= originalAlpha):
+            bound = UPPER
+        elif (bestValue >= originalBeta):
+            bound = LOWER
+        else:
+            bound = EXACT
+
+        self._store(slot, key, plies, bestValue, bound, bestAction)
+        return bestValue
+
+    def _orderActions(self, state, agentIndex, legalActions, ply, tableAction):
+        """
+        Order actions: the transposition table's best action, then killers, then by history.
+        """
+
+        position = state.getAgentPosition(agentIndex)
+        history = self._history
+
+        killers = self._killers[ply] if (ply < len(self._killers)) else ()
+
+        def priority(action):
+            if (action == tableAction):
+                return (0, 0)
+
+            if (action in killers):
+                return (1, killers.index(action))
+
+            return (2, -history.get((agentIndex, position, action), 0))
+
+        return sorted(legalActions, key = priority)
+
+    def _recordCutoff(self, state, agentIndex, action, plies, ply):
+        self._stats['cutoffs'] += 1
+
+        key = (agentIndex, state.getAgentPosition(agentIndex), action)
+        self._history[key] = self._history.get(key, 0) + plies * plies
+
+        while (len(self._killers) <= ply):
+            self._killers.append([])
+
+        killers = self._killers[ply]
+        if (action not in killers):
+            killers.insert(0, action)
+            del killers[NUM_KILLERS:]
+
+    def _searchRoot(self, state, agentIndex, plies, firstAction):
+        """
+        Search the root to the given number of plies, starting with `firstAction` (if any).
+        Returns the value and best action.
+        On a timeout, the `SearchTimeout` carries the best action of this iteration
+        if at least one action has been fully searched (None otherwise).
+        """
+
+        isMax = agentIndex in self.maximizers
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+
+        alpha, beta = float('-inf'), float('inf')
+        bestValue = alpha if isMax else beta
+        bestAction = None
+
+        for action in orderRootActions(state.getLegalActions(agentIndex), firstAction):
+            record = state.applyMove(agentIndex, action)
+            try:
+                value = self._alphaBeta(state, nextAgent, plies - 1, 1, alpha, beta)
+            except SearchTimeout:
+                raise SearchTimeout(bestAction)
+            finally:
+                state.undoMove(record)
+
+            if ((isMax and value > bestValue) or (not isMax and value < bestValue)):
+                bestValue = value
+                bestAction = action
+
+            if (isMax):
+                alpha = max(alpha, value)
+            else:
+                beta = min(beta, value)
+
+        # No move beat the starting bound (e.g. every move is valued at -inf).
+        if (bestAction is None):
+            bestAction = orderRootActions(state.getLegalActions(agentIndex), firstAction)[0]
+
+        key = (hash(state), agentIndex, _getVerificationKey(state))
+        self._store(key[0] % self._tableSize, key, plies, bestValue, EXACT, bestAction)
+
+        return bestValue, bestAction
+
+    def _store(self, slot, key, plies, value, bound, action):
+        old = self._table[slot]
+        if (old is None or old[0] == key or old[1] != self._generation or old[2] <= plies):
+            self._table[slot] = (key, self._generation, plies, value, bound, action)
+
+def _getVerificationKey(state):
+    """
+    Summarize the parts of a state that most often tell apart two states with the same hash.
+    """
+
+    return (state.getScore(), state.getNumFood(),
+            tuple((agentState.getPosition(), agentState.getDirection())
+                for agentState in state.getAgentStates()))
+
+def orderRootActions(legalActions, firstAction):
+    """
+    Get the order the root's actions are searched in:
+    `firstAction` (if it is legal), then the rest in their original order.
+    """
+
+    if (firstAction not in legalActions):
+        return list(legalActions)
+
+    return [firstAction] + [action for action in legalActions if action != firstAction]
@@ -0,0 +1,163 @@
+"""
+An expectimax search for Pacman against ghosts, with two ways to cut down on the work.
+The agent the search is for (usually Pacman) is the only max node,
+every other agent is a chance node.
+
+Node values are cached by state hash (and agent searched for, agent to move and depth left),
+so a chance subtree reached again (e.g. through ghosts moving in a different order,
+or from the search on the next move) is only searched once.
+
+Ghosts are chance nodes, and each ghost's moves come from a model:
+either uniformly random, or the `pacai.agents.ghost.base.GhostAgent.getDistribution`
+of a ghost agent (e.g. `pacai.agents.ghost.directional.DirectionalGhost`).
+With `topK`, only the k most likely moves of each ghost are searched
+(with their probabilities renormalized), trading accuracy for speed.
+"""
+
+import time
+
+DEFAULT_MAX_DEPTH = 2
+
+# The most node values kept in the cache, it is emptied when it fills up.
+DEFAULT_CACHE_SIZE = 1 << 18
+
+class ExpectimaxEngine(object):
+    """
+    A reusable expectimax search (see `pacai.core.adversarial.expectimax`).
+
+    `ghostModels` maps ghost indexes to ghost agents,
+    other agents (except the one searched for) are modeled as choosing uniformly at random
+    from their legal moves.
+    A `topK` of None searches every move a ghost can make.
+    """
+
+    def __init__(self, evaluationFunction, maxDepth = DEFAULT_MAX_DEPTH, ghostModels = {},
+            topK = None, cacheSize = DEFAULT_CACHE_SIZE):
+        self.evaluationFunction = evaluationFunction
+        self.maxDepth = maxDepth
+        self.ghostModels = dict(ghostModels)
+        self.topK = topK
+
+        self._cacheSize = cacheSize
+        self._cache = {}
+        self._stats = {}
+
+        # The agent the current search is for.
+        self._maximizer = 0
+
+    def clear(self):
+        self._cache = {}
+
+    def getDistribution(self, state, agentIndex):
+        """
+        Get the (action, probability) pairs that are searched for a ghost.
+        """
+
+        model = self.ghostModels.get(agentIndex)
+        if (model is None):
+            actions = state.getLegalActions(agentIndex)
+            distribution = [(action, 1.0) for action in actions]
+        else:
+            distribution = [(action, probability)
+                    for (action, probability) in model.getDistribution(state).items()
+                    if probability > 0]
+
+        if (self.topK is not None and len(distribution) > self.topK):
+            # Stable, so ties go to the action that came first.
+            distribution = sorted(distribution, key = lambda pair: -pair[1])[:self.topK]
+
+        if (len(distribution) == 0):
+            return []
+
+        total = sum(probability for (action, probability) in distribution)
+        return [(action, probability / total) for (action, probability) in distribution]
+
+    def getStats(self):
+        """
+        Get the stats of the last search.
+        """
+
+        return dict(self._stats)
+
+    def search(self, state, agentIndex = 0):
+        """
+        Get the action with the highest expected value for an agent
+        (or None if it has no moves).
+        """
+
+        self._maximizer = agentIndex
+
+        startTime = time.perf_counter()
+        self._stats = {
+            'nodes': 0,
+            'cacheHits': 0,
+            'value': None,
+        }
+
+        plies = self.maxDepth * state.getNumAgents()
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+
+        bestValue = float('-inf')
+        bestAction = None
+
+        for action in state.getLegalActions(agentIndex):
+            record = state.applyMove(agentIndex, action)
+            try:
+                value = self._getValue(state, nextAgent, plies - 1)
+            finally:
+                state.undoMove(record)
+
+            if (value > bestValue):
+                bestValue = value
+                bestAction = action
+
+        self._stats['value'] = bestValue
+        self._stats['cacheSize'] = len(self._cache)
+        self._stats['seconds'] = time.perf_counter() - startTime
+
+        return bestAction
+
+    def _getValue(self, state, agentIndex, plies):
+        if (plies == 0 or state.isOver()):
+            return self.evaluationFunction(state)
+
+        key = (hash(state), self._maximizer, agentIndex, plies)
+        value = self._cache.get(key)
+        if (value is not None):
+            self._stats['cacheHits'] += 1
+            return value
+
+        self._stats['nodes'] += 1
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+
+        if (agentIndex == self._maximizer):
+            value = float('-inf')
+            for action in state.getLegalActions(agentIndex):
+                record = state.applyMove(agentIndex, action)
+                try:
+                    value = max(value, self._getValue(state, nextAgent, plies - 1))
+                finally:
+                    state.undoMove(record)
+
+            if (value == float('-inf')):
+                # The maximizer had no moves.
+                value = self.evaluationFunction(state)
+        else:
+            distribution = self.getDistribution(state, agentIndex)
+            if (len(distribution) == 0):
+                # The agent had no moves.
+                return self.evaluationFunction(state)
+
+            value = 0.0
+            for (action, probability) in distribution:
+                record = state.applyMove(agentIndex, action)
+                try:
+                    value += probability * self._getValue(state, nextAgent, plies - 1)
+                finally:
+                    state.undoMove(record)
+
+        if (len(self._cache) >= self._cacheSize):
+            self._cache.clear()
+
+        self._cache[key] = value
+        return value
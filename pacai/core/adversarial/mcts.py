@@ -0,0 +1,357 @@
+"""
+Monte Carlo Tree Search (UCT) for pacai game states.
+
+Each iteration walks down the tree picking children by UCB1 (from the point of view of the agent
+to move), adds one new node, plays a short rollout from it with a cheap rollout policy,
+and backs the result up the path.
+Agents in the engine's `maximizers` want high rewards, all the others want low ones.
+Rewards compare the evaluation at the end of the rollout to the evaluation at the root
+the tree was started from, squashed into (-1, 1).
+
+The tree is kept between searches: when the next search starts from a state that is
+in the old tree (e.g. after every agent has moved once), that subtree becomes the new root.
+
+Root parallelism runs independent searches from the same root in worker processes
+(see `concurrent.futures.ProcessPoolExecutor`) and adds up the visits of the root's children.
+The state, evaluation function and rollout policy are pickled to the workers,
+so they need to be picklable (e.g. module level functions or instances of module level classes).
+"""
+
+import concurrent.futures
+import math
+import random
+import time
+
+from pacai.core.directions import Directions
+
+DEFAULT_EXPLORATION = math.sqrt(2)
+
+# The most moves (over all agents) a rollout makes.
+DEFAULT_ROLLOUT_DEPTH = 20
+
+# The change in evaluation that gives a reward of about 0.76 (tanh(1)).
+DEFAULT_REWARD_SCALE = 4.0
+
+class MCTSNode(object):
+    """
+    A node in the search tree: a state and the agent whose turn it is to move there.
+    """
+
+    def __init__(self, state, agentIndex, parent = None, action = None):
+        self.state = state
+        self.agentIndex = agentIndex
+        self.parent = parent
+        self.action = action
+
+        self.children = {}
+        self.untriedActions = None
+
+        self.visits = 0
+
+        # The total reward (for the maximizers) of all the visits.
+        self.totalReward = 0.0
+
+    def getSize(self):
+        """
+        Get the number of nodes in this subtree.
+        """
+
+        size = 0
+        stack = [self]
+        while (len(stack) > 0):
+            node = stack.pop()
+            size += 1
+            stack.extend(node.children.values())
+
+        return size
+
+class MCTSEngine(object):
+    """
+    A reusable UCT search (see `pacai.core.adversarial.mcts`).
+
+    `evaluationFunction(state)` scores states for the maximizers,
+    and `rolloutPolicy(state, agentIndex, rng)` picks an agent's move during rollouts.
+    """
+
+    def __init__(self, evaluationFunction, maximizers, rolloutPolicy = None,
+            exploration = DEFAULT_EXPLORATION, rolloutDepth = DEFAULT_ROLLOUT_DEPTH,
+            rewardScale = DEFAULT_REWARD_SCALE, seed = None):
+        self.evaluationFunction = evaluationFunction
+        self.maximizers = frozenset(maximizers)
+        self.rolloutPolicy = rolloutPolicy if (rolloutPolicy is not None) else randomRollout
+        self.exploration = exploration
+        self.rolloutDepth = rolloutDepth
+        self.rewardScale = rewardScale
+
+        self._rng = random.Random(seed)
+        self._root = None
+        self._stats = {}
+
+        # The evaluation of the state the tree was started from.
+        self._baseline = 0.0
+
+    def getRootStats(self):
+        """
+        Get the (visits, total reward) of each of the root's children.
+        """
+
+        if (self._root is None):
+            return {}
+
+        return {action: (child.visits, child.totalReward)
+                for (action, child) in self._root.children.items()}
+
+    def getStats(self):
+        """
+        Get the stats of the last search.
+        """
+
+        return dict(self._stats)
+
+    def run(self, state, agentIndex, timeLimit = None, maxIterations = None):
+        """
+        Grow the tree from the given root for `timeLimit` seconds or `maxIterations` iterations
+        (at least one of them must be given).
+        """
+
+        if (timeLimit is None and maxIterations is None):
+            raise ValueError('MCTS needs a time limit or an iteration limit.')
+
+        startTime = time.perf_counter()
+        deadline = None if (timeLimit is None) else startTime + timeLimit
+
+        root = self._findRoot(state, agentIndex)
+        inheritedVisits = root.visits
+
+        iterations = 0
+        while ((maxIterations is None or iterations < maxIterations)
+                and (deadline is None or time.perf_counter() < deadline)):
+            self._iterate(root)
+            iterations += 1
+
+        seconds = time.perf_counter() - startTime
+        self._stats = {
+            'iterations': iterations,
+            'iterationsPerSecond': (iterations / seconds) if (seconds > 0) else 0.0,
+            'treeSize': root.getSize(),
+            'reuseRatio': (inheritedVisits / root.visits) if (root.visits > 0) else 0.0,
+            'seconds': seconds,
+        }
+
+    def search(self, state, agentIndex, timeLimit = None, maxIterations = None):
+        """
+        Run the search (see `MCTSEngine.run`) and get the most visited action at the root.
+        """
+
+        self.run(state, agentIndex, timeLimit = timeLimit, maxIterations = maxIterations)
+        return getBestAction(self.getRootStats())
+
+    def _backup(self, node, reward):
+        while (node is not None):
+            node.visits += 1
+            node.totalReward += reward
+            node = node.parent
+
+    def _expand(self, node):
+        if (node.untriedActions is None):
+            node.untriedActions = list(node.state.getLegalActions(node.agentIndex))
+            self._rng.shuffle(node.untriedActions)
+
+        if (len(node.untriedActions) == 0):
+            return node
+
+        action = node.untriedActions.pop()
+        state = node.state.generateSuccessor(node.agentIndex, action)
+        nextAgent = (node.agentIndex + 1) % state.getNumAgents()
+
+        child = MCTSNode(state, nextAgent, node, action)
+        node.children[action] = child
+
+        return child
+
+    def _findRoot(self, state, agentIndex):
+        """
+        Find the state in the old tree (within one round of moves from the old root),
+        or start a new tree.
+        """
+
+        if (self._root is not None):
+            numAgents = state.getNumAgents()
+            frontier = [self._root]
+
+            for depth in range(numAgents + 1):
+                for node in frontier:
+                    if (node.agentIndex == agentIndex and hash(node.state) == hash(state)
+                            and node.state == state):
+                        node.parent = None
+                        node.action = None
+                        self._root = node
+                        return node
+
+                frontier = [child for node in frontier for child in node.children.values()]
+
+        self._root = MCTSNode(state, agentIndex)
+        self._baseline = self.evaluationFunction(state)
+
+        return self._root
+
+    def _iterate(self, root):
+        node = root
+
+        # Selection.
+        while (not node.state.isOver() and node.untriedActions is not None
+                and len(node.untriedActions) == 0 and len(node.children) > 0):
+            node = self._select(node)
+
+        # Expansion.
+        if (not node.state.isOver()):
+            node = self._expand(node)
+
+        # Rollout.
+        state = node.state
+        agentIndex = node.agentIndex
+        records = []
+
+        for i in range(self.rolloutDepth):
+            if (state.isOver() or not _hasTimeLeft(state)):
+                break
+
+            action = self.rolloutPolicy(state, agentIndex, self._rng)
+            if (action is None):
+                break
+
+            records.append(state.applyMove(agentIndex, action))
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+        value = self.evaluationFunction(state)
+        for record in reversed(records):
+            state.undoMove(record)
+
+        reward = math.tanh((value - self._baseline) / self.rewardScale)
+        self._backup(node, reward)
+
+    def _select(self, node):
+        logVisits = math.log(node.visits)
+        sign = 1.0 if (node.agentIndex in self.maximizers) else -1.0
+
+        bestScore = float('-inf')
+        bestChild = None
+
+        for child in node.children.values():
+            score = (sign * child.totalReward / child.visits
+                    + self.exploration * math.sqrt(logVisits / child.visits))
+
+            if (score > bestScore):
+                bestScore = score
+                bestChild = child
+
+        return bestChild
+
+class ParallelMCTS(object):
+    """
+    Root parallel MCTS: a local `MCTSEngine` (which keeps its tree between searches)
+    plus independent searches in worker processes,
+    with the root visits of all of them added up.
+    """
+
+    def __init__(self, engine, numWorkers):
+        self.engine = engine
+        self.numWorkers = numWorkers
+
+        self._executor = None
+        self._stats = {}
+
+    def getStats(self):
+        return dict(self._stats)
+
+    def search(self, state, agentIndex, timeLimit):
+        """
+        Search for `timeLimit` seconds in every process and get the most visited root action.
+        """
+
+        self.start()
+
+        engine = self.engine
+        parameters = (engine.evaluationFunction, engine.maximizers, engine.rolloutPolicy,
+                engine.exploration, engine.rolloutDepth, engine.rewardScale)
+
+        futures = [self._executor.submit(_searchWorker, state, agentIndex, timeLimit, parameters,
+                engine._rng.getrandbits(32)) for i in range(self.numWorkers)]
+
+        engine.run(state, agentIndex, timeLimit = timeLimit)
+
+        rootStats = dict(engine.getRootStats())
+        iterations = engine.getStats()['iterations']
+
+        for future in futures:
+            workerRootStats, workerIterations = future.result()
+            iterations += workerIterations
+
+            for (action, (visits, totalReward)) in workerRootStats.items():
+                oldVisits, oldReward = rootStats.get(action, (0, 0.0))
+                rootStats[action] = (oldVisits + visits, oldReward + totalReward)
+
+        self._stats = engine.getStats()
+        self._stats['workers'] = self.numWorkers
+        self._stats['totalIterations'] = iterations
+        self._stats['totalIterationsPerSecond'] = iterations / max(timeLimit, 1e-9)
+
+        return getBestAction(rootStats)
+
+    def start(self):
+        """
+        Start the worker processes (if they are not already running) and wait until they are up,
+        so the first search does not pay for starting them.
+        """
+
+        if (self._executor is not None):
+            return
+
+        self._executor = concurrent.futures.ProcessPoolExecutor(self.numWorkers)
+        for future in [self._executor.submit(time.sleep, 0) for i in range(self.numWorkers)]:
+            future.result()
+
+    def shutdown(self):
+        if (self._executor is not None):
+            self._executor.shutdown()
+            self._executor = None
+
+def getBestAction(rootStats):
+    """
+    Get the most visited action (ties go to the higher total reward), or None if there are none.
+    """
+
+    if (len(rootStats) == 0):
+        return None
+
+    return max(rootStats, key = lambda action: rootStats[action])
+
+def randomRollout(state, agentIndex, rng):
+    """
+    Move randomly, without stopping (unless stopping is the only option).
+    """
+
+    actions = state.getLegalActions(agentIndex)
+    if (len(actions) == 0):
+        return None
+
+    moves = [action for action in actions if action != Directions.STOP]
+    if (len(moves) == 0):
+        return actions[0]
+
+    return rng.choice(moves)
+
+def _hasTimeLeft(state):
+    getTimeleft = getattr(state, 'getTimeleft', None)
+    return (getTimeleft is None or getTimeleft() > 0)
+
+def _searchWorker(state, agentIndex, timeLimit, parameters, seed):
+    evaluationFunction, maximizers, rolloutPolicy, exploration, rolloutDepth, rewardScale = \
+            parameters
+
+    engine = MCTSEngine(evaluationFunction, maximizers, rolloutPolicy = rolloutPolicy,
+            exploration = exploration, rolloutDepth = rolloutDepth, rewardScale = rewardScale,
+            seed = seed)
+    engine.run(state, agentIndex, timeLimit = timeLimit)
+
+    return engine.getRootStats(), engine.getStats()['iterations']
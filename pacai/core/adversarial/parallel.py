@@ -0,0 +1,216 @@
+"""
+Root parallel alpha-beta: the root's moves are searched at the same time in worker processes
+(see `concurrent.futures.ProcessPoolExecutor`).
+
+Each worker gets the (pickled) state after one root move and searches it with an
+`pacai.core.adversarial.alphabeta.AlphaBetaEngine` of its own (kept between moves).
+The best value found at the root so far is shared through a manager (see
+`multiprocessing.Manager`), so a move that starts after a good one has finished can be cut off
+against it.
+
+The search picks the same move as a sequential
+`pacai.core.adversarial.alphabeta.AlphaBetaEngine` to the same depth:
+the first move (in the root order, see `pacai.core.adversarial.alphabeta.orderRootActions`)
+with the best value.
+This holds even though every engine has its own transposition table with its own history,
+since the engines only trust table values searched to exactly the depth being asked for.
+Workers keep their tables between root moves, which is safe since Zobrist keys do not depend on
+which (unpickled) copy of a state they came from (see `pacai.core.zobrist`),
+and table entries are checked against a summary of their state.
+A move that was cut off at exactly the best value may be tied with the best move,
+so it is searched again (with a window that only tells if it reaches the best value)
+when it comes before the best move in the root order.
+"""
+
+import concurrent.futures
+import multiprocessing
+import os
+import time
+
+from pacai.core.adversarial import alphabeta
+
+# The engine (and its settings) of a worker process.
+_workerEngine = None
+_workerSettings = None
+
+class ParallelAlphaBeta(object):
+    """
+    A root parallel alpha-beta search (see `pacai.core.adversarial.parallel`),
+    that deepens one round at a time up to `maxDepth`.
+    The evaluation function is pickled to the workers,
+    so it needs to be picklable (e.g. a module level function).
+    """
+
+    def __init__(self, evaluationFunction, maximizers = (0,),
+            maxDepth = alphabeta.DEFAULT_MAX_DEPTH, numWorkers = None,
+            tableSize = alphabeta.DEFAULT_TABLE_SIZE):
+        self.evaluationFunction = evaluationFunction
+        self.maximizers = frozenset(maximizers)
+        self.maxDepth = maxDepth
+        self.numWorkers = numWorkers if (numWorkers is not None) else (os.cpu_count() or 1)
+        self.tableSize = tableSize
+
+        # For the tie checks, which are done here.
+        self._engine = alphabeta.AlphaBetaEngine(evaluationFunction, maximizers = maximizers,
+                tableSize = tableSize)
+
+        self._executor = None
+        self._manager = None
+        self._alpha = None
+        self._lock = None
+
+        self._stats = {}
+
+    def getStats(self):
+        """
+        Get the stats of the last search.
+        `utilization` is the time the workers spent searching over the time the search took.
+        This is not a speedup: it includes the workers' overhead and the time spent on moves
+        that were cut off (see `pacai.agents.search.adversarial.ParallelAlphaBetaAgent`
+        for measuring the real speedup).
+        """
+
+        return dict(self._stats)
+
+    def search(self, state, agentIndex = 0):
+        """
+        Get the best action for an agent (which must be one of the maximizers),
+        or None if it has no moves.
+        """
+
+        if (agentIndex not in self.maximizers):
+            raise ValueError('Root parallel search is only for maximizers, not agent %d.'
+                    % (agentIndex))
+
+        self.start()
+
+        startTime = time.perf_counter()
+        self._stats = {
+            'depth': 0,
+            'value': None,
+            'nodes': 0,
+            'workerSeconds': 0.0,
+            'tieChecks': 0,
+        }
+
+        legalActions = state.getLegalActions(agentIndex)
+        if (len(legalActions) == 0):
+            return None
+
+        bestAction = None
+        for depth in range(1, self.maxDepth + 1):
+            plies = depth * state.getNumAgents()
+
+            value, bestAction = self._searchRoot(state, agentIndex, plies, bestAction)
+            self._stats['depth'] = depth
+            self._stats['value'] = value
+
+        seconds = time.perf_counter() - startTime
+        self._stats['seconds'] = seconds
+        self._stats['utilization'] = 0.0
+        if (seconds > 0):
+            self._stats['utilization'] = self._stats['workerSeconds'] / seconds
+
+        return bestAction
+
+    def shutdown(self):
+        if (self._executor is not None):
+            self._executor.shutdown()
+            self._manager.shutdown()
+
+            self._executor = None
+            self._manager = None
+            self._alpha = None
+            self._lock = None
+
+    def start(self):
+        """
+        Start the worker processes (if they are not already running).
+        """
+
+        if (self._executor is not None):
+            return
+
+        self._manager = multiprocessing.Manager()
+        self._alpha = self._manager.Value('d', float('-inf'))
+        self._lock = self._manager.Lock()
+
+        self._executor = concurrent.futures.ProcessPoolExecutor(self.numWorkers)
+
+    def _searchRoot(self, state, agentIndex, plies, firstAction):
+        """
+        Search every root action in the workers and pick the best one.
+        Returns the value and best action.
+        """
+
+        nextAgent = (agentIndex + 1) % state.getNumAgents()
+        order = alphabeta.orderRootActions(state.getLegalActions(agentIndex), firstAction)
+        settings = (self.evaluationFunction, self.maximizers, self.tableSize)
+
+        self._alpha.value = float('-inf')
+
+        successors = dict(state.generateAllSuccessors(agentIndex))
+
+        futures = {}
+        for action in order:
+            future = self._executor.submit(_searchMove, successors[action], nextAgent, plies - 1,
+                    self._alpha, self._lock, settings)
+            futures[action] = future
+
+        # {action: (value, alpha it was searched with)}
+        results = {}
+        for (action, future) in futures.items():
+            value, alpha, seconds, nodes = future.result()
+
+            results[action] = (value, alpha)
+            self._stats['workerSeconds'] += seconds
+            self._stats['nodes'] += nodes
+
+        # Values above the alpha they were searched with are exact.
+        exactActions = [action for action in order if (results[action][0] > results[action][1])]
+
+        # Every move failed low, which only happens when none of them beats -inf.
+        if (len(exactActions) == 0):
+            return results[order[0]][0], order[0]
+
+        bestValue = max(results[action][0] for action in exactActions)
+        bestAction = next(action for action in exactActions if results[action][0] == bestValue)
+
+        # Moves before the best one that were cut off at exactly the best value may tie with it.
+        for action in order[:order.index(bestAction)]:
+            if (results[action][0] != bestValue):
+                continue
+
+            self._stats['tieChecks'] += 1
+            if (self._engine.searchValue(successors[action], nextAgent, plies - 1,
+                    beta = bestValue) >= bestValue):
+                return bestValue, action
+
+        return bestValue, bestAction
+
+def _searchMove(state, agentIndex, plies, sharedAlpha, lock, settings):
+    """
+    Search a root move in a worker.
+    Returns the value, the alpha it was searched with, the time it took, and the nodes searched.
+    """
+
+    global _workerEngine, _workerSettings
+
+    if (_workerSettings != settings):
+        evaluationFunction, maximizers, tableSize = settings
+        _workerEngine = alphabeta.AlphaBetaEngine(evaluationFunction, maximizers = maximizers,
+                tableSize = tableSize)
+        _workerSettings = settings
+
+    startTime = time.perf_counter()
+
+    alpha = sharedAlpha.value
+    value = _workerEngine.searchValue(state, agentIndex, plies, alpha = alpha)
+
+    if (value > alpha):
+        with lock:
+            if (value > sharedAlpha.value):
+                sharedAlpha.value = value
+
+    seconds = time.perf_counter() - startTime
+    return value, alpha, seconds, _workerEngine.getStats()['nodes']
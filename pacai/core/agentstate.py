@@ -9,9 +9,18 @@ class AgentState:
     The convention for positions, like a graph, is that (0, 0) is the lower left corner,
     x increases horizontally and y increases vertically.
     Therefore, north is the direction of increasing y, or (0, 1).
+
+    If a `pacai.core.zobrist.ZobristTable` is supplied,
+    then the agent's hash is kept up-to-date as the agent changes (instead of being rebuilt).
+
+    Game states create a lot of agent states, so this class uses slots to keep them small.
     """
 
-    def __init__(self, position, direction, isPacman):
+    __slots__ = ('_startPosition', '_startDirection', '_startIsPacman',
+            '_position', '_direction', '_isPacman', '_scaredTimer',
+            '_zobrist', '_index', '_hash')
+
+    def __init__(self, position, direction, isPacman, zobrist = None, index = 0):
         # Save the starting information for later use.
         self._startPosition = position
         self._startDirection = direction
@@ -23,18 +32,34 @@ class AgentState:
         self._isPacman = isPacman
         self._scaredTimer = 0
 
+        self._zobrist = zobrist
+        self._index = index
+
+        self._hash = None
+        if (zobrist is not None):
+            self._hash = zobrist.agentKey(index, position, direction, isPacman, 0)
+
     def copy(self):
-        state = AgentState(self._startPosition, self._startDirection, self._startIsPacman)
+        # Skip the constructor, every field is about to be overwritten.
+        state = AgentState.__new__(AgentState)
+
+        state._startPosition = self._startPosition
+        state._startDirection = self._startDirection
+        state._startIsPacman = self._startIsPacman
 
         state._isPacman = self._isPacman
         state._position = self._position
         state._direction = self._direction
         state._scaredTimer = self._scaredTimer
 
+        state._zobrist = self._zobrist
+        state._index = self._index
+        state._hash = self._hash
+
         return state
 
     def decrementScaredTimer(self):
-        self._scaredTimer = max(0, self._scaredTimer - 1)
+        self.setScaredTimer(max(0, self._scaredTimer - 1))
 
     def getDirection(self):
         return self._direction
@@ -68,9 +93,11 @@ class AgentState:
         return (self.isGhost() and self.isScared())
 
     def setIsPacman(self, isPacman):
+        self._updateHash('pacman', self._isPacman, isPacman)
         self._isPacman = isPacman
 
     def setScaredTimer(self, timer):
+        self._updateHash('scared', self._scaredTimer, timer)
         self._scaredTimer = timer
 
     def snapToNearestPoint(self):
@@ -78,17 +105,17 @@ class AgentState:
         Move the agent to the nearest point to its current location.
         """
 
-        self._position = util.nearestPoint(self._position)
+        self._setPosition(util.nearestPoint(self._position))
 
     def respawn(self):
         """
         This agent was killed, respawn it at the start as a pacman.
         """
 
-        self._position = self._startPosition
-        self._direction = self._startDirection
-        self._isPacman = self._startIsPacman
-        self._scaredTimer = 0
+        self._setPosition(self._startPosition)
+        self._setDirection(self._startDirection)
+        self.setIsPacman(self._startIsPacman)
+        self.setScaredTimer(0)
 
     def updatePosition(self, vector):
         """
@@ -98,12 +125,31 @@ class AgentState:
         x, y = self._position
         dx, dy = vector
 
-        self._position = (x + dx, y + dy)
+        self._setPosition((x + dx, y + dy))
 
         direction = Actions.vectorToDirection(vector)
         if (direction != Directions.STOP):
             # If this is a zero vector, face the same direction as before.
-            self._direction = direction
+            self._setDirection(direction)
+
+    def _setDirection(self, direction):
+        self._updateHash('direction', self._direction, direction)
+        self._direction = direction
+
+    def _setPosition(self, position):
+        self._updateHash('position', self._position, position)
+        self._position = position
+
+    def _updateHash(self, field, oldValue, newValue):
+        """
+        Swap the key for the old value of a field with the key for the new value.
+        """
+
+        if (self._zobrist is None or oldValue == newValue):
+            return
+
+        self._hash ^= (self._zobrist.key(field, self._index, oldValue)
+                ^ self._zobrist.key(field, self._index, newValue))
 
     def __eq__(self, other):
         if (other is None):
@@ -115,6 +161,9 @@ class AgentState:
                 and self._scaredTimer == other._scaredTimer)
 
     def __hash__(self):
+        if (self._hash is not None):
+            return self._hash
+
         return util.buildHash(self._position, self._direction, self._isPacman, self._scaredTimer)
 
     def __str__(self):
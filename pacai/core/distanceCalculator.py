@@ -1,10 +1,35 @@
-import sys
+import abc
+import collections
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import zlib
+
+import numpy
 
 from pacai.core.distance import manhattan
-from pacai.util import priorityQueue
 
 DEFAULT_DISTANCE = 10000
 
+# The value stored in a distance matrix for a pair of cells with no path between them.
+UNREACHABLE = numpy.iinfo(numpy.uint16).max
+
+# The maximum number of layouts (wall configurations) to keep distances for.
+MAX_CACHED_LAYOUTS = 32
+
+# Where distance matrices are persisted between processes.
+# The on-disk cache is off unless PACAI_DISTANCE_CACHE is set to a directory.
+# Nothing is ever removed from it, so clear it out after playing on random mazes.
+CACHE_DIR = os.environ.get('PACAI_DISTANCE_CACHE', '')
+
+# The default number of rows (sources) a lazy distancer keeps around.
+DEFAULT_MAX_ROWS = 64
+
+# Bump whenever the layout of cached files (or the meaning of their contents) changes.
+CACHE_VERSION = 1
+
 class Distancer(object):
     """
     A class for computing and caching the shortest path between any two points in a given maze.
@@ -14,10 +39,18 @@ class Distancer(object):
     distancer = Distancer(gameState.getInitialLayout())
     distancer.getDistance((1, 1), (10, 10))
     ```
+
+    By default, `Distancer.getMazeDistances` computes the distances between all pairs of positions.
+    A lazy distancer instead runs a BFS from a position the first time it is queried,
+    keeping the results for (at most) `maxRows` positions.
+    This makes startup instant and memory bounded on huge layouts
+    where only a few positions (your own, the ghosts', the border) are ever queried.
     """
 
-    def __init__(self, layout):
+    def __init__(self, layout, lazy = False, maxRows = DEFAULT_MAX_ROWS):
         self._distances = None
+        self._lazy = lazy
+        self._maxRows = maxRows
         self.dc = DistanceCalculator(layout, self)
 
     def getMazeDistances(self):
@@ -31,6 +64,12 @@ class Distancer(object):
         if (self._distances is None):
             return manhattan(pos1, pos2)
 
+        # Open cells and the midpoints between them (where half-speed agents stop) are precomputed.
+        snaps1 = self._distances.getSnaps(pos1)
+        snaps2 = self._distances.getSnaps(pos2)
+        if (snaps1 is not None and snaps2 is not None):
+            return self._distances.getSnapDistance(snaps1, snaps2)
+
         if isInt(pos1) and isInt(pos2):
             return self.getDistanceOnGrid(pos1, pos2)
 
@@ -48,11 +87,56 @@ class Distancer(object):
         return bestDistance
 
     def getDistanceOnGrid(self, pos1, pos2):
-        key = (pos1, pos2)
-        if key in self._distances:
-            return self._distances[key]
+        return self._distances.getDistance(pos1, pos2)
+
+    def getDistancesTo(self, pos, targets):
+        """
+        Get the distances from one position to each of the targets, as a NumPy array.
+        When all the positions are on the grid, this is a single lookup into the distance table
+        instead of a `Distancer.getDistance` call per target.
+        """
+
+        if (self._distances is not None):
+            distances = self._distances.getDistancesFrom(pos, targets)
+            if (distances is not None):
+                return distances
+
+        return numpy.array([self.getDistance(pos, target) for target in targets])
+
+    def getKNearestTargets(self, pos, targets, k):
+        """
+        Get the (at most) k targets closest to a position, nearest first,
+        and a NumPy array of their distances.
+        Ties go to the target that comes first in `targets`.
+        """
+
+        distances = self.getDistancesTo(pos, targets)
+        order = numpy.argsort(distances, kind = 'stable')[:k]
+
+        return [targets[index] for index in order], distances[order]
+
+    def getNearestTarget(self, pos, targets):
+        """
+        Get the target closest to a position and its distance.
+        Ties go to the target that comes first in `targets`.
+        Raises a ValueError if there are no targets.
+        """
 
-        raise Exception("Position not in grid: " + str(key))
+        distances = self.getDistancesTo(pos, targets)
+        index = int(numpy.argmin(distances))
+
+        return targets[index], distances[index].item()
+
+    def getStats(self):
+        """
+        Get the row cache stats (see `LazyDistanceTable.getStats`) of a lazy distancer,
+        or None if this distancer is not lazy or not ready.
+        """
+
+        if (not isinstance(self._distances, LazyDistanceTable)):
+            return None
+
+        return self._distances.getStats()
 
     def isReadyForMazeDistance(self):
         return (self._distances is not None)
@@ -78,79 +162,449 @@ def getGrids1D(x):
 # MACHINERY FOR COMPUTING MAZE DISTANCES #
 ##########################################
 
-distanceMap = {}
+# Distances are shared by every distancer in the process (all agents in all games),
+# keyed by (a copy of) the walls they were computed on.
+# Kept in least-recently-used order.
+_cache = collections.OrderedDict()
+
+class AbstractDistanceTable(abc.ABC):
+    """
+    Maze distances between the open positions on a layout.
+
+    Each open position gets a cell id (its index in column-major order),
+    and distances from a cell are handed out as rows indexed by cell id.
+    """
+
+    def __init__(self, positions):
+        self._positions = positions
+        self._indexes = {position: index for (index, position) in enumerate(positions)}
+
+        # For each open cell and each midpoint between two adjacent open cells,
+        # the cells it snaps to and the distance to each of them.
+        self._snaps = {}
+        for (index, (x, y)) in enumerate(positions):
+            self._snaps[(x, y)] = ((index, 0),)
+
+            for (other, midpoint) in (((x + 1, y), (x + 0.5, y)), ((x, y + 1), (x, y + 0.5))):
+                otherIndex = self._indexes.get(other)
+                if (otherIndex is not None):
+                    self._snaps[midpoint] = ((index, 0.5), (otherIndex, 0.5))
+
+    def getDistance(self, pos1, pos2):
+        index1 = self._indexes.get(pos1)
+        index2 = self._indexes.get(pos2)
+
+        if (index1 is None or index2 is None):
+            raise Exception("Position not in grid: " + str((pos1, pos2)))
+
+        return self.getIndexDistance(index1, index2)
+
+    def getDistancesFrom(self, position, targets):
+        """
+        Get the distances from a position to each target as a NumPy array,
+        or None if any of the positions is not open.
+        """
+
+        source = self._indexes.get(position)
+        if (source is None):
+            return None
+
+        indexes = self.getIndexes(targets)
+        if (indexes is None):
+            return None
+
+        distances = self.getRow(source)[indexes].astype(int)
+        distances[distances == UNREACHABLE] = DEFAULT_DISTANCE
+
+        return distances
+
+    def getIndex(self, position):
+        """
+        Get the cell id of a position, or None if the position is not open.
+        """
+
+        return self._indexes.get(position)
+
+    def getIndexes(self, positions):
+        """
+        Get the cell ids of several positions as a NumPy array,
+        or None if any of the positions is not open.
+        """
+
+        indexes = numpy.fromiter((self._indexes.get(position, -1) for position in positions),
+                dtype = numpy.intp, count = len(positions))
+
+        if (len(indexes) > 0 and indexes.min() < 0):
+            return None
+
+        return indexes
+
+    def getPositions(self):
+        """
+        Get the open positions, ordered by cell id.
+        """
+
+        return self._positions
+
+    @abc.abstractmethod
+    def getIndexDistance(self, index1, index2):
+        """
+        Get the distance between two cells (by id),
+        `DEFAULT_DISTANCE` if there is no path between them.
+        """
+
+        pass
+
+    @abc.abstractmethod
+    def getRow(self, source):
+        """
+        Get the distances (as a NumPy array indexed by cell id) from the cell with the given id.
+        Cells without a path to the source hold `UNREACHABLE`.
+        """
+
+        pass
+
+    def getSnapDistance(self, snaps1, snaps2):
+        """
+        Get the distance between two sets of snaps (see `AbstractDistanceTable.getSnaps`).
+        """
+
+        if (len(snaps1) == 1 and len(snaps2) == 1):
+            return self.getIndexDistance(snaps1[0][0], snaps2[0][0])
+
+        bestDistance = DEFAULT_DISTANCE
+        for (index1, offset1) in snaps1:
+            for (index2, offset2) in snaps2:
+                distance = self.getIndexDistance(index1, index2) + offset1 + offset2
+                if (distance < bestDistance):
+                    bestDistance = distance
+
+        return bestDistance
+
+    def getSnaps(self, position):
+        """
+        Get the (cell id, distance) pairs a position snaps to,
+        or None if the position is neither an open cell
+        nor exactly halfway between two adjacent open cells.
+        """
+
+        return self._snaps.get(position)
+
+    def __contains__(self, position):
+        return position in self._indexes
+
+    def __len__(self):
+        return len(self._positions)
+
+class DistanceTable(AbstractDistanceTable):
+    """
+    The maze distances between every pair of open positions,
+    in a dense matrix indexed by cell id.
+    """
+
+    def __init__(self, positions, matrix):
+        super().__init__(positions)
+        self._matrix = matrix
+
+        # Scalar lookups on a plain array (even a view of a memmap) are much cheaper.
+        self._array = matrix.view(numpy.ndarray)
+
+    def getIndexDistance(self, index1, index2):
+        distance = self._array.item(index1, index2)
+        if (distance == UNREACHABLE):
+            return DEFAULT_DISTANCE
+
+        return distance
+
+    def getMatrix(self):
+        """
+        Get the (cell id x cell id) distance matrix.
+        Pairs without a path between them hold `UNREACHABLE`.
+        """
+
+        return self._matrix
+
+    def getRow(self, source):
+        return self._array[source]
+
+    # Override
+    def getSnapDistance(self, snaps1, snaps2):
+        # The same as the parent, but without a method call per lookup.
+        item = self._array.item
+
+        if (len(snaps1) == 1 and len(snaps2) == 1):
+            distance = item(snaps1[0][0], snaps2[0][0])
+            if (distance == UNREACHABLE):
+                return DEFAULT_DISTANCE
+
+            return distance
+
+        bestDistance = DEFAULT_DISTANCE
+        for (index1, offset1) in snaps1:
+            for (index2, offset2) in snaps2:
+                distance = item(index1, index2)
+                if (distance != UNREACHABLE and distance + offset1 + offset2 < bestDistance):
+                    bestDistance = distance + offset1 + offset2
+
+        return bestDistance
+
+class LazyDistanceTable(AbstractDistanceTable):
+    """
+    Maze distances computed one source at a time.
+
+    The first query from a position runs a BFS from that position and keeps the resulting row.
+    Since distances are symmetric, a query can be answered by the row of either position.
+    At most `maxRows` rows are kept, the least recently used row is evicted first.
+    """
+
+    def __init__(self, layout, maxRows = DEFAULT_MAX_ROWS):
+        if (maxRows < 1):
+            raise ValueError('A lazy distance table needs room for at least one row.')
+
+        super().__init__(layout.walls.asList(False))
+
+        self._adjacency = _buildAdjacency(self._positions, self._indexes)
+        self._maxRows = maxRows
+
+        self._rows = collections.OrderedDict()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def getIndexDistance(self, index1, index2):
+        # Distances are symmetric, so either position's row will do.
+        if (index1 not in self._rows and index2 in self._rows):
+            index1, index2 = index2, index1
+
+        distance = self.getRow(index1).item(index2)
+        if (distance == UNREACHABLE):
+            return DEFAULT_DISTANCE
+
+        return distance
+
+    def getRow(self, source):
+        row = self._rows.get(source)
+        if (row is not None):
+            self._hits += 1
+            self._rows.move_to_end(source)
+            return row
+
+        self._misses += 1
+
+        dist = _bfs(self._adjacency, source)
+        row = numpy.array(dist, dtype = numpy.uint16 if (len(dist) < UNREACHABLE) else numpy.uint32)
+        self._rows[source] = row
+
+        if (len(self._rows) > self._maxRows):
+            self._rows.popitem(last = False)
+            self._evictions += 1
+
+        return row
+
+    def getStats(self):
+        """
+        Get a dict with the number of row cache hits, misses, evictions,
+        and the number of rows currently held.
+        """
+
+        return {
+            'hits': self._hits,
+            'misses': self._misses,
+            'evictions': self._evictions,
+            'rows': len(self._rows),
+        }
 
 class DistanceCalculator:
     def __init__(self, layout, distancer):
         self.layout = layout
         self.distancer = distancer
-        self.cache = {}
 
     def run(self):
-        if self.layout.walls not in self.cache:
-            self.cache[self.layout.walls] = computeDistances(self.layout)
+        if (self.distancer._lazy):
+            self.distancer._distances = LazyDistanceTable(self.layout, self.distancer._maxRows)
+        else:
+            self.distancer._distances = getDistances(self.layout)
+
+def clearCache():
+    """
+    Forget all the distances computed so far.
+    """
+
+    _cache.clear()
+
+def getDistances(layout):
+    """
+    Get the distances between all pairs of positions in the layout,
+    computing them only if no layout with the same walls has been seen before.
+    """
+
+    distances = _cache.get(layout.walls)
+    if (distances is not None):
+        _cache.move_to_end(layout.walls)
+        return distances
 
-        self.distancer._distances = self.cache[self.layout.walls]
+    distances = loadDistances(layout)
+    if (distances is None):
+        distances = computeDistances(layout)
+        saveDistances(layout, distances)
+
+    _cache[layout.walls.copy()] = distances
+    while (len(_cache) > MAX_CACHED_LAYOUTS):
+        _cache.popitem(last = False)
+
+    return distances
 
 def computeDistances(layout):
     """
-    Runs UCS to all other positions from each position.
+    Runs a BFS to all other positions from each position and collects the results in a
+    `DistanceTable`.
     """
 
-    distances = {}
-    allNodes = layout.walls.asList(False)
+    positions = layout.walls.asList(False)
+    indexes = {position: index for (index, position) in enumerate(positions)}
+    adjacency = _buildAdjacency(positions, indexes)
+    numCells = len(positions)
 
-    for source in allNodes:
-        dist = {}
-        closed = {}
+    dtype = numpy.uint16 if (numCells < UNREACHABLE) else numpy.uint32
+    matrix = numpy.empty((numCells, numCells), dtype = dtype)
 
-        for node in allNodes:
-            dist[node] = sys.maxsize
+    for source in range(numCells):
+        matrix[source] = _bfs(adjacency, source)
 
-        queue = priorityQueue.PriorityQueue()
-        queue.push(source, 0)
-        dist[source] = 0
+    return DistanceTable(positions, matrix)
 
-        while not queue.isEmpty():
-            node = queue.pop()
-            if node in closed:
-                continue
+def loadDistances(layout):
+    """
+    Load the distances for a layout from the on-disk cache.
+    The matrix is memory-mapped (read-only), so every process loading the same layout
+    shares the same pages.
+    Returns None if the distances are not cached, are from another cache version,
+    or fail their integrity check.
+    """
 
-            closed[node] = True
-            nodeDist = dist[node]
-            adjacent = []
-            x, y = node
+    if (not CACHE_DIR):
+        return None
 
-            if not layout.isWall((x, y + 1)):
-                adjacent.append((x, y + 1))
+    matrixPath, metaPath = _getCachePaths(layout)
+    if (not os.path.exists(metaPath)):
+        return None
 
-            if not layout.isWall((x, y - 1)):
-                adjacent.append((x, y - 1))
+    try:
+        with open(metaPath, 'r') as file:
+            meta = json.load(file)
 
-            if not layout.isWall((x + 1, y)):
-                adjacent.append((x + 1, y))
+        matrix = numpy.load(matrixPath, mmap_mode = 'r')
+    except (OSError, ValueError) as ex:
+        logging.warning('Ignoring unreadable distance cache file "%s": %s' % (matrixPath, ex))
+        return None
 
-            if not layout.isWall((x - 1, y)):
-                adjacent.append((x - 1, y))
+    positions = layout.walls.asList(False)
 
-            for other in adjacent:
-                if other not in dist:
-                    continue
+    if (not isinstance(meta, dict)
+            or meta.get('version') != CACHE_VERSION
+            or meta.get('dtype') != str(matrix.dtype)
+            or matrix.shape != (len(positions), len(positions))
+            or meta.get('checksum') != _checksum(matrix)):
+        logging.warning('Ignoring stale or corrupt distance cache file: "%s".' % (matrixPath))
+        return None
 
-                oldDist = dist[other]
-                newDist = nodeDist + 1
-                if newDist < oldDist:
-                    dist[other] = newDist
-                    queue.push(other, newDist)
+    return DistanceTable(positions, matrix)
 
-        for target in allNodes:
-            distances[(target, source)] = dist[target]
+def saveDistances(layout, distances):
+    """
+    Write the distances for a layout to the on-disk cache.
+    Failing to write the cache is not an error, the distances will just be computed again.
+    """
 
-    return distances
+    if (not CACHE_DIR):
+        return
+
+    matrix = distances.getMatrix()
+    meta = {
+        'version': CACHE_VERSION,
+        'dtype': str(matrix.dtype),
+        'checksum': _checksum(matrix),
+    }
+
+    matrixPath, metaPath = _getCachePaths(layout)
+
+    try:
+        os.makedirs(CACHE_DIR, exist_ok = True)
+
+        # The matrix goes first, so the metadata never vouches for a matrix that is not there.
+        _writeAtomic(matrixPath, lambda file: numpy.save(file, matrix))
+        _writeAtomic(metaPath, lambda file: file.write(json.dumps(meta).encode()))
+    except OSError as ex:
+        logging.debug('Unable to write distance cache file "%s": %s' % (matrixPath, ex))
+
+def _bfs(adjacency, source):
+    """
+    Get the distance from the source cell to every cell (by id),
+    `UNREACHABLE` for cells with no path to the source.
+    """
+
+    dist = [UNREACHABLE] * len(adjacency)
+    dist[source] = 0
+
+    # The queue only ever grows, so walking it in order is a BFS.
+    queue = [source]
+    for node in queue:
+        nextDist = dist[node] + 1
+        for other in adjacency[node]:
+            if (dist[other] == UNREACHABLE):
+                dist[other] = nextDist
+                queue.append(other)
+
+    return dist
+
+def _buildAdjacency(positions, indexes):
+    """
+    Get the cell ids of the open neighbors of each cell.
+    """
+
+    adjacency = []
+    for (x, y) in positions:
+        adjacent = ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y))
+        adjacency.append([indexes[other] for other in adjacent if other in indexes])
+
+    return adjacency
+
+def _checksum(matrix):
+    return zlib.crc32(numpy.ascontiguousarray(matrix))
+
+def _getCachePaths(layout):
+    """
+    Get the paths of the matrix and metadata files for a layout,
+    named after a digest of the layout's walls.
+    """
+
+    walls = layout.walls
+    text = '%d %d\n%s' % (walls.getWidth(), walls.getHeight(), walls)
+    key = hashlib.sha256(text.encode()).hexdigest()
+
+    base = os.path.join(CACHE_DIR, 'v%d-%s' % (CACHE_VERSION, key))
+    return base + '.npy', base + '.json'
+
+def _writeAtomic(path, write):
+    """
+    Write to a temp file next to the path and then move it into place,
+    so readers in other processes never see a partial file.
+    """
+
+    handle, tempPath = tempfile.mkstemp(dir = os.path.dirname(path))
+
+    try:
+        with os.fdopen(handle, 'wb') as file:
+            write(file)
+
+        os.replace(tempPath, path)
+    except BaseException:
+        os.remove(tempPath)
+        raise
 
 def getDistanceOnGrid(distances, pos1, pos2):
-    key = (pos1, pos2)
-    if key in distances:
-        return distances[key]
+    if (pos1 not in distances or pos2 not in distances):
+        return DEFAULT_DISTANCE
 
-    return DEFAULT_DISTANCE
+    return distances.getDistance(pos1, pos2)
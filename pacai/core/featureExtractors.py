@@ -5,8 +5,6 @@ Feature extractors for game states.
 import abc
 
 from pacai.core.actions import Actions
-from pacai.core.search import search
-from pacai.student.searchAgents import AnyFoodSearchProblem
 
 class FeatureExtractor(abc.ABC):
     """
@@ -38,8 +36,9 @@ class SimpleExtractor(FeatureExtractor):
 
     def getFeatures(self, state, action):
         # Extract the grid of food and wall locations and get the ghost locations.
-        food = state.getFood()
+        food = state.getFoodView()
         walls = state.getWalls()
+        moves = state.getInitialLayout().getMoveTable()
         ghosts = state.getGhostPositions()
 
         features = {}
@@ -52,14 +51,13 @@ class SimpleExtractor(FeatureExtractor):
 
         # Count the number of ghosts 1-step away.
         features["#-of-ghosts-1-step-away"] = sum((next_x, next_y) in
-                Actions.getLegalNeighbors(g, walls) for g in ghosts)
+                moves.getLegalNeighbors(g) for g in ghosts)
 
         # If there is no danger of ghosts then add the food feature.
         if not features["#-of-ghosts-1-step-away"] and food[next_x][next_y]:
             features["eats-food"] = 1.0
 
-        prob = AnyFoodSearchProblem(state, start = (next_x, next_y))
-        dist = len(search.bfs(prob))
+        dist = state.getFoodDistanceField().getDistance(next_x, next_y)
         if dist is not None:
             # Make the distance a number less than one otherwise the update will diverge wildly.
             features["closest-food"] = float(dist) / (walls.getWidth() * walls.getHeight())
@@ -0,0 +1,162 @@
+"""
+The maze distance from every cell to its nearest food.
+
+The field is built with a single BFS that starts from every food pellet at once,
+and then kept up-to-date as pellets are eaten:
+only the cells that were closest to the eaten pellet get their distances recomputed.
+"""
+
+import weakref
+
+# The distance stored for walls and for cells that cannot reach any food.
+UNREACHABLE = -1
+
+_adjacencies = weakref.WeakKeyDictionary()
+
+class FoodDistanceField(object):
+    """
+    The distance from each cell of a layout to the nearest food.
+
+    Distances are stored in a flat list in the same order as `pacai.core.grid.Grid`
+    (cell (x, y) lives at index x * height + y),
+    so reading a distance is a single list lookup.
+    """
+
+    def __init__(self, layout, foodPositions):
+        self._height = layout.getHeight()
+        self._adjacency = _getAdjacency(layout)
+
+        self._distances = [UNREACHABLE] * (layout.getWidth() * self._height)
+
+        queue = []
+        for (x, y) in foodPositions:
+            index = x * self._height + y
+            self._distances[index] = 0
+            queue.append(index)
+
+        self._bfs(queue)
+
+    def copy(self):
+        field = FoodDistanceField.__new__(FoodDistanceField)
+        field._height = self._height
+        field._adjacency = self._adjacency
+        field._distances = self._distances.copy()
+        return field
+
+    def eatFood(self, x, y):
+        """
+        Remove the food at (x, y) and update the distances.
+
+        Only cells that have the eaten pellet as (one of) their nearest food can change.
+        Those are all reachable from the pellet by only stepping to cells one further away,
+        so we collect them, clear them, and run a BFS seeded from the cells bordering them.
+        """
+
+        distances = self._distances
+        adjacency = self._adjacency
+
+        source = x * self._height + y
+        if (distances[source] != 0):
+            return
+
+        affected = [source]
+        affectedSet = {source}
+        for index in affected:
+            nextDistance = distances[index] + 1
+            for neighbor in adjacency[index]:
+                if (distances[neighbor] == nextDistance and neighbor not in affectedSet):
+                    affectedSet.add(neighbor)
+                    affected.append(neighbor)
+
+        for index in affected:
+            distances[index] = UNREACHABLE
+
+        # Bucket the affected cells by the best distance their unaffected neighbors offer.
+        buckets = {}
+        for index in affected:
+            best = None
+            for neighbor in adjacency[index]:
+                neighborDistance = distances[neighbor]
+                if (neighborDistance != UNREACHABLE
+                        and (best is None or neighborDistance + 1 < best)):
+                    best = neighborDistance + 1
+
+            if (best is not None):
+                buckets.setdefault(best, []).append(index)
+
+        if (len(buckets) == 0):
+            # No food left that these cells can reach.
+            return
+
+        # A BFS where the seeds start at different distances.
+        distance = min(buckets)
+        while (len(buckets) > 0):
+            for index in buckets.pop(distance, []):
+                if (distances[index] != UNREACHABLE):
+                    continue
+
+                distances[index] = distance
+                for neighbor in adjacency[index]:
+                    if (neighbor in affectedSet and distances[neighbor] == UNREACHABLE):
+                        buckets.setdefault(distance + 1, []).append(neighbor)
+
+            distance += 1
+
+    def getDistance(self, x, y):
+        """
+        Get the maze distance from (x, y) to the nearest food,
+        or None if (x, y) is a wall or there is no food it can reach.
+        """
+
+        distance = self._distances[x * self._height + y]
+        if (distance == UNREACHABLE):
+            return None
+
+        return distance
+
+    def getDistances(self):
+        """
+        Get the flat list of distances (see `FoodDistanceField`).
+        Walls and cells that cannot reach any food hold `UNREACHABLE`.
+        The caller should not modify the list.
+        """
+
+        return self._distances
+
+    def _bfs(self, queue):
+        distances = self._distances
+        adjacency = self._adjacency
+
+        # The queue only ever grows, so walking it in order is a BFS.
+        for index in queue:
+            nextDistance = distances[index] + 1
+            for neighbor in adjacency[index]:
+                if (distances[neighbor] == UNREACHABLE):
+                    distances[neighbor] = nextDistance
+                    queue.append(neighbor)
+
+def _getAdjacency(layout):
+    """
+    Get the (flat) indexes of the open neighbors of each cell in a layout,
+    shared by all the fields on that layout.
+    """
+
+    adjacency = _adjacencies.get(layout)
+    if (adjacency is not None):
+        return adjacency
+
+    walls = layout.walls
+    width = walls.getWidth()
+    height = walls.getHeight()
+
+    adjacency = [()] * (width * height)
+    for (x, y) in walls.asList(False):
+        neighbors = []
+        for (nextX, nextY) in ((x, y + 1), (x, y - 1), (x + 1, y), (x - 1, y)):
+            if (0 <= nextX < width and 0 <= nextY < height and not walls.get(nextX, nextY)):
+                neighbors.append(nextX * height + nextY)
+
+        adjacency[x * height + y] = tuple(neighbors)
+
+    _adjacencies[layout] = adjacency
+    return adjacency
@@ -165,6 +165,8 @@ class Game:
                 return False
 
             maxStartupTime = int(self.rules.getMaxStartupTime(agentIndex))
+            agent.setMoveWarningTime(self.rules.getMoveWarningTime(agentIndex))
+
             startTime = time.time()
 
             try:
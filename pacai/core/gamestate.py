@@ -1,9 +1,12 @@
 import abc
+import bisect
 import copy
 
+from pacai.core import zobrist
 from pacai.core.agentstate import AgentState
 from pacai.core.directions import Directions
-from pacai.util import util
+from pacai.core.foodDistance import FoodDistanceField
+from pacai.core.grid import GridView
 
 class AbstractGameState(abc.ABC):
     """
@@ -15,6 +18,17 @@ class AbstractGameState(abc.ABC):
     Only use the accessor methods to get data about the game state.
     """
 
+    # The fields that applying a move may change (see applyMove()).
+    # Children with more of these fields should extend this.
+    _MOVE_FIELDS = ('_lastAgentMoved', '_gameover', '_win', '_hash', '_zobristHash',
+            '_food', '_foodList', '_foodCopied', '_lastFoodEaten', '_foodField', '_foodFieldBase',
+            '_capsules', '_capsulesCopied', '_lastCapsuleEaten',
+            '_agentStates', '_score')
+
+    # The fields that hold the food (see _copyFood()).
+    # Children with more of these fields should extend this.
+    _FOOD_FIELDS = ('_food', '_foodList')
+
     def __init__(self, layout):
         self._lastAgentMoved = None
         self._gameover = False
@@ -22,28 +36,53 @@ class AbstractGameState(abc.ABC):
 
         self._layout = layout
 
-        # Keep a copy of the hash, since it is expensive to compute.
-        # Any children should be sure to clear the hash when modifications are made.
+        # The hash is built from Zobrist keys (see `pacai.core.zobrist`).
+        # The board part of the hash (food, capsules, score, and game over) is kept up-to-date
+        # as the state changes, and agents keep their own hashes.
+        # Any children should still be sure to clear the combined hash when modifications are made.
         self._hash = None
+        self._zobrist = zobrist.getTable(layout)
+        self._zobristHash = self._zobrist.endKey(False, False) ^ self._zobrist.scoreKey(0)
 
         # For food and capsules, we will only copy on write (if we eat one of them).
         # This avoid additional copies on successors that don't eat.
+        # The initial state owns its own copies.
 
-        self._foodCopied = False
+        self._foodCopied = True
         self._food = layout.food.copy()
         self._lastFoodEaten = None
 
-        self._capsulesCopied = False
+        # The food positions, kept alongside the grid (and copied along with it).
+        # Kept sorted, which is the same order as Grid.asList().
+        self._foodList = self._food.asList()
+
+        # The distance to the nearest food is built on first use (see getFoodDistanceField()).
+        # Once built, eating just records the eaten pellets against the last field we built
+        # and the field is brought up-to-date (on a copy) the next time it is asked for.
+        self._foodField = None
+        self._foodFieldBase = None
+
+        self._capsulesCopied = True
         self._capsules = layout.capsules.copy()
         self._lastCapsuleEaten = None
 
+        for (x, y) in self._foodList:
+            self._zobristHash ^= self._zobrist.foodKey(x, y)
+
+        for (x, y) in self._capsules:
+            self._zobristHash ^= self._zobrist.capsuleKey(x, y)
+
         # An ordered list of locations that this state considers special.
         # A view may choose to specially represent these locations.
         self._highlightLocations = []
 
+        # Successors share agent states with their parent until they need to modify them.
+        self._agentStatesCopied = []
         self._agentStates = []
         for (isPacman, position) in layout.agentPositions:
-            self._agentStates.append(AgentState(position, Directions.STOP, isPacman))
+            self._agentStates.append(AgentState(position, Directions.STOP, isPacman,
+                    zobrist = self._zobrist, index = len(self._agentStates)))
+            self._agentStatesCopied.append(True)
 
         self._score = 0
 
@@ -64,9 +103,61 @@ class AbstractGameState(abc.ABC):
 
         pass
 
+    def generateAllSuccessors(self, agentIndex, lazy = False):
+        """
+        Returns an (action, successor) pair for each of the agent's legal actions
+        (in the same order as getLegalActions()).
+        Like generateSuccessor(), each successor is a SHALLOW copy that has been modified.
+
+        The work that is the same for every successor (checking the game is not over,
+        finding the legal actions, marking this state's fields to be copied on write,
+        and checking whether the agent is close enough to anyone to collide) is only done once,
+        and the moves are not checked for legality again.
+
+        With `lazy`, the pairs are made one at a time by an iterator,
+        so a search that cuts off early does not pay for the successors it never looks at.
+        This state should not be changed while the iterator is in use.
+        """
+
+        # Check that successors exist.
+        if (self.isOver()):
+            raise RuntimeError("Can't generate successors of a terminal state.")
+
+        successors = self._iterateSuccessors(agentIndex)
+        if (lazy):
+            return successors
+
+        return list(successors)
+
+    def applyMove(self, agentIndex, action):
+        """
+        Apply the action for the specified agent to this state (in place),
+        and return a record that can be passed to undoMove() to get this exact state back.
+
+        This is an alternative to generateSuccessor() for searches that walk the game tree
+        depth-first, since they can use a single state instead of allocating one per node.
+        Moves must be undone in the reverse order that they were applied.
+        """
+
+        if (self.isOver()):
+            raise RuntimeError("Can't apply a move to a terminal state.")
+
+        values = self.__dict__
+        record = {name: values[name] for name in self._MOVE_FIELDS}
+
+        # Agents and capsules changed by the move will be copied first,
+        # so the record still holds the originals.
+        # Only food is modified in place (if this state already owns it), see undoMove().
+        self._agentStates = self._agentStates.copy()
+        self._agentStatesCopied = [False] * len(self._agentStates)
+        self._capsulesCopied = False
+
+        self._applySuccessorAction(agentIndex, action)
+
+        return record
+
     def addScore(self, score):
-        self._hash = None
-        self._score += score
+        self.setScore(self._score + score)
 
     def eatCapsule(self, x, y):
         """
@@ -83,6 +174,7 @@ class AbstractGameState(abc.ABC):
         self._capsules.remove((x, y))
         self._lastCapsuleEaten = (x, y)
 
+        self._zobristHash ^= self._zobrist.capsuleKey(x, y)
         self._hash = None
         return True
 
@@ -95,16 +187,42 @@ class AbstractGameState(abc.ABC):
             return False
 
         if (not self._foodCopied):
-            self._food = self._food.copy()
-            self._foodCopied = True
+            self._copyFood()
 
-        self._food[x][y] = False
+        self._food.set(x, y, False)
+        del self._foodList[bisect.bisect_left(self._foodList, (x, y))]
         self._lastFoodEaten = (x, y)
 
+        if (self._foodField is not None):
+            self._foodFieldBase = (self._foodField, ((x, y),))
+            self._foodField = None
+        elif (self._foodFieldBase is not None):
+            field, eaten = self._foodFieldBase
+            self._foodFieldBase = (field, eaten + ((x, y),))
+
+        self._zobristHash ^= self._zobrist.foodKey(x, y)
         self._hash = None
         return True
 
+    def editAgentState(self, index):
+        """
+        Get the state of the given agent so that it can be modified.
+
+        Agent states are shared between a state and its successors until one of them changes,
+        so any code that modifies an agent state (e.g. game rules) must fetch it through here
+        instead of through getAgentState().
+        """
+
+        if (not self._agentStatesCopied[index]):
+            self._agentStates[index] = self._agentStates[index].copy()
+            self._agentStatesCopied[index] = True
+
+        return self._agentStates[index]
+
     def endGame(self, win):
+        self._zobristHash ^= (self._zobrist.endKey(self._gameover, self._win)
+                ^ self._zobrist.endKey(True, win))
+
         self._gameover = True
         self._win = win
 
@@ -125,6 +243,12 @@ class AbstractGameState(abc.ABC):
         return tuple(int(pos) for pos in position)
 
     def getAgentState(self, index):
+        """
+        Get the state of the given agent.
+        This state may be shared with other game states, so callers should not modify it
+        (see editAgentState()).
+        """
+
         return self._agentStates[index]
 
     def getAgentStates(self):
@@ -144,11 +268,57 @@ class AbstractGameState(abc.ABC):
         Grids can be accessed via list notation.
         So to check if there is food at (x, y), just do something like: food[x][y].
 
-        Callers should favor hasFood() over this, since this will make a copy of the grid.
+        Callers should favor hasFood() or getFoodView() over this,
+        since this will make a copy of the grid.
         """
 
         return self._food.copy()
 
+    def getFoodDistanceField(self):
+        """
+        Returns a `pacai.core.foodDistance.FoodDistanceField`
+        with the maze distance from every cell to the nearest remaining food.
+
+        The field is shared with other states (that have the same food),
+        so callers should not modify it.
+        """
+
+        if (self._foodField is None):
+            if (self._foodFieldBase is not None):
+                field, eaten = self._foodFieldBase
+                field = field.copy()
+                for (x, y) in eaten:
+                    field.eatFood(x, y)
+            else:
+                field = FoodDistanceField(self._layout, self._foodList)
+
+            self._foodField = field
+            self._foodFieldBase = None
+
+        return self._foodField
+
+    def getFoodList(self):
+        """
+        Returns a list of positions (x, y) of the remaining food,
+        in the same order as `pacai.core.grid.Grid.asList`.
+
+        This list is not a copy (it is kept up-to-date as food is eaten),
+        so callers should not modify it.
+        """
+
+        return self._foodList
+
+    def getFoodView(self):
+        """
+        Returns a read-only `pacai.core.grid.GridView` of the food (no copy is made).
+        Trying to write to the view will raise an error,
+        use getFood() to get a grid that can be modified.
+        """
+
+        # This state may only change the grid behind the view after copying it.
+        self._foodCopied = False
+        return GridView(self._food)
+
     def getHighlightLocations(self):
         return self._highlightLocations
 
@@ -188,7 +358,7 @@ class AbstractGameState(abc.ABC):
         Get the amount of food left on the board.
         """
 
-        return self._food.count()
+        return len(self._foodList)
 
     def getScore(self):
         return self._score
@@ -217,14 +387,14 @@ class AbstractGameState(abc.ABC):
         Returns true if the location (x, y) has food.
         """
 
-        return self._food[x][y]
+        return self._food.get(x, y)
 
     def hasWall(self, x, y):
         """
         Returns true if (x, y) has a wall, false otherwise.
         """
 
-        return self._layout.walls[x][y]
+        return self._layout.walls.get(x, y)
 
     def isLose(self):
         return self.isOver() and not self._win
@@ -239,9 +409,66 @@ class AbstractGameState(abc.ABC):
         self._highlightLocations = list(locations)
 
     def setScore(self, score):
+        self._zobristHash ^= self._zobrist.scoreKey(self._score) ^ self._zobrist.scoreKey(score)
+
         self._score = score
         self._hash = None
 
+    def undoMove(self, record):
+        """
+        Undo a move made with applyMove().
+        """
+
+        # Successors and views handed out since the move was applied share the food
+        # and capsules with this state (and nothing in the record knows about them).
+        foodShared = (self._food is record['_food'] and not self._foodCopied)
+        capsules = self._capsules
+
+        fields = record
+        if (self._food is record['_food'] and self._lastFoodEaten != record['_lastFoodEaten']):
+            # The food was eaten in place, so put it back.
+            # If it has been shared since, put it back on a copy and keep that copy.
+            if (foodShared):
+                self._copyFood()
+                foodShared = False
+
+                fields = {name: value for (name, value) in record.items()
+                        if (name != '_foodCopied' and name not in self._FOOD_FIELDS)}
+
+            self._restoreFood(*self._lastFoodEaten)
+
+        self.__dict__.update(fields)
+
+        # Anything that may be shared has to be copied before it is written to.
+        self._agentStatesCopied = [False] * len(self._agentStates)
+
+        if (foodShared):
+            self._foodCopied = False
+
+        # applyMove() always marks the capsules, so there is no telling if they were shared.
+        if (self._capsules is capsules):
+            self._capsulesCopied = False
+
+    @abc.abstractmethod
+    def _applySuccessorAction(self, agentIndex, action, validate = True, checkCollisions = True):
+        """
+        Apply the action to the context state (self).
+        Without `validate`, the action is assumed to be legal.
+        Without `checkCollisions`, the agent is assumed to be too far from anyone to collide
+        (see _canCollide()).
+        """
+
+        pass
+
+    def _canCollide(self, agentIndex):
+        """
+        Check if a move by the given agent could end in a collision with another agent.
+        Children that know how far agents move and how close they must be to collide
+        should override this, so collisions can be skipped for agents that are far apart.
+        """
+
+        return True
+
     def _initSuccessor(self):
         """
         Get a state that will eventually serve as a successor.
@@ -252,15 +479,62 @@ class AbstractGameState(abc.ABC):
         successor = copy.copy(self)
         successor._hash = None
 
-        # Leave food and capsules as a shallow copy, but mark them to be copied on write.
+        # Leave food and capsules as a shallow copy, but mark them to be copied on write
+        # (on both sides, since this state may still be changed with applyMove()).
         successor._foodCopied = False
         successor._capsulesCopied = False
+        self._foodCopied = False
+        self._capsulesCopied = False
 
-        # Agent states need to be deep copied.
-        successor._agentStates = [agentState.copy() for agentState in self._agentStates]
+        # Share the agent states, but mark them to be copied on write (on both sides).
+        successor._agentStates = self._agentStates.copy()
+        successor._agentStatesCopied = [False] * len(self._agentStates)
+        self._agentStatesCopied = [False] * len(self._agentStates)
 
         return successor
 
+    def _iterateSuccessors(self, agentIndex):
+        """
+        Make the successors for generateAllSuccessors(), one at a time.
+        """
+
+        actions = self.getLegalActions(agentIndex)
+        checkCollisions = self._canCollide(agentIndex)
+
+        # Mark food, capsules, and agent states to be copied on write (see _initSuccessor()),
+        # once for all the successors.
+        self._foodCopied = False
+        self._capsulesCopied = False
+        self._agentStatesCopied = [False] * len(self._agentStates)
+
+        for action in actions:
+            successor = copy.copy(self)
+            successor._hash = None
+            successor._agentStates = self._agentStates.copy()
+            successor._agentStatesCopied = [False] * len(self._agentStates)
+
+            successor._applySuccessorAction(agentIndex, action,
+                    validate = False, checkCollisions = checkCollisions)
+
+            yield (action, successor)
+
+    def _copyFood(self):
+        """
+        Take a copy of the food (that this state owns), so it can be changed.
+        """
+
+        self._food = self._food.copy()
+        self._foodList = self._foodList.copy()
+        self._foodCopied = True
+
+    def _restoreFood(self, x, y):
+        """
+        Put back food that was eaten in place.
+        """
+
+        self._food.set(x, y, True)
+        bisect.insort(self._foodList, (x, y))
+
     def __eq__(self, other):
         if (other is None):
             return False
@@ -289,7 +563,10 @@ class AbstractGameState(abc.ABC):
 
     def __hash__(self):
         if (self._hash is None):
-            self._hash = util.buildHash(self._score, self._gameover, self._win, *self._capsules,
-                self._food, *self._agentStates, self._layout)
+            hashCode = self._zobristHash
+            for agentState in self._agentStates:
+                hashCode ^= hash(agentState)
+
+            self._hash = hash(hashCode)
 
         return self._hash
@@ -1,8 +1,18 @@
+_BITS_TABLE = bytes.maketrans(b'\x00\x01', b'01')
+
 class Grid:
     """
-    A 2-dimensional array of objects backed by a list of lists.
+    A 2-dimensional array of booleans backed by a single packed byte buffer.
     Data is accessed via grid[x][y] where (x, y) are positions on a Pacman map with x horizontal,
     y vertical and the origin (0, 0) in the bottom left corner.
+
+    Cells are stored column-major (cell (x, y) lives at index x * height + y),
+    so copies, comparisons, and counts are single buffer operations instead of
+    loops over every cell.
+    `grid[x]` hands out a read-only view of column x,
+    so writes go through `Grid.set` (or replace a whole column with `grid[x] = column`),
+    which keeps the cached hash valid.
+    Hot paths should prefer `Grid.get`, which skips building the view.
     """
 
     def __init__(self, width, height, initialValue = False):
@@ -11,39 +21,64 @@ class Grid:
 
         self._width = width
         self._height = height
-        self._data = [[initialValue for y in range(height)] for x in range(width)]
+        self._cells = bytearray([initialValue]) * (width * height)
+
+        # Both of these are built lazily.
+        self._hash = None
+        self._columns = None
 
     def asList(self, key = True):
+        needle = 1 if key else 0
         values = []
 
-        for x in range(self._width):
-            for y in range(self._height):
-                if self[x][y] == key:
-                    values.append((x, y))
+        index = self._cells.find(needle)
+        while (index != -1):
+            values.append(divmod(index, self._height))
+            index = self._cells.find(needle, index + 1)
 
         return values
 
     def copy(self):
-        grid = Grid(self._width, self._height)
-        grid._data = [row.copy() for row in self._data]
+        grid = Grid.__new__(Grid)
+        grid._width = self._width
+        grid._height = self._height
+        grid._cells = self._cells.copy()
+        grid._hash = self._hash
+        grid._columns = None
         return grid
 
-    def count(self, item =True):
-        return sum([x.count(item) for x in self._data])
+    def count(self, item = True):
+        return self._cells.count(1 if item else 0)
 
     def deepCopy(self):
         return self.copy()
 
+    def get(self, x, y):
+        """
+        Get the value at (x, y) without going through a column view.
+        Unlike grid[x][y], the coordinates are not bounds checked.
+        """
+
+        return self._cells[x * self._height + y] == 1
+
     def getHeight(self):
         return self._height
 
     def getWidth(self):
         return self._width
 
+    def set(self, x, y, value):
+        """
+        Set the value at (x, y) without going through a column view.
+        """
+
+        self._cells[x * self._height + y] = 1 if value else 0
+        self._hash = None
+
     def shallowCopy(self):
-        grid = Grid(self._width, self._height)
-        grid._data = self._data
-        return grid
+        # Sharing cells with a writable grid would let equal grids hash differently,
+        # so this is a full copy (it is a single buffer copy anyways).
+        return self.copy()
 
     def _cellIndexToPosition(self, index):
         x = index / self._height
@@ -51,34 +86,91 @@ class Grid:
 
         return x, y
 
+    def _getColumn(self, x):
+        height = self._height
+
+        if (self._columns is None):
+            view = memoryview(self._cells)
+            if (not hasattr(view, 'toreadonly')):
+                # Python < 3.8 cannot make a read-only view of a writable buffer,
+                # so hand out a copy of the column instead.
+                start = range(self._width)[x] * height
+                return memoryview(bytes(self._cells[start:start + height])).cast('?')
+
+            view = view.toreadonly().cast('?')
+            self._columns = [view[i * height:(i + 1) * height] for i in range(self._width)]
+
+        return self._columns[x]
+
     def __eq__(self, other):
         if (other is None):
             return False
 
-        return self._data == other._data
+        return (self._width == other._width
+                and self._height == other._height
+                and self._cells == other._cells)
 
     def __getitem__(self, i):
-        return self._data[i]
+        return self._getColumn(i)
 
-    def __hash__(self):
-        hashcode = 0
-        base = 1
+    def __getstate__(self):
+        # Memory views cannot be pickled, they will be rebuilt on demand.
+        state = self.__dict__.copy()
+        state['_columns'] = None
+        return state
 
-        for row in self._data:
-            for value in row:
-                if (value):
-                    hashcode += base
-                base *= 2
+    def __hash__(self):
+        if (self._hash is None):
+            # Read the cells as one big binary number where (x, y) is bit (x * height + y).
+            bits = self._cells[::-1].translate(_BITS_TABLE)
+            self._hash = hash(int(bits or b'0', 2))
 
-        return hash(hashcode)
+        return self._hash
 
     def __lt__(self, other):
         return self.__hash__() < other.__hash__()
 
     def __setitem__(self, key, item):
-        self._data[key] = item
+        if (len(item) != self._height):
+            raise ValueError('Grid columns must have exactly %d values.' % (self._height))
+
+        start = range(self._width)[key] * self._height
+        self._cells[start:start + self._height] = bytes(1 if value else 0 for value in item)
+        self._hash = None
 
     def __str__(self):
-        out = [[str(self._data[x][y])[0] for x in range(self._width)] for y in range(self._height)]
+        out = [[str(self.get(x, y))[0] for x in range(self._width)] for y in range(self._height)]
         out.reverse()
         return '\n'.join([''.join(x) for x in out])
+
+class GridView(Grid):
+    """
+    A read-only view of a grid's cells.
+    No cells are copied, the view reads straight from the grid it was made from.
+
+    Reads work just like they do on a `Grid`, but any write (`GridView.set`, `view[x] = ...`,
+    or `view[x][y] = ...`) raises a TypeError.
+    `GridView.copy` returns a regular (writable) `Grid`.
+
+    A view is only as stable as the grid behind it,
+    so owners should stop writing to a grid once they have handed out a view of it.
+    """
+
+    def __init__(self, grid):
+        self._width = grid._width
+        self._height = grid._height
+        self._cells = grid._cells
+        self._hash = grid._hash
+        self._columns = None
+
+    # Override
+    def set(self, x, y, value):
+        raise TypeError('Grid views are read-only.')
+
+    # Override
+    def shallowCopy(self):
+        return GridView(self)
+
+    # Override
+    def __setitem__(self, key, item):
+        raise TypeError('Grid views are read-only.')
@@ -1,6 +1,7 @@
 import os
 import random
 
+from pacai.core.actions import MoveTable
 from pacai.core.distance import manhattan
 from pacai.core.grid import Grid
 
@@ -26,12 +27,25 @@ class Layout(object):
 
         self.processLayoutText(layoutText, maxGhosts)
 
+        # Built on first use.
+        self._moveTable = None
+
+    def getMoveTable(self):
+        """
+        Get the `pacai.core.actions.MoveTable` for this layout's walls.
+        """
+
+        if (self._moveTable is None):
+            self._moveTable = MoveTable(self.walls)
+
+        return self._moveTable
+
     def getNumGhosts(self):
         return self.numGhosts
 
     def isWall(self, pos):
         x, col = pos
-        return self.walls[x][col]
+        return self.walls.get(x, col)
 
     def getHeight(self):
         return self.height
@@ -104,9 +118,9 @@ class Layout(object):
 
     def processLayoutChar(self, x, y, layoutChar, maxGhosts):
         if (layoutChar == '%'):
-            self.walls[x][y] = True
+            self.walls.set(x, y, True)
         elif (layoutChar == '.'):
-            self.food[x][y] = True
+            self.food.set(x, y, True)
         elif (layoutChar == 'o'):
             self.capsules.append((x, y))
         elif (layoutChar == 'P'):
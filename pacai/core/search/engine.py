@@ -0,0 +1,299 @@
+"""
+A search engine for `pacai.core.search.problem.SearchProblem`s.
+
+Unlike the textbook versions (which carry a full path around with every frontier entry),
+the engine stores each search node once in a `NodeTable` with a pointer to its parent,
+and only rebuilds the path for the goal.
+Closed sets hold `pacai.core.search.problem.SearchProblem.encodeState` keys instead of states.
+
+Every search records `SearchStats` on the problem (see
+`pacai.core.search.problem.SearchProblem.getSearchStats`).
+Any of the searches can be picked by `pacai.agents.search.base.SearchAgent`, e.g.:
+`--agent-args fn=pacai.core.search.engine.astar,heuristic=pacai.core.search.heuristic.manhattan`.
+"""
+
+import collections
+import time
+import tracemalloc
+
+from pacai.core.search.heuristic import null as nullHeuristic
+from pacai.util.priorityQueue import IndexedPriorityQueue
+
+# How much more the heuristic counts than the path cost in weighted A*.
+DEFAULT_WEIGHT = 2.0
+
+class NodeTable(object):
+    """
+    All the search nodes generated by a search, stored in parallel lists indexed by node id.
+    Each node only knows its parent and the action that led to it,
+    paths are rebuilt by following parents back to the start.
+    """
+
+    def __init__(self):
+        self.states = []
+        self.parents = []
+        self.actions = []
+        self.costs = []
+
+    def add(self, state, parent, action, cost):
+        """
+        Add a node and return its id.
+        """
+
+        self.states.append(state)
+        self.parents.append(parent)
+        self.actions.append(action)
+        self.costs.append(cost)
+
+        return len(self.states) - 1
+
+    def getPath(self, nodeId):
+        """
+        Get the actions that lead from the start to the given node.
+        """
+
+        path = []
+        while (self.parents[nodeId] is not None):
+            path.append(self.actions[nodeId])
+            nodeId = self.parents[nodeId]
+
+        path.reverse()
+        return path
+
+    def __len__(self):
+        return len(self.states)
+
+class SearchStats(object):
+    """
+    Counters collected during a single search.
+    """
+
+    def __init__(self, algorithm):
+        self.algorithm = algorithm
+
+        # States that had their successors generated.
+        self.expanded = 0
+
+        # Successors that were added to (or improved in) the frontier.
+        self.generated = 0
+
+        # The most nodes that were in the frontier at once.
+        self.peakFrontier = 0
+
+        # The total number of nodes created (the size of the `NodeTable`).
+        self.numNodes = 0
+
+        # The peak memory (in bytes) allocated during the search (over what was in use before it),
+        # only measured if the search was asked to track memory.
+        self.peakMemory = None
+
+        self.pathLength = None
+        self.pathCost = None
+        self.seconds = 0.0
+
+    def getNodesPerSecond(self):
+        if (self.seconds == 0):
+            return 0.0
+
+        return self.expanded / self.seconds
+
+    def __str__(self):
+        text = ('%s: expanded %d nodes (%.0f/s), generated %d, peak frontier %d, %d nodes in %.3fs'
+                % (self.algorithm, self.expanded, self.getNodesPerSecond(), self.generated,
+                    self.peakFrontier, self.numNodes, self.seconds))
+
+        if (self.peakMemory is not None):
+            text += ', peak memory %.1f KiB' % (self.peakMemory / 1024)
+
+        return text
+
+def aStarSearch(problem, heuristic = nullHeuristic, trackMemory = False):
+    """
+    Search the node that has the lowest combined cost and heuristic first.
+    """
+
+    return bestFirstSearch(problem, lambda state, cost: cost + heuristic(state, problem),
+            'A*', trackMemory = trackMemory)
+
+def bestFirstSearch(problem, priorityFunction, algorithm = 'best-first', trackMemory = False):
+    """
+    A graph search that always expands the frontier node with the lowest priority,
+    where `priorityFunction(state, cost)` gives the priority of a state reached with a path cost.
+    Each state is kept in the frontier only once, finding a cheaper path to it updates it in place.
+
+    Returns the actions to the first goal expanded, or None if there is no path to a goal.
+    """
+
+    stats, memory = _startSearch(problem, algorithm, trackMemory)
+    encode = problem.encodeState
+
+    nodes = NodeTable()
+    frontier = IndexedPriorityQueue()
+
+    # {key: node id} for every state in the frontier.
+    openNodes = {}
+    closed = set()
+
+    start = problem.startingState()
+    startKey = encode(start)
+    openNodes[startKey] = nodes.add(start, None, None, 0)
+    frontier.push(startKey, priorityFunction(start, 0))
+
+    path = None
+    while (not frontier.isEmpty()):
+        key = frontier.pop()
+        nodeId = openNodes.pop(key)
+        state = nodes.states[nodeId]
+
+        if (problem.isGoal(state)):
+            path = nodes.getPath(nodeId)
+            stats.pathCost = nodes.costs[nodeId]
+            break
+
+        closed.add(key)
+        stats.expanded += 1
+
+        cost = nodes.costs[nodeId]
+        for (successor, action, stepCost) in problem.successorStates(state):
+            successorKey = encode(successor)
+            if (successorKey in closed):
+                continue
+
+            successorCost = cost + stepCost
+
+            existing = openNodes.get(successorKey)
+            if (existing is not None and nodes.costs[existing] <= successorCost):
+                continue
+
+            openNodes[successorKey] = nodes.add(successor, nodeId, action, successorCost)
+            frontier.push(successorKey, priorityFunction(successor, successorCost))
+            stats.generated += 1
+
+        if (len(frontier) > stats.peakFrontier):
+            stats.peakFrontier = len(frontier)
+
+    return _finishSearch(problem, stats, memory, nodes, path)
+
+def breadthFirstSearch(problem, trackMemory = False):
+    """
+    Search the shallowest nodes in the search tree first.
+    Goals are checked when they are generated, so the search stops as soon as one is seen.
+
+    Returns the actions to the goal, or None if there is no path to a goal.
+    """
+
+    stats, memory = _startSearch(problem, 'BFS', trackMemory)
+    encode = problem.encodeState
+
+    nodes = NodeTable()
+    frontier = collections.deque()
+
+    start = problem.startingState()
+    seen = {encode(start)}
+    startId = nodes.add(start, None, None, 0)
+
+    path = None
+    if (problem.isGoal(start)):
+        path = []
+        stats.pathCost = 0
+    else:
+        frontier.append(startId)
+
+    while (len(frontier) > 0 and path is None):
+        nodeId = frontier.popleft()
+        cost = nodes.costs[nodeId]
+        stats.expanded += 1
+
+        for (successor, action, stepCost) in problem.successorStates(nodes.states[nodeId]):
+            successorKey = encode(successor)
+            if (successorKey in seen):
+                continue
+
+            seen.add(successorKey)
+            successorId = nodes.add(successor, nodeId, action, cost + stepCost)
+            stats.generated += 1
+
+            if (problem.isGoal(successor)):
+                path = nodes.getPath(successorId)
+                stats.pathCost = cost + stepCost
+                break
+
+            frontier.append(successorId)
+
+        if (len(frontier) > stats.peakFrontier):
+            stats.peakFrontier = len(frontier)
+
+    return _finishSearch(problem, stats, memory, nodes, path)
+
+def greedySearch(problem, heuristic = nullHeuristic, trackMemory = False):
+    """
+    Search the node with the lowest heuristic first (ignoring the cost to get there).
+    """
+
+    return bestFirstSearch(problem, lambda state, cost: heuristic(state, problem),
+            'greedy', trackMemory = trackMemory)
+
+def uniformCostSearch(problem, trackMemory = False):
+    """
+    Search the node of least total cost first.
+    """
+
+    return bestFirstSearch(problem, lambda state, cost: cost, 'UCS', trackMemory = trackMemory)
+
+def weightedAStarSearch(problem, heuristic = nullHeuristic, weight = DEFAULT_WEIGHT,
+        trackMemory = False):
+    """
+    A* with the heuristic scaled up by a weight (>= 1).
+    Paths may cost up to `weight` times the optimal cost, but far fewer nodes are usually expanded.
+    """
+
+    return bestFirstSearch(problem, lambda state, cost: cost + weight * heuristic(state, problem),
+            'weighted A* (w = %s)' % (weight), trackMemory = trackMemory)
+
+def _finishSearch(problem, stats, memory, nodes, path):
+    stats.seconds = time.perf_counter() - stats.seconds
+    stats.numNodes = len(nodes)
+
+    if (path is not None):
+        stats.pathLength = len(path)
+
+    if (memory is not None):
+        startMemory, startedTracing = memory
+        stats.peakMemory = max(0, tracemalloc.get_traced_memory()[1] - startMemory)
+
+        if (startedTracing):
+            tracemalloc.stop()
+
+    problem._searchStats = stats
+    return path
+
+def _startSearch(problem, algorithm, trackMemory):
+    """
+    Get the stats for a new search (timing starts now),
+    and if memory is being tracked, the memory in use now and if we started tracing it.
+    """
+
+    memory = None
+    if (trackMemory):
+        startedTracing = not tracemalloc.is_tracing()
+        if (startedTracing):
+            tracemalloc.start()
+        elif (hasattr(tracemalloc, 'reset_peak')):
+            # Someone else is tracing, so the peak may be from before the search.
+            # Before Python 3.9 the peak can not be reset, and is only an upper bound.
+            tracemalloc.reset_peak()
+
+        memory = (tracemalloc.get_traced_memory()[0], startedTracing)
+
+    stats = SearchStats(algorithm)
+    stats.seconds = time.perf_counter()
+
+    return stats, memory
+
+# Abbreviations
+
+astar = aStarSearch
+bfs = breadthFirstSearch
+greedy = greedySearch
+ucs = uniformCostSearch
+wastar = weightedAStarSearch
@@ -1,3 +1,4 @@
+from pacai.core import distanceCalculator
 from pacai.core.actions import Actions
 from pacai.core.directions import Directions
 from pacai.core.search.problem import SearchProblem
@@ -16,7 +17,7 @@ class FoodSearchProblem(SearchProblem):
     def __init__(self, startingGameState):
         super().__init__()
 
-        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFood())
+        self.start = (startingGameState.getPacmanPosition(), startingGameState.getFoodView())
         self.walls = startingGameState.getWalls()
         self.startingGameState = startingGameState
         self.heuristicInfo = {}  # A dictionary for the heuristic to store information
@@ -40,7 +41,7 @@ class FoodSearchProblem(SearchProblem):
             nextx, nexty = int(x + dx), int(y + dy)
             if not self.walls[nextx][nexty]:
                 nextFood = state[1].copy()
-                nextFood[nextx][nexty] = False
+                nextFood.set(nextx, nexty, False)
                 successors.append((((nextx, nexty), nextFood), direction, 1))
 
         return successors
@@ -62,3 +63,94 @@ class FoodSearchProblem(SearchProblem):
             cost += 1
 
         return cost
+
+class BitmaskFoodSearchProblem(FoodSearchProblem):
+    """
+    A `FoodSearchProblem` that stores the remaining food as an integer bitmask instead of a grid.
+
+    The food is numbered once (see `BitmaskFoodSearchProblem.foodPositions`),
+    and a search state is a tuple (pacmanPosition, foodMask),
+    where bit i of foodMask is set while the i-th food is still on the board.
+    Creating and hashing successors never copies or hashes a grid.
+    Heuristics written for `FoodSearchProblem` (which expect a grid) need to use
+    `BitmaskFoodSearchProblem.getFoodPositions` instead,
+    e.g. `pacai.core.search.heuristic.farthestFood`.
+    """
+
+    def __init__(self, startingGameState):
+        super().__init__(startingGameState)
+
+        self.foodPositions = list(startingGameState.getFoodList())
+        self._bits = {position: (1 << i) for (i, position) in enumerate(self.foodPositions)}
+
+        self.start = (startingGameState.getPacmanPosition(), (1 << len(self.foodPositions)) - 1)
+        self._layout = startingGameState.getInitialLayout()
+
+        # {position: [(next position, direction, mask of the food left after the move), ...]}
+        self._moves = {}
+
+        # {position: [(distance, bit), ...]} with the farthest food first.
+        self._farthest = {}
+
+    def getFarthestFoodDistance(self, state):
+        """
+        Get the maze distance from Pacman to the farthest remaining food (0 if there is none).
+        """
+
+        position, mask = state
+
+        order = self._farthest.get(position)
+        if (order is None):
+            distances = distanceCalculator.getDistances(self._layout).getDistancesFrom(
+                    position, self.foodPositions)
+            bits = [1 << i for i in range(len(self.foodPositions))]
+            order = sorted(zip(distances.tolist(), bits), reverse = True)
+            self._farthest[position] = order
+
+        for (distance, bit) in order:
+            if (mask & bit):
+                return distance
+
+        return 0
+
+    def getFoodPositions(self, mask):
+        """
+        Get the positions of the food left in a food mask.
+        """
+
+        return [position for (i, position) in enumerate(self.foodPositions) if (mask >> i) & 1]
+
+    def getNumFood(self, mask):
+        return bin(mask).count('1')
+
+    def isGoal(self, state):
+        return state[1] == 0
+
+    def successorStates(self, state):
+        """
+        Returns successor states, the actions they require, and a cost of 1.
+        """
+
+        self._numExpanded += 1
+
+        position, mask = state
+        moves = self._moves.get(position)
+        if (moves is None):
+            moves = self._getMoves(position)
+
+        return [((nextPosition, mask & keep), direction, 1)
+                for (nextPosition, direction, keep) in moves]
+
+    def _getMoves(self, position):
+        x, y = position
+        moves = []
+
+        for direction in [Directions.NORTH, Directions.SOUTH, Directions.EAST, Directions.WEST]:
+            dx, dy = Actions.directionToVector(direction)
+            nextx, nexty = int(x + dx), int(y + dy)
+            if not self.walls[nextx][nexty]:
+                keep = ~self._bits.get((nextx, nexty), 0)
+                moves.append(((nextx, nexty), direction, keep))
+
+        self._moves[position] = moves
+        return moves
@@ -12,6 +12,14 @@ def null(state, problem = None):
 
     return 0
 
+def farthestFood(state, problem):
+    """
+    This heuristic is the maze distance to the farthest remaining food
+    in a `pacai.core.search.food.BitmaskFoodSearchProblem`.
+    """
+
+    return problem.getFarthestFoodDistance(state)
+
 def manhattan(position, problem):
     """
     This heuristic is the manhattan distance to the goal.
@@ -37,4 +45,8 @@ def numFood(state, problem):
     This heuristic is the amount of food left to on the board.
     """
 
+    if (isinstance(state[1], int)):
+        # A food mask (see `pacai.core.search.food.BitmaskFoodSearchProblem`).
+        return bin(state[1]).count('1')
+
     return state[1].count()
@@ -0,0 +1,242 @@
+"""
+Junction graphs: layouts with their corridors collapsed into weighted edges.
+
+Most open cells in a maze are corridor cells with exactly two open neighbors,
+where a search has no real choice to make.
+A junction graph only keeps the cells where something can happen
+(junctions and dead ends) as nodes,
+and connects them with edges that remember the corridor (cells and actions) in between.
+"""
+
+import weakref
+
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.core.search.position import PositionSearchProblem
+from pacai.core.search.problem import SearchProblem
+
+_graphs = weakref.WeakKeyDictionary()
+
+class JunctionGraph(object):
+    """
+    The junction graph of a wall grid.
+
+    Nodes are open cells that do not have exactly two open neighbors
+    (plus one cell of any corridor that loops back on itself without a junction).
+    Each edge is a tuple: (end node, actions, cells),
+    where `cells` are the cells stepped on (ending with the end node)
+    and `actions` are the actions that step on them.
+    """
+
+    def __init__(self, walls):
+        self._walls = walls
+
+        # {(x, y): [(end, actions, cells), ...]}
+        self._edges = {}
+
+        # Nodes with only one way in (and out).
+        self._deadEnds = set()
+
+        corridors = set()
+        for position in walls.asList(False):
+            numNeighbors = len(self._getNeighbors(position))
+            if (numNeighbors == 2):
+                corridors.add(position)
+            else:
+                self._edges[position] = None
+
+            if (numNeighbors == 1):
+                self._deadEnds.add(position)
+
+        for node in list(self._edges):
+            self._addEdges(node, corridors)
+
+        # Whatever corridors are left are loops with no junctions on them.
+        while (len(corridors) > 0):
+            node = min(corridors)
+            corridors.discard(node)
+            self._edges[node] = None
+            self._addEdges(node, corridors)
+
+    def getEdges(self, node):
+        """
+        Get the edges leaving a node.
+        """
+
+        return self._edges[node]
+
+    def getNodes(self):
+        return list(self._edges)
+
+    def isDeadEnd(self, position):
+        return position in self._deadEnds
+
+    def isNode(self, position):
+        return position in self._edges
+
+    def walk(self, position, action):
+        """
+        Walk from a position in the direction of the action,
+        following the corridor until reaching a node.
+        Returns an edge (see `JunctionGraph`).
+        """
+
+        x, y = position
+        dx, dy = Actions.directionToVector(action)
+        current = (int(x + dx), int(y + dy))
+
+        previous = position
+        actions = [action]
+        cells = [current]
+
+        while (current not in self._edges):
+            for (nextAction, neighbor) in self._getNeighbors(current):
+                if (neighbor != previous):
+                    break
+
+            previous = current
+            current = neighbor
+            actions.append(nextAction)
+            cells.append(current)
+
+        return (current, tuple(actions), tuple(cells))
+
+    def walkAll(self, position):
+        """
+        Get the edges from any open position (node or not) to the nodes around it.
+        """
+
+        edges = self._edges.get(position)
+        if (edges is not None):
+            return edges
+
+        return [self.walk(position, action) for (action, neighbor) in self._getNeighbors(position)]
+
+    def _addEdges(self, node, corridors):
+        edges = []
+        for (action, neighbor) in self._getNeighbors(node):
+            edge = self.walk(node, action)
+            corridors.difference_update(edge[2])
+            edges.append(edge)
+
+        self._edges[node] = edges
+
+    def _getNeighbors(self, position):
+        """
+        Get the (action, position) pairs for the open cells next to a position.
+        """
+
+        x, y = position
+        neighbors = []
+
+        for action in Directions.CARDINAL:
+            dx, dy = Actions.directionToVector(action)
+            nextX, nextY = int(x + dx), int(y + dy)
+
+            if (0 <= nextX < self._walls.getWidth() and 0 <= nextY < self._walls.getHeight()
+                    and not self._walls.get(nextX, nextY)):
+                neighbors.append((action, (nextX, nextY)))
+
+        return neighbors
+
+class JunctionSearchProblem(SearchProblem):
+    """
+    An adapter that searches a position-based problem (whose states are (x, y) positions)
+    over a `JunctionGraph`, so only nodes are expanded.
+
+    Each successor moves along an entire corridor, so its "action" is a tuple of actions;
+    `JunctionSearchProblem.expandActions` turns a search result back into per-step actions.
+    A corridor is cut short at any cell the wrapped problem considers a goal,
+    so goals inside corridors are still found.
+    Step costs come from the wrapped problem's `costFn` (if it has one) and are 1 otherwise.
+    Any other attribute (e.g. the `goal` that `pacai.core.search.heuristic.manhattan` uses)
+    is read from the wrapped problem, so heuristics written for it still work.
+    """
+
+    def __init__(self, problem, graph):
+        super().__init__()
+
+        self.problem = problem
+        self.graph = graph
+        self.costFn = getattr(problem, 'costFn', None)
+
+    def actionsCost(self, actions):
+        """
+        Returns the cost of a sequence of per-step actions (see `expandActions`).
+        """
+
+        return self.problem.actionsCost(actions)
+
+    # Override
+    def expandActions(self, actions):
+        if (actions is None):
+            return None
+
+        return [action for actions in actions for action in actions]
+
+    def isGoal(self, state):
+        return self.problem.isGoal(state)
+
+    def startingState(self):
+        return self.problem.startingState()
+
+    def successorStates(self, state):
+        successors = []
+
+        for (end, actions, cells) in self.graph.walkAll(state):
+            cost = 0
+            for (index, cell) in enumerate(cells):
+                cost += 1 if (self.costFn is None) else self.costFn(cell)
+
+                if (cell != end and self.problem.isGoal(cell)):
+                    # Stop at the goal, the search will pick it up from here.
+                    end = cell
+                    actions = actions[:index + 1]
+                    break
+
+            else:
+                # Walking into a dead end that is not a goal can only lead back out.
+                if (self.graph.isDeadEnd(end) and not self.problem.isGoal(end)):
+                    continue
+
+            successors.append((end, actions, cost))
+
+        # Bookkeeping for display purposes (the highlight in the GUI).
+        self._numExpanded += 1
+        if (state not in self._visitedLocations):
+            self._visitedLocations.add(state)
+            self._visitHistory.append(state)
+
+        return successors
+
+    def __getattr__(self, name):
+        # Only called for attributes this problem does not have.
+        # The wrapped problem itself is skipped, so unpickling can not recurse forever.
+        if (name == 'problem'):
+            raise AttributeError(name)
+
+        return getattr(self.problem, name)
+
+class JunctionPositionSearchProblem(JunctionSearchProblem):
+    """
+    A `pacai.core.search.position.PositionSearchProblem` searched over the layout's junctions.
+    Takes the same arguments as `pacai.core.search.position.PositionSearchProblem`,
+    so it can be used as a drop-in replacement (e.g. `SearchAgent`'s `prob` argument).
+    """
+
+    def __init__(self, gameState, **kwargs):
+        problem = PositionSearchProblem(gameState, **kwargs)
+        super().__init__(problem, getGraph(gameState.getInitialLayout()))
+
+def getGraph(layout):
+    """
+    Get the (shared) junction graph for a layout, building it if this is the first time we have
+    seen it.
+    """
+
+    graph = _graphs.get(layout)
+    if (graph is None):
+        graph = JunctionGraph(layout.walls)
+        _graphs[layout] = graph
+
+    return graph
@@ -32,6 +32,9 @@ class SearchProblem(abc.ABC):
         self._visitedLocations = set()
         self._visitHistory = []
 
+        # The stats of the last `pacai.core.search.engine` search run on this problem.
+        self._searchStats = None
+
     @abc.abstractmethod
     def actionsCost(self, actions):
         """
@@ -43,9 +46,36 @@ class SearchProblem(abc.ABC):
 
         pass
 
+    def encodeState(self, state):
+        """
+        Get a compact, hashable key for a state.
+        `pacai.core.search.engine` keeps these keys (instead of the states) in its closed sets,
+        so two states must only share a key if they are the same state.
+        By default, the state itself is the key.
+        """
+
+        return state
+
+    def expandActions(self, actions):
+        """
+        Turn the actions found by a search over this problem into a list of per-step actions
+        (`pacai.core.directions.Directions`).
+        Most problems already use per-step actions, so by default this does nothing.
+        """
+
+        return actions
+
     def getExpandedCount(self):
         return self._numExpanded
 
+    def getSearchStats(self):
+        """
+        Get the `pacai.core.search.engine.SearchStats` of the last engine search on this problem,
+        or None if there has not been one.
+        """
+
+        return self._searchStats
+
     def getVisitHistory(self):
         return self._visitHistory
 
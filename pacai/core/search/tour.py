@@ -0,0 +1,217 @@
+"""
+Tours: the shortest walk from a start position that visits every target (e.g. every food pellet).
+
+Since the walk between two targets is always a shortest path,
+a tour only has to pick the order of the targets,
+using the maze distances between them (see `pacai.core.distanceCalculator.getDistances`).
+Small tours are solved exactly with the Held-Karp dynamic program over subsets of targets,
+larger ones get a nearest neighbor tour improved by 2-opt.
+"""
+
+import numpy
+
+from pacai.core import distanceCalculator
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+
+# Held-Karp takes O(2^n * n^2) time and O(2^n * n) memory for n targets.
+DEFAULT_MAX_EXACT_TARGETS = 16
+
+# The most targets Held-Karp may ever be asked to solve (its tables take about 200MB at 20).
+MAX_EXACT_TARGETS = 20
+
+class Tour(object):
+    """
+    A walk from a start position through a list of targets (in order).
+    """
+
+    def __init__(self, start, targets, cost, actions, isExact):
+        self.start = start
+        self.targets = targets
+        self.cost = cost
+        self.actions = actions
+
+        # True if the tour is known to be the shortest one.
+        self.isExact = isExact
+
+def getPathActions(table, walls, start, end):
+    """
+    Get the actions of a shortest path between two positions,
+    or None if there is no path.
+    """
+
+    row = table.getRow(table.getIndex(end))
+    position = start
+    distance = int(row[table.getIndex(start)])
+
+    if (distance == distanceCalculator.UNREACHABLE):
+        return None
+
+    actions = []
+    while (distance > 0):
+        x, y = position
+
+        for action in Directions.CARDINAL:
+            dx, dy = Actions.directionToVector(action)
+            nextPosition = (int(x + dx), int(y + dy))
+
+            if (walls[nextPosition[0]][nextPosition[1]]):
+                continue
+
+            if (row[table.getIndex(nextPosition)] == distance - 1):
+                break
+
+        actions.append(action)
+        position = nextPosition
+        distance -= 1
+
+    return actions
+
+def heldKarp(matrix):
+    """
+    Get the shortest order to visit every target, starting from the start.
+    `matrix` holds the distances between the start (index 0) and the targets (1 to n).
+    Returns the order (as indexes into `matrix`, without the start) and its cost.
+
+    The dynamic program goes over subsets of targets (as bitmasks) by size,
+    where cost[subset, j] is the shortest walk from the start that visits exactly the subset
+    and ends at target j.
+    All the subsets of the same size are handled at once.
+    """
+
+    numTargets = len(matrix) - 1
+    if (numTargets == 0):
+        return [], 0
+
+    distances = numpy.asarray(matrix, dtype = numpy.int64)[1:, 1:]
+    numSubsets = 1 << numTargets
+
+    cost = numpy.full((numSubsets, numTargets), numpy.iinfo(numpy.int64).max // 2,
+            dtype = numpy.int64)
+    parent = numpy.full((numSubsets, numTargets), -1, dtype = numpy.min_scalar_type(-numTargets))
+
+    for j in range(numTargets):
+        cost[1 << j, j] = matrix[0][j + 1]
+
+    subsets = numpy.arange(numSubsets)
+    sizes = numpy.zeros(numSubsets, dtype = numpy.int64)
+    for j in range(numTargets):
+        sizes += (subsets >> j) & 1
+
+    for size in range(2, numTargets + 1):
+        layer = subsets[sizes == size]
+
+        for j in range(numTargets):
+            withJ = layer[(layer >> j) & 1 == 1]
+            previous = cost[withJ ^ (1 << j)] + distances[:, j]
+
+            best = previous.argmin(axis = 1)
+            cost[withJ, j] = previous[numpy.arange(len(withJ)), best]
+            parent[withJ, j] = best
+
+    subset = numSubsets - 1
+    last = int(cost[subset].argmin())
+    total = int(cost[subset, last])
+
+    order = []
+    while (last >= 0):
+        order.append(last + 1)
+        previous = int(parent[subset, last])
+        subset ^= 1 << last
+        last = previous
+
+    order.reverse()
+    return order, total
+
+def nearestNeighbor(matrix):
+    """
+    Get an order that always visits the closest unvisited target next.
+    Takes the same `matrix` as `heldKarp`, and returns the order and its cost.
+    """
+
+    unvisited = set(range(1, len(matrix)))
+    order = []
+    current = 0
+    total = 0
+
+    while (len(unvisited) > 0):
+        closest = min(unvisited, key = lambda target: (matrix[current][target], target))
+        total += matrix[current][closest]
+
+        unvisited.discard(closest)
+        order.append(closest)
+        current = closest
+
+    return order, total
+
+def solveTour(layout, start, targets, maxExactTargets = DEFAULT_MAX_EXACT_TARGETS):
+    """
+    Find a short tour of the targets from the start position on a layout.
+    The tour is exact if there are at most `maxExactTargets` targets
+    (which can be no more than `MAX_EXACT_TARGETS`).
+    Returns None if some target cannot be reached.
+    """
+
+    if (maxExactTargets > MAX_EXACT_TARGETS):
+        raise ValueError('Tours can be solved exactly for at most %d targets, not %d.'
+                % (MAX_EXACT_TARGETS, maxExactTargets))
+
+    table = distanceCalculator.getDistances(layout)
+    targets = list(targets)
+
+    indexes = table.getIndexes([start] + targets)
+    if (indexes is None):
+        return None
+
+    matrix = table.getRow(indexes[0])[indexes][numpy.newaxis, :]
+    if (len(targets) > 0):
+        matrix = numpy.vstack([matrix] + [table.getRow(index)[indexes] for index in indexes[1:]])
+
+    if ((matrix == distanceCalculator.UNREACHABLE).any()):
+        return None
+
+    matrix = matrix.astype(int).tolist()
+
+    isExact = (len(targets) <= maxExactTargets)
+    if (isExact):
+        order, cost = heldKarp(matrix)
+    else:
+        order, cost = twoOpt(matrix, nearestNeighbor(matrix)[0])
+
+    actions = []
+    position = start
+    for index in order:
+        actions += getPathActions(table, layout.walls, position, targets[index - 1])
+        position = targets[index - 1]
+
+    return Tour(start, [targets[index - 1] for index in order], cost, actions, isExact)
+
+def twoOpt(matrix, order):
+    """
+    Improve an order by reversing parts of it while that makes it shorter.
+    Takes the same `matrix` as `heldKarp`, and returns the improved order and its cost.
+    The tour does not return to the start, so the last target has no one after it.
+    """
+
+    path = [0] + list(order)
+    improved = True
+
+    while (improved):
+        improved = False
+
+        for i in range(1, len(path) - 1):
+            for j in range(i + 1, len(path)):
+                # Reverse path[i:j + 1].
+                before = matrix[path[i - 1]][path[i]]
+                after = matrix[path[i - 1]][path[j]]
+
+                if (j + 1 < len(path)):
+                    before += matrix[path[j]][path[j + 1]]
+                    after += matrix[path[i]][path[j + 1]]
+
+                if (after < before):
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+
+    total = sum(matrix[path[i]][path[i + 1]] for i in range(len(path) - 1))
+    return path[1:], total
@@ -0,0 +1,117 @@
+"""
+Zobrist hashing for game states.
+
+Every component of a state (a food pellet, a capsule, an agent being at a position, the score, ...)
+gets a random key, and the hash of a state is the XOR of the keys of all its components.
+Since XOR is its own inverse, a state can keep its hash up-to-date as it changes
+by XORing out the key of the old component and XORing in the key of the new one.
+This makes rehashing a successor O(1) instead of O(size of the board).
+"""
+
+import hashlib
+import random
+
+KEY_BITS = 64
+
+# Keys come from a private generator (and a keyed hash) with a fixed seed,
+# so hashing never disturbs the global random state and every process gets the same keys.
+SEED = 140
+
+# Tables by the (width, height) of the layouts they are for.
+_tables = {}
+
+class ZobristTable(object):
+    """
+    The random keys used to hash states on layouts of a single size.
+
+    Keys for board cells (food and capsules) are drawn up front,
+    all other keys are derived from the component itself the first time they are asked for.
+    Keys only depend on the layout's size and the component (not on the order they are asked for),
+    so every copy of a table (e.g. one unpickled in another process) hands out the same keys.
+    """
+
+    def __init__(self, width, height):
+        self._width = width
+        self._height = height
+
+        rng = random.Random(SEED)
+        numCells = width * height
+        self._foodKeys = [rng.getrandbits(KEY_BITS) for i in range(numCells)]
+        self._capsuleKeys = [rng.getrandbits(KEY_BITS) for i in range(numCells)]
+
+        self._keys = {}
+
+    def agentKey(self, agentIndex, position, direction, isPacman, scaredTimer):
+        """
+        The combined key for all the hashed fields of a single agent.
+        """
+
+        return (self.key('position', agentIndex, position)
+                ^ self.key('direction', agentIndex, direction)
+                ^ self.key('pacman', agentIndex, isPacman)
+                ^ self.key('scared', agentIndex, scaredTimer))
+
+    def capsuleKey(self, x, y):
+        return self._capsuleKeys[x * self._height + y]
+
+    def endKey(self, gameover, win):
+        return self.key('end', gameover, win)
+
+    def foodKey(self, x, y):
+        return self._foodKeys[x * self._height + y]
+
+    def key(self, *components):
+        """
+        Get the key for an arbitrary (hashable) component.
+        """
+
+        key = self._keys.get(components)
+        if (key is None):
+            text = repr(_normalize(components)).encode()
+            digest = hashlib.blake2b(text, digest_size = KEY_BITS // 8,
+                    key = str(SEED).encode()).digest()
+
+            key = int.from_bytes(digest, 'little')
+            self._keys[components] = key
+
+        return key
+
+    def scoreKey(self, score):
+        return self.key('score', score)
+
+    def __reduce__(self):
+        # Unpickled tables are looked up again instead of carrying their cached keys along.
+        return (_getTableForSize, (self._width, self._height))
+
+def getTable(layout):
+    """
+    Get the (shared) table for a layout, building it if this is the first time we have seen
+    a layout of its size.
+    """
+
+    return _getTableForSize(layout.getWidth(), layout.getHeight())
+
+def _getTableForSize(width, height):
+    table = _tables.get((width, height))
+    if (table is None):
+        table = ZobristTable(width, height)
+        _tables[(width, height)] = table
+
+    return table
+
+def _normalize(value):
+    """
+    Write equal components (e.g. the positions (1, 2) and (1.0, 2.0)) the same way,
+    since they must get the same key.
+    """
+
+    if (isinstance(value, tuple)):
+        return tuple(_normalize(item) for item in value)
+
+    if (isinstance(value, bool)):
+        return int(value)
+
+    if (isinstance(value, float) and value.is_integer()):
+        return int(value)
+
+    return value
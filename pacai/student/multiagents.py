@@ -65,7 +65,7 @@ class ReflexAgent(BaseAgent):
         newPosition = successorGameState.getPacmanPosition()
         newGhostStates = successorGameState.getGhostStates()
         currentGhostStates = currentGameState.getGhostStates()
-        newFoodStates = successorGameState.getFood().asList()
+        newFoodStates = successorGameState.getFoodList()
         score = 0
         ghost_dist = []
         ghost_dist2 = []
@@ -385,7 +385,7 @@ def betterEvaluationFunction(currentGameState):
 
     currentGhostStates = currentGameState.getGhostStates()
     currentPosition = currentGameState.getPacmanPosition()
-    currentFoodStates = currentGameState.getFood().asList()
+    currentFoodStates = currentGameState.getFoodList()
     score = 0
     min_scared = 0
     ghost_dist = []
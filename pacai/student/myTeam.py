@@ -33,7 +33,7 @@ class DefensiveReflexAgent(ReflexCaptureAgent):
         successor = self.getSuccessor(gameState, action)
         myState = successor.getAgentState(self.index)
         myPos = myState.getPosition()
-        foodList = self.getFood(successor).asList()
+        foodList = self.getFoodList(successor)
 
         # Computes whether we're on defense (1) or offense (0).
         features['onDefense'] = 1
@@ -172,7 +172,7 @@ class OffensiveReflexAgent(ReflexCaptureAgent):
         features['successorScore'] = self.getScore(successor)
 
         # Compute distance to the nearest food.
-        foodList = self.getFood(successor).asList()
+        foodList = self.getFoodList(successor)
 
         # This should always be True, but better safe than sorry.
         if (len(foodList) > 0):
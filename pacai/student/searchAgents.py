@@ -216,7 +216,7 @@ class ClosestDotSearchAgent(SearchAgent):
 
         currentState = state
 
-        while currentState.getFood().count() > 0:
+        while currentState.getNumFood() > 0:
             nextPathSegment = self.findPathToClosestDot(
                 currentState
             )  # The missing piece
@@ -276,13 +276,10 @@ class AnyFoodSearchProblem(PositionSearchProblem):
         super().__init__(gameState, goal=None, start=start)
 
         # Store the food for later reference.
-        self.food = gameState.getFood()
+        self.food = gameState.getFoodView()
 
     def isGoal(self, state):
-        if state in self.food.asList():
-            return True
-        else:
-            return False
+        return self.food.get(state[0], state[1])
 
 
 class ApproximateSearchAgent(BaseAgent):
@@ -1,8 +1,13 @@
 """
 Priority queue containers.
+
+All the queues here break ties between items with the same priority by insertion order
+(first in, first out), so items themselves are never compared.
 """
 
+import collections
 import heapq
+import itertools
 
 class PriorityQueue(object):
     """
@@ -13,17 +18,19 @@ class PriorityQueue(object):
 
     Note that this PriorityQueue does not allow you to change the priority of an item.
     However, you may insert the same item multiple times with different priorities.
+    See `IndexedPriorityQueue` for a queue that can change priorities.
     """
 
     def __init__(self):
         self.heap = []
+        self._counter = itertools.count()
 
     def push(self, item, priority):
-        pair = (priority, item)
-        heapq.heappush(self.heap, pair)
+        entry = (priority, next(self._counter), item)
+        heapq.heappush(self.heap, entry)
 
     def pop(self):
-        (priority, item) = heapq.heappop(self.heap)
+        (priority, count, item) = heapq.heappop(self.heap)
         return item
 
     def isEmpty(self):
@@ -56,3 +63,195 @@ class PriorityQueueWithFunction(PriorityQueue):
 
     def __len__(self):
         return len(self.heap)
+
+class IndexedPriorityQueue(object):
+    """
+    A binary heap that knows where each of its items is,
+    so the priority of an item already in the queue can be lowered (`decreaseKey`)
+    instead of pushing a duplicate.
+
+    Items must be hashable, and each item can only be in the queue once.
+    Pushing an item that is already in the queue keeps the lower of the two priorities.
+    """
+
+    def __init__(self):
+        # Parallel arrays: the heap is ordered by (priority, count).
+        self._priorities = []
+        self._counts = []
+        self._items = []
+
+        # {item: index in the heap}
+        self._positions = {}
+
+        self._counter = itertools.count()
+
+    def decreaseKey(self, item, priority):
+        """
+        Lower the priority of an item already in the queue.
+        Raises a KeyError if the item is not in the queue,
+        and a ValueError if the new priority is higher than the current one.
+        """
+
+        index = self._positions[item]
+        if (priority > self._priorities[index]):
+            raise ValueError('Cannot increase the priority of an item (%s -> %s).'
+                    % (self._priorities[index], priority))
+
+        self._priorities[index] = priority
+        self._siftUp(index)
+
+    def getPriority(self, item):
+        """
+        Get the priority of an item in the queue (or raise a KeyError).
+        """
+
+        return self._priorities[self._positions[item]]
+
+    def isEmpty(self):
+        return len(self._items) == 0
+
+    def pop(self):
+        item = self._items[0]
+        del self._positions[item]
+
+        lastPriority = self._priorities.pop()
+        lastCount = self._counts.pop()
+        lastItem = self._items.pop()
+
+        if (len(self._items) > 0):
+            self._priorities[0] = lastPriority
+            self._counts[0] = lastCount
+            self._items[0] = lastItem
+            self._positions[lastItem] = 0
+            self._siftDown(0)
+
+        return item
+
+    def push(self, item, priority):
+        index = self._positions.get(item)
+        if (index is not None):
+            if (priority < self._priorities[index]):
+                self._priorities[index] = priority
+                self._siftUp(index)
+
+            return
+
+        self._priorities.append(priority)
+        self._counts.append(next(self._counter))
+        self._items.append(item)
+        self._positions[item] = len(self._items) - 1
+        self._siftUp(len(self._items) - 1)
+
+    def _move(self, fromIndex, toIndex):
+        self._priorities[toIndex] = self._priorities[fromIndex]
+        self._counts[toIndex] = self._counts[fromIndex]
+        self._items[toIndex] = self._items[fromIndex]
+        self._positions[self._items[toIndex]] = toIndex
+
+    def _siftDown(self, index):
+        priorities = self._priorities
+        counts = self._counts
+
+        priority = priorities[index]
+        count = counts[index]
+        item = self._items[index]
+        size = len(priorities)
+
+        while (True):
+            child = 2 * index + 1
+            if (child >= size):
+                break
+
+            # Pick the smaller child.
+            right = child + 1
+            if (right < size and (priorities[right], counts[right])
+                    < (priorities[child], counts[child])):
+                child = right
+
+            if ((priority, count) <= (priorities[child], counts[child])):
+                break
+
+            self._move(child, index)
+            index = child
+
+        priorities[index] = priority
+        counts[index] = count
+        self._items[index] = item
+        self._positions[item] = index
+
+    def _siftUp(self, index):
+        priorities = self._priorities
+        counts = self._counts
+
+        priority = priorities[index]
+        count = counts[index]
+        item = self._items[index]
+
+        while (index > 0):
+            parent = (index - 1) // 2
+            if ((priorities[parent], counts[parent]) <= (priority, count)):
+                break
+
+            self._move(parent, index)
+            index = parent
+
+        priorities[index] = priority
+        counts[index] = count
+        self._items[index] = item
+        self._positions[item] = index
+
+    def __contains__(self, item):
+        return item in self._positions
+
+    def __len__(self):
+        return len(self._items)
+
+class BucketQueue(object):
+    """
+    A bucket (Dial) queue for small non-negative integer priorities,
+    like the path costs in most Pacman search problems.
+
+    There is one FIFO bucket per priority, so pushes are O(1)
+    and pops only have to skip over empty buckets.
+    Pops are cheapest when priorities never go below the last popped priority
+    (which is the case for searches with non-negative costs and consistent heuristics),
+    but any order of pushes is handled.
+    """
+
+    def __init__(self):
+        self._buckets = []
+
+        # No bucket below this one has any items in it.
+        self._minBucket = 0
+
+        self._size = 0
+
+    def isEmpty(self):
+        return self._size == 0
+
+    def pop(self):
+        if (self._size == 0):
+            raise IndexError('pop from an empty queue')
+
+        while (len(self._buckets[self._minBucket]) == 0):
+            self._minBucket += 1
+
+        self._size -= 1
+        return self._buckets[self._minBucket].popleft()
+
+    def push(self, item, priority):
+        if (not isinstance(priority, int) or priority < 0):
+            raise ValueError('Bucket queue priorities must be non-negative integers, got: %s.'
+                    % (str(priority)))
+
+        while (len(self._buckets) <= priority):
+            self._buckets.append(collections.deque())
+
+        self._buckets[priority].append(item)
+        self._size += 1
+
+        if (priority < self._minBucket):
+            self._minBucket = priority
+
+    def __len__(self):
+        return self._size
@@ -2,7 +2,9 @@
 
 import os
 import re
+import shutil
 import sys
+import tempfile
 import unittest
 
 TEST_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'tests')
@@ -22,6 +24,16 @@ def _collect_tests(suite, testCases = []):
     return testCases
 
 def main(pattern = None):
+    # Keep any distances the tests cache out of the user's own directories.
+    cacheDir = tempfile.mkdtemp()
+    os.environ['PACAI_DISTANCE_CACHE'] = cacheDir
+
+    try:
+        _run(pattern)
+    finally:
+        shutil.rmtree(cacheDir)
+
+def _run(pattern):
     runner = unittest.TextTestRunner(verbosity = 3)
     discoveredSuite = unittest.TestLoader().discover(TEST_DIR)
     testCases = _collect_tests(discoveredSuite)
@@ -28,6 +28,7 @@ def main():
 
         install_requires = [
             'imageio==2.5.0',
+            'numpy>=1.17',
         ],
 
         python_requires = '>=3.7',
@@ -0,0 +1,43 @@
+import unittest
+
+from pacai.core.actions import Actions
+from pacai.core.directions import Directions
+from pacai.core.layout import getLayout
+
+"""
+Test the precomputed move table against the direct computations.
+"""
+class MoveTableTest(unittest.TestCase):
+    def test_move_table(self):
+        layout = getLayout('mediumClassic')
+        walls = layout.walls
+        table = layout.getMoveTable()
+
+        for (x, y) in walls.asList(False):
+            # Include positions in between two cells.
+            for position in [(x, y), (x + 0.5, y), (x, y - 0.5)]:
+                for direction in Actions._directions:
+                    expected = Actions.getPossibleActions(position, direction, walls)
+                    self.assertEqual(expected, table.getPossibleActions(position, direction))
+
+                    if (Directions.STOP in expected):
+                        expected.remove(Directions.STOP)
+
+                    reverse = Actions.reverseDirection(direction)
+                    if (reverse in expected and len(expected) > 1):
+                        expected.remove(reverse)
+
+                    self.assertEqual(expected, table.getGhostActions(position, direction))
+
+                self.assertEqual(Actions.getLegalNeighbors(position, walls),
+                        table.getLegalNeighbors(position))
+
+    def test_move_table_copies(self):
+        table = getLayout('tinyMaze').getMoveTable()
+        actions = table.getPossibleActions((1, 1), Directions.STOP)
+
+        actions.clear()
+        self.assertNotEqual([], table.getPossibleActions((1, 1), Directions.STOP))
+
+if __name__ == '__main__':
+    unittest.main()
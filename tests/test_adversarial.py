@@ -0,0 +1,343 @@
+import random
+import time
+import unittest
+
+from pacai.agents.capture.mcts import TeamEvaluation
+from pacai.agents.ghost.directional import DirectionalGhost
+from pacai.bin import capture
+from pacai.bin import pacman
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PacmanGameState
+from pacai.core import eval
+from pacai.core.adversarial import alphabeta
+from pacai.core.adversarial import mcts
+from pacai.core.adversarial.alphabeta import AlphaBetaEngine
+from pacai.core.adversarial.alphabeta import EXACT
+from pacai.core.adversarial.expectimax import ExpectimaxEngine
+from pacai.core.adversarial.parallel import ParallelAlphaBeta
+from pacai.core.layout import getLayout
+
+def minimax(state, agentIndex, plies):
+    """
+    A plain minimax (Pacman maximizes), to check the engines against.
+    """
+
+    if (plies == 0 or state.isOver()):
+        return eval.score(state)
+
+    nextAgent = (agentIndex + 1) % state.getNumAgents()
+    values = [minimax(state.generateSuccessor(agentIndex, action), nextAgent, plies - 1)
+            for action in state.getLegalActions(agentIndex)]
+
+    if (agentIndex == 0):
+        return max(values)
+
+    return min(values)
+
+def expectimax(state, agentIndex, plies, ghostModels = {}, maximizer = 0):
+    """
+    A plain expectimax, to check the engines against.
+    """
+
+    if (plies == 0 or state.isOver()):
+        return eval.score(state)
+
+    nextAgent = (agentIndex + 1) % state.getNumAgents()
+
+    if (agentIndex == maximizer):
+        return max([expectimax(state.generateSuccessor(agentIndex, action), nextAgent,
+                plies - 1, ghostModels, maximizer)
+                for action in state.getLegalActions(agentIndex)])
+
+    if (agentIndex in ghostModels):
+        distribution = ghostModels[agentIndex].getDistribution(state)
+    else:
+        actions = state.getLegalActions(agentIndex)
+        distribution = {action: 1.0 / len(actions) for action in actions}
+
+    return sum(probability * expectimax(state.generateSuccessor(agentIndex, action), nextAgent,
+            plies - 1, ghostModels, maximizer) for (action, probability) in distribution.items())
+
+def _lost(state):
+    return float('-inf')
+
+def randomStates(layoutName, numStates, seed):
+    """
+    Get some (non-terminal) states from random games.
+    """
+
+    rng = random.Random(seed)
+    state = PacmanGameState(getLayout(layoutName))
+    states = []
+
+    while (len(states) < numStates):
+        agentIndex = 0
+        for i in range(rng.randint(0, 20) * state.getNumAgents()):
+            action = rng.choice(state.getLegalActions(agentIndex))
+            state = state.generateSuccessor(agentIndex, action)
+            agentIndex = (agentIndex + 1) % state.getNumAgents()
+
+            if (state.isOver()):
+                state = PacmanGameState(getLayout(layoutName))
+                agentIndex = 0
+
+        if (agentIndex == 0):
+            states.append(state)
+
+    return states
+
+"""
+Test the adversarial searches.
+"""
+class AlphaBetaTest(unittest.TestCase):
+    def test_same_value(self):
+        engine = AlphaBetaEngine(eval.score, maxDepth = 2)
+
+        for state in randomStates('smallClassic', 5, 11):
+            expected = minimax(state, 0, 2 * state.getNumAgents())
+
+            engine.search(state)
+            self.assertEqual(2, engine.getStats()['depth'])
+            self.assertEqual(expected, engine.getStats()['value'])
+
+            # A fresh engine (no table or history to help) agrees.
+            fresh = AlphaBetaEngine(eval.score, maxDepth = 2)
+            fresh.search(state)
+            self.assertEqual(expected, fresh.getStats()['value'])
+
+    def test_independent_of_history(self):
+        engine = AlphaBetaEngine(eval.score, maxDepth = 3)
+
+        # One engine over consecutive moves picks what a fresh engine would.
+        for state in randomStates('smallClassic', 6, 15):
+            action = engine.search(state)
+
+            fresh = AlphaBetaEngine(eval.score, maxDepth = 3)
+            self.assertEqual(fresh.search(state), action)
+            self.assertEqual(fresh.getStats()['value'], engine.getStats()['value'])
+
+    def test_hash_collision(self):
+        state = randomStates('smallClassic', 1, 17)[0]
+        plies = 2 * state.getNumAgents()
+        expected = minimax(state, 0, plies)
+
+        # Another state with the same hash must not be mistaken for this one.
+        engine = AlphaBetaEngine(eval.score, maxDepth = 2)
+        key = (hash(state), 0, ('another', 'state'))
+        engine._table[hash(state) % engine._tableSize] = (key, 0, plies, 12345, EXACT, None)
+
+        self.assertEqual(expected, engine.searchValue(state, 0, plies))
+
+        # While an entry for this very state is used.
+        key = (hash(state), 0, alphabeta._getVerificationKey(state))
+        engine._table[hash(state) % engine._tableSize] = (key, 0, plies, 12345, EXACT, None)
+        self.assertEqual(12345, engine.searchValue(state, 0, plies))
+
+    def test_state_restored(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        expected = state.generateSuccessor(0, state.getLegalActions(0)[0])
+
+        for timeLimit in [None, 0.01]:
+            copy = state.generateSuccessor(0, state.getLegalActions(0)[0])
+            engine = AlphaBetaEngine(eval.score, maxDepth = 2)
+            engine.search(copy, timeLimit = timeLimit)
+
+            self.assertEqual(expected, copy)
+            self.assertEqual(hash(expected), hash(copy))
+            self.assertEqual(expected.getFoodList(), copy.getFoodList())
+
+    def test_time_limit(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        engine = AlphaBetaEngine(eval.score, maxDepth = 50)
+
+        startTime = time.perf_counter()
+        action = engine.search(state, timeLimit = 0.2)
+
+        # Only a generous bound on the time, so a slow or busy machine does not fail it.
+        # A search that ignored the limit would take far longer than this to reach depth 50.
+        self.assertLess(time.perf_counter() - startTime, 10.0)
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertTrue(engine.getStats()['timedOut'])
+        self.assertGreaterEqual(engine.getStats()['depth'], 1)
+        self.assertLess(engine.getStats()['depth'], engine.maxDepth)
+
+    def test_bounded_table(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        expected = minimax(state, 0, 2 * state.getNumAgents())
+
+        engine = AlphaBetaEngine(eval.score, maxDepth = 2, tableSize = 7)
+        engine.search(state)
+        self.assertEqual(expected, engine.getStats()['value'])
+        self.assertEqual(7, len(engine._table))
+
+    def test_agent(self):
+        pacman.main(['--null-graphics', '--layout', 'smallClassic', '--num-games', '1',
+            '--pacman', 'IterativeDeepeningAlphaBetaAgent', '--agent-args', 'depth=2',
+            '--seed', '1'])
+
+class ExpectimaxTest(unittest.TestCase):
+    def test_same_value(self):
+        for state in randomStates('smallClassic', 4, 12):
+            ghostModels = {index: DirectionalGhost(index) for index in range(1, 3)}
+
+            for models in [{}, ghostModels]:
+                expected = expectimax(state, 0, 2 * state.getNumAgents(), models)
+
+                engine = ExpectimaxEngine(eval.score, maxDepth = 2, ghostModels = models)
+                engine.search(state)
+                self.assertAlmostEqual(expected, engine.getStats()['value'])
+
+                # Again, with everything cached.
+                engine.search(state)
+                self.assertAlmostEqual(expected, engine.getStats()['value'])
+                self.assertEqual(0, engine.getStats()['nodes'])
+
+    def test_other_root(self):
+        for state in randomStates('smallClassic', 4, 14):
+            engine = ExpectimaxEngine(eval.score, maxDepth = 2)
+
+            # Values cached for one root agent must not be used for another.
+            for agentIndex in [0, 1, 0]:
+                expected = expectimax(state, agentIndex, 2 * state.getNumAgents(),
+                        maximizer = agentIndex)
+
+                engine.search(state, agentIndex)
+                self.assertAlmostEqual(expected, engine.getStats()['value'])
+
+    def test_top_k(self):
+        state = randomStates('mediumClassic', 1, 13)[0]
+        ghostModels = {index: DirectionalGhost(index) for index in range(1, 3)}
+
+        full = ExpectimaxEngine(eval.score, maxDepth = 2, ghostModels = ghostModels)
+        full.search(state)
+
+        sampled = ExpectimaxEngine(eval.score, maxDepth = 2, ghostModels = ghostModels, topK = 1)
+        sampled.search(state)
+
+        self.assertLessEqual(sampled.getStats()['nodes'], full.getStats()['nodes'])
+
+        # The most likely move gets all the probability.
+        distribution = sampled.getDistribution(state, 1)
+        self.assertEqual(1, len(distribution))
+        self.assertEqual(1.0, distribution[0][1])
+
+        expected = ghostModels[1].getDistribution(state)
+        self.assertEqual(max(expected.values()), expected[distribution[0][0]])
+
+    def test_agent(self):
+        pacman.main(['--null-graphics', '--layout', 'smallClassic', '--num-games', '1',
+            '--pacman', 'CachedExpectimaxAgent',
+            '--agent-args', 'depth=2,ghost=DirectionalGhost,topK=2',
+            '--seed', '1'])
+
+class MCTSTest(unittest.TestCase):
+    def test_search(self):
+        layout = getLayout('defaultCapture')
+        state = CaptureGameState(layout, 1200)
+        expected = CaptureGameState(layout, 1200)
+
+        engine = mcts.MCTSEngine(TeamEvaluation(True), [0, 2], seed = 1)
+        action = engine.search(state, 0, maxIterations = 200)
+
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertEqual(200, engine.getStats()['iterations'])
+        self.assertEqual(201, engine.getStats()['treeSize'])
+        self.assertEqual(0.0, engine.getStats()['reuseRatio'])
+        self.assertEqual(200, sum(visits for (visits, reward) in engine.getRootStats().values()))
+
+        # Rollouts leave the tree's states alone.
+        self.assertEqual(expected, state)
+        self.assertEqual(expected.getBlueFoodList(), state.getBlueFoodList())
+
+    def test_reuse(self):
+        state = CaptureGameState(getLayout('defaultCapture'), 1200)
+
+        engine = mcts.MCTSEngine(TeamEvaluation(True), [0, 2], seed = 2)
+        engine.search(state, 0, maxIterations = 500)
+
+        # Follow the most visited moves for a full round.
+        node = engine._root
+        for agentIndex in range(state.getNumAgents()):
+            action = max(node.children, key = lambda action: node.children[action].visits)
+            state = state.generateSuccessor(agentIndex, action)
+            node = node.children[action]
+
+        engine.search(state, 0, maxIterations = 100)
+        stats = engine.getStats()
+
+        self.assertEqual(node, engine._root)
+        self.assertAlmostEqual(node.visits - 100, stats['reuseRatio'] * node.visits)
+        self.assertGreater(stats['reuseRatio'], 0.0)
+
+    def test_parallel(self):
+        state = CaptureGameState(getLayout('defaultCapture'), 1200)
+
+        parallel = mcts.ParallelMCTS(mcts.MCTSEngine(TeamEvaluation(True), [0, 2]), 1)
+        try:
+            action = parallel.search(state, 0, 0.1)
+        finally:
+            parallel.shutdown()
+
+        stats = parallel.getStats()
+        self.assertIn(action, state.getLegalActions(0))
+        self.assertEqual(1, stats['workers'])
+        self.assertGreaterEqual(stats['totalIterations'], stats['iterations'])
+
+    def test_agent(self):
+        capture.main(['--null-graphics', '--max-moves', '8',
+            '--red-args', 'first=pacai.agents.capture.mcts.MCTSCaptureAgent'])
+
+class ParallelAlphaBetaTest(unittest.TestCase):
+    def test_same_action(self):
+        parallel = ParallelAlphaBeta(eval.score, maxDepth = 3, numWorkers = 2)
+        rng = random.Random(16)
+        state = PacmanGameState(getLayout('smallClassic'))
+
+        # Play consecutive moves, so the workers' tables carry over from move to move.
+        try:
+            for i in range(8):
+                if (state.isOver()):
+                    break
+
+                sequential = AlphaBetaEngine(eval.score, maxDepth = 3)
+                action = sequential.search(state)
+
+                self.assertEqual(action, parallel.search(state))
+                self.assertEqual(sequential.getStats()['value'], parallel.getStats()['value'])
+                self.assertEqual(3, parallel.getStats()['depth'])
+
+                state = state.generateSuccessor(0, action)
+                for agentIndex in range(1, state.getNumAgents()):
+                    if (state.isOver()):
+                        break
+
+                    state = state.generateSuccessor(agentIndex,
+                            rng.choice(state.getLegalActions(agentIndex)))
+        finally:
+            parallel.shutdown()
+
+    def test_all_lost(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        expected = state.getLegalActions(0)[0]
+
+        self.assertEqual(expected, AlphaBetaEngine(_lost, maxDepth = 1).search(state))
+
+        parallel = ParallelAlphaBeta(_lost, maxDepth = 1, numWorkers = 1)
+        try:
+            self.assertEqual(expected, parallel.search(state))
+        finally:
+            parallel.shutdown()
+
+    def test_minimizer_root(self):
+        parallel = ParallelAlphaBeta(eval.score)
+        state = PacmanGameState(getLayout('smallClassic'))
+
+        self.assertRaises(ValueError, parallel.search, state, 1)
+
+    def test_agent(self):
+        pacman.main(['--null-graphics', '--layout', 'smallClassic', '--num-games', '1',
+            '--pacman', 'ParallelAlphaBetaAgent', '--agent-args', 'depth=1,numWorkers=1',
+            '--seed', '1'])
+
+if __name__ == '__main__':
+    unittest.main()
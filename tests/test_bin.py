@@ -3,6 +3,7 @@ import unittest
 from pacai.bin import capture
 from pacai.bin import gridworld
 from pacai.bin import pacman
+from pacai.bin import rollout
 
 """
 This is a test class to assess the executables of this project.
@@ -53,6 +54,15 @@ class BinTest(unittest.TestCase):
             if status.code != 0:
                 self.fail("Error occured when running --help.")
 
+    def test_rollout(self):
+        # Run a batch of random games, and check them against the normal engine.
+        rollout.main(['--quiet', '--layout', 'minimaxClassic', '--num-games', '50',
+            '--seed', '1234', '--conformance'])
+
+        batch = rollout.main(['--quiet', '--layout', 'capsuleClassic', '--num-games', '20',
+            '--seed', '1234', '--conformance'])
+        self.assertTrue(batch.isOver().all())
+
     def test_seeded_runs(self):
         # Run game of capture with seed entry.
         capture.main(['--null-graphics', '--seed', '1234'])
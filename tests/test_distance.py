@@ -0,0 +1,270 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+
+from pacai.core import distanceCalculator
+from pacai.core.layout import Layout
+from pacai.core.layout import getLayout
+from pacai.util.mazeGenerator import generateMaze
+
+"""
+Test maze distances.
+"""
+class DistancerTest(unittest.TestCase):
+    def setUp(self):
+        distanceCalculator.clearCache()
+
+        self._originalCacheDir = distanceCalculator.CACHE_DIR
+        self._cacheDir = tempfile.mkdtemp()
+        distanceCalculator.CACHE_DIR = self._cacheDir
+
+    def tearDown(self):
+        distanceCalculator.clearCache()
+
+        distanceCalculator.CACHE_DIR = self._originalCacheDir
+        shutil.rmtree(self._cacheDir)
+
+    def test_distances(self):
+        distancer = distanceCalculator.Distancer(getLayout('tinyMaze'))
+
+        # Before the distances are computed, fall back to manhattan distance.
+        self.assertEqual(8, distancer.getDistance((5, 5), (1, 1)))
+
+        distancer.getMazeDistances()
+        self.assertTrue(distancer.isReadyForMazeDistance())
+
+        self.assertEqual(0, distancer.getDistance((1, 1), (1, 1)))
+        self.assertEqual(8, distancer.getDistance((5, 5), (1, 1)))
+        self.assertEqual(8, distancer.getDistance((1, 1), (5, 5)))
+        self.assertEqual(3, distancer.getDistance((1, 1), (3, 2)))
+
+        # Positions in between cells.
+        self.assertEqual(7.5, distancer.getDistance((5, 5), (1.5, 1)))
+
+    def test_half_positions(self):
+        layout = getLayout('mediumCapture')
+        positions = layout.walls.asList(False)
+
+        distancer = distanceCalculator.Distancer(layout)
+        distancer.getMazeDistances()
+
+        def slowDistance(pos1, pos2):
+            bestDistance = distanceCalculator.DEFAULT_DISTANCE
+            for (snap1, offset1) in distanceCalculator.getGrids2D(pos1):
+                for (snap2, offset2) in distanceCalculator.getGrids2D(pos2):
+                    distance = distancer.getDistanceOnGrid(snap1, snap2) + offset1 + offset2
+                    bestDistance = min(bestDistance, distance)
+
+            return bestDistance
+
+        midpoints = [(x + 0.5, y) for (x, y) in positions if (x + 1, y) in positions]
+        midpoints += [(x, y + 0.5) for (x, y) in positions if (x, y + 1) in positions]
+
+        for midpoint in midpoints:
+            for other in positions[::5] + midpoints[::5]:
+                self.assertEqual(slowDistance(midpoint, other),
+                        distancer.getDistance(midpoint, other))
+                self.assertEqual(slowDistance(other, midpoint),
+                        distancer.getDistance(other, midpoint))
+
+        # Other fractions still work, they just do not have a precomputed entry.
+        (x, y) = midpoints[0]
+        self.assertEqual(slowDistance((x - 0.25, y), positions[0]),
+                distancer.getDistance((x - 0.25, y), positions[0]))
+
+    def test_distances_to(self):
+        layout = getLayout('mediumCapture')
+        positions = layout.walls.asList(False)
+        source = positions[0]
+        targets = positions[::7]
+
+        for lazy in [False, True]:
+            distancer = distanceCalculator.Distancer(layout, lazy = lazy)
+
+            # Before the distances are computed, fall back to manhattan distance.
+            distances = distancer.getDistancesTo(source, targets)
+            expected = [distancer.getDistance(source, target) for target in targets]
+            self.assertEqual(expected, distances.tolist())
+
+            distancer.getMazeDistances()
+
+            expected = [distancer.getDistance(source, target) for target in targets]
+            distances = distancer.getDistancesTo(source, targets)
+            self.assertIsInstance(distances, numpy.ndarray)
+            self.assertEqual(expected, distances.tolist())
+
+            nearest, distance = distancer.getNearestTarget(source, targets)
+            self.assertEqual(min(expected), distance)
+            self.assertEqual(targets[expected.index(min(expected))], nearest)
+
+            # Nearest first, ties broken by the order of the targets.
+            nearest, distances = distancer.getKNearestTargets(source, targets, 3)
+            order = sorted(range(len(targets)), key = lambda index: expected[index])[:3]
+            self.assertEqual([targets[index] for index in order], nearest)
+            self.assertEqual([expected[index] for index in order], distances.tolist())
+
+            # Positions in between cells go the slow way.
+            x, y = next((x, y) for (x, y) in positions if (x + 1, y) in positions)
+            expected = [distancer.getDistance((x + 0.5, y), target) for target in targets]
+            self.assertEqual(expected, distancer.getDistancesTo((x + 0.5, y), targets).tolist())
+
+            self.assertEqual(0, len(distancer.getDistancesTo(source, [])))
+            with self.assertRaises(ValueError):
+                distancer.getNearestTarget(source, [])
+
+    def test_distance_table(self):
+        # The right-most open cell is walled off from the rest.
+        layout = Layout([
+            '%%%%%%%',
+            '%P. %.%',
+            '%%%%%%%',
+        ])
+
+        table = distanceCalculator.getDistances(layout)
+        self.assertEqual(4, len(table))
+        self.assertEqual(numpy.uint16, table.getMatrix().dtype)
+        self.assertEqual(table.getPositions(), layout.walls.asList(False))
+
+        self.assertIn((1, 1), table)
+        self.assertNotIn((0, 0), table)
+        self.assertIsNone(table.getIndex((0, 0)))
+
+        self.assertEqual(2, table.getDistance((1, 1), (3, 1)))
+        self.assertEqual(distanceCalculator.DEFAULT_DISTANCE, table.getDistance((1, 1), (5, 1)))
+        self.assertEqual(distanceCalculator.DEFAULT_DISTANCE,
+                distanceCalculator.getDistanceOnGrid(table, (1, 1), (0, 0)))
+
+        with self.assertRaises(Exception):
+            table.getDistance((1, 1), (0, 0))
+
+    def test_lazy(self):
+        layout = getLayout('mediumCapture')
+        expected = distanceCalculator.computeDistances(layout)
+        positions = expected.getPositions()
+
+        distancer = distanceCalculator.Distancer(layout, lazy = True, maxRows = 2)
+        self.assertIsNone(distancer.getStats())
+
+        distancer.getMazeDistances()
+        self.assertEqual({'hits': 0, 'misses': 0, 'evictions': 0, 'rows': 0},
+                distancer.getStats())
+
+        source = positions[0]
+        for target in positions:
+            self.assertEqual(expected.getDistance(source, target),
+                    distancer.getDistance(source, target))
+
+        # The first query computed the row, the rest used it.
+        self.assertEqual({'hits': len(positions) - 1, 'misses': 1, 'evictions': 0, 'rows': 1},
+                distancer.getStats())
+
+        # Distances are symmetric, so the cached row answers queries to the source too.
+        self.assertEqual(expected.getDistance(positions[5], source),
+                distancer.getDistance(positions[5], source))
+        self.assertEqual(1, distancer.getStats()['misses'])
+
+        for other in positions[1:3]:
+            distancer.getDistance(other, positions[-1])
+
+        stats = distancer.getStats()
+        self.assertEqual(3, stats['misses'])
+        self.assertEqual(1, stats['evictions'])
+        self.assertEqual(2, stats['rows'])
+
+        # Between cells.
+        x, y = next((x, y) for (x, y) in positions if (x + 1, y) in expected)
+        eager = distanceCalculator.Distancer(layout)
+        eager.getMazeDistances()
+        self.assertEqual(eager.getDistance((x + 0.5, y), source),
+                distancer.getDistance((x + 0.5, y), source))
+
+    def test_shared_cache(self):
+        first = distanceCalculator.Distancer(getLayout('tinyCapture'))
+        first.getMazeDistances()
+
+        # A different layout object with the same walls.
+        second = distanceCalculator.Distancer(getLayout('tinyCapture'))
+        second.getMazeDistances()
+
+        self.assertIs(first._distances, second._distances)
+
+    def test_cache_eviction(self):
+        originalSize = distanceCalculator.MAX_CACHED_LAYOUTS
+        distanceCalculator.MAX_CACHED_LAYOUTS = 2
+
+        try:
+            layouts = [Layout(generateMaze(seed).split('\n')) for seed in range(3)]
+            for layout in layouts:
+                self.assertGreater(layout.getHeight(), 1)
+
+            distances = [distanceCalculator.getDistances(layout) for layout in layouts]
+
+            # The most recent layouts are still around, but the first was evicted.
+            self.assertIs(distances[2], distanceCalculator.getDistances(layouts[2]))
+            self.assertIs(distances[1], distanceCalculator.getDistances(layouts[1]))
+            self.assertIsNot(distances[0], distanceCalculator.getDistances(layouts[0]))
+        finally:
+            distanceCalculator.MAX_CACHED_LAYOUTS = originalSize
+
+    def test_disk_cache(self):
+        layout = getLayout('tinyCapture')
+        computed = distanceCalculator.getDistances(layout)
+
+        # Another process would only have the disk cache.
+        distanceCalculator.clearCache()
+        loaded = distanceCalculator.getDistances(layout)
+
+        self.assertIsNot(computed, loaded)
+        self.assertIsInstance(loaded.getMatrix(), numpy.memmap)
+        self.assertTrue(numpy.array_equal(computed.getMatrix(), loaded.getMatrix()))
+        self.assertEqual(computed.getPositions(), loaded.getPositions())
+
+        # Changing the cache version orphans old files.
+        distanceCalculator.CACHE_VERSION += 1
+        try:
+            self.assertIsNone(distanceCalculator.loadDistances(layout))
+        finally:
+            distanceCalculator.CACHE_VERSION -= 1
+
+    def test_disk_cache_corruption(self):
+        layout = getLayout('tinyCapture')
+        computed = distanceCalculator.computeDistances(layout)
+        distanceCalculator.saveDistances(layout, computed)
+
+        matrixPath = distanceCalculator._getCachePaths(layout)[0]
+
+        # Flip the last byte of the matrix.
+        with open(matrixPath, 'r+b') as file:
+            file.seek(-1, os.SEEK_END)
+            value = file.read(1)
+            file.seek(-1, os.SEEK_END)
+            file.write(bytes([value[0] ^ 0xFF]))
+
+        with self.assertLogs(level = 'WARNING'):
+            self.assertIsNone(distanceCalculator.loadDistances(layout))
+
+        # Corrupt files get recomputed and replaced.
+        with self.assertLogs(level = 'WARNING'):
+            distances = distanceCalculator.getDistances(layout)
+        self.assertTrue(numpy.array_equal(computed.getMatrix(), distances.getMatrix()))
+
+        distanceCalculator.clearCache()
+        distances = distanceCalculator.getDistances(layout)
+        self.assertIsInstance(distances.getMatrix(), numpy.memmap)
+
+        # Let go of the mapping before touching the file again.
+        del distances
+        distanceCalculator.clearCache()
+
+        # Truncated files.
+        with open(matrixPath, 'r+b') as file:
+            file.truncate(100)
+
+        with self.assertLogs(level = 'WARNING'):
+            self.assertIsNone(distanceCalculator.loadDistances(layout))
+
+if __name__ == '__main__':
+    unittest.main()
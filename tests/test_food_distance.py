@@ -0,0 +1,63 @@
+import random
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.foodDistance import FoodDistanceField
+from pacai.core.layout import getLayout
+from pacai.core.search import search
+from pacai.student.searchAgents import AnyFoodSearchProblem
+
+"""
+Test the nearest food distance field.
+"""
+class FoodDistanceFieldTest(unittest.TestCase):
+    def test_bfs(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        field = FoodDistanceField(state.getInitialLayout(), state.getFoodList())
+
+        for (x, y) in state.getWalls().asList(False):
+            problem = AnyFoodSearchProblem(state, start = (x, y))
+            self.assertEqual(len(search.bfs(problem)), field.getDistance(x, y))
+
+        self.assertIsNone(field.getDistance(0, 0))
+
+    def test_eat_food(self):
+        random.seed(7)
+
+        for name in ['mediumClassic', 'smallGrid', 'openSearch']:
+            layout = getLayout(name)
+            foodList = layout.food.asList()
+            random.shuffle(foodList)
+
+            field = FoodDistanceField(layout, foodList)
+            while (len(foodList) > 0):
+                field.eatFood(*foodList.pop())
+                self.assertEqual(FoodDistanceField(layout, foodList).getDistances(),
+                        field.getDistances())
+
+            self.assertIsNone(field.getDistance(*layout.agentPositions[0][1]))
+
+    def test_game_state(self):
+        random.seed(8)
+
+        state = PacmanGameState(getLayout('smallClassic'))
+        state.getFoodDistanceField()
+
+        for i in range(300):
+            if (state.isOver()):
+                break
+
+            agentIndex = i % state.getNumAgents()
+            state = state.generateSuccessor(agentIndex,
+                    random.choice(state.getLegalActions(agentIndex)))
+
+            # Only ask every so often, so several pellets pile up between updates.
+            if (i % 7 == 0):
+                expected = FoodDistanceField(state.getInitialLayout(), state.getFoodList())
+                self.assertEqual(expected.getDistances(),
+                        state.getFoodDistanceField().getDistances())
+
+        self.assertLess(state.getNumFood(), state.getInitialLayout().food.count())
+
+if __name__ == '__main__':
+    unittest.main()
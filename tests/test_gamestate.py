@@ -0,0 +1,272 @@
+import pickle
+import random
+import unittest
+
+from pacai.bin.capture import CaptureGameState
+from pacai.bin.pacman import PacmanGameState
+from pacai.core import zobrist
+from pacai.core.layout import getLayout
+
+"""
+Test game state bookkeeping.
+"""
+class GameStateTest(unittest.TestCase):
+    def test_hash_transpositions(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        ghost1 = state.getLegalActions(1)[0]
+        ghost2 = state.getLegalActions(2)[0]
+
+        first = state.generateSuccessor(1, ghost1).generateSuccessor(2, ghost2)
+        second = state.generateSuccessor(2, ghost2).generateSuccessor(1, ghost1)
+
+        self.assertEqual(first, second)
+        self.assertEqual(hash(first), hash(second))
+        self.assertNotEqual(hash(state), hash(first))
+
+    def test_hash_pickled(self):
+        # Keys do not depend on which copy of a table hands them out, or in what order.
+        table = zobrist.getTable(getLayout('testClassic'))
+        first, second = [pickle.loads(pickle.dumps(table)) for i in range(2)]
+
+        key = first.key('position', 0, (10, 1))
+        self.assertNotEqual(key, second.key('position', 0, (8, 1)))
+        self.assertEqual(key, second.key('position', 0, (10, 1)))
+        self.assertEqual(key, table.key('position', 0, (10.0, 1.0)))
+
+        state = PacmanGameState(getLayout('testClassic'))
+        data = pickle.dumps(state)
+
+        # Successors from separate unpickles hash the same exactly when they made the same move.
+        successors = []
+        for action in state.getLegalActions(0):
+            successors.append((action, pickle.loads(data).generateSuccessor(0, action)))
+            successors.append((action, pickle.loads(data).generateSuccessor(0, action)))
+
+        for (firstAction, first) in successors:
+            for (secondAction, second) in successors:
+                self.assertEqual(firstAction == secondAction, hash(first) == hash(second))
+
+        self.assertEqual(hash(state), hash(pickle.loads(data)))
+
+    def test_apply_undo_move(self):
+        random.seed(5)
+
+        for state in [PacmanGameState(getLayout('smallClassic')),
+                CaptureGameState(getLayout('tinyCapture'), 300)]:
+            # Follow along with normal successors.
+            # Don't generate successors from the state itself, so it keeps ownership of its food.
+            expected = state.generateSuccessor(0, state.getLegalActions(0)[0])
+            state.applyMove(0, state.getLegalActions(0)[0])
+
+            records = []
+            snapshots = []
+
+            for i in range(300):
+                if (state.isOver()):
+                    break
+
+                agentIndex = i % state.getNumAgents()
+                action = random.choice(state.getLegalActions(agentIndex))
+                expected = expected.generateSuccessor(agentIndex, action)
+
+                snapshots.append(_snapshot(state))
+                records.append(state.applyMove(agentIndex, action))
+
+                self.assertEqual(expected, state)
+                self.assertEqual(hash(expected), hash(state))
+                self._checkFoodLists(state)
+
+            self.assertTrue(len(records) > 10)
+
+            while (len(records) > 0):
+                state.undoMove(records.pop())
+                self.assertEqual(snapshots.pop(), _snapshot(state))
+                self._checkFoodLists(state)
+
+    def test_share_during_move(self):
+        # Successors and views taken between applyMove() and undoMove() keep their food,
+        # even after the state eats in place again.
+        state = PacmanGameState(getLayout('testClassic'))
+        record = state.applyMove(0, 'Stop')
+        child = state.generateSuccessor(1, state.getLegalActions(1)[0])
+        view = state.getFoodView()
+        state.undoMove(record)
+
+        state.applyMove(0, 'East')
+        state.applyMove(0, 'East')
+        self.assertEqual(7, state.getNumFood())
+        self.assertEqual(8, child.getNumFood())
+        self.assertEqual(8, len(child.getFoodList()))
+        self.assertTrue(child.hasFood(3, 1))
+        self.assertEqual(8, view.count())
+
+        # The same, when the food was eaten in place by the move being undone.
+        state = PacmanGameState(getLayout('testClassic'))
+        state.applyMove(0, 'East')
+        record = state.applyMove(0, 'East')
+        child = state.generateSuccessor(1, state.getLegalActions(1)[0])
+        view = state.getFoodView()
+        state.undoMove(record)
+
+        self.assertEqual(8, state.getNumFood())
+        self._checkFoodLists(state)
+        self.assertEqual(7, child.getNumFood())
+        self.assertFalse(child.hasFood(3, 1))
+        self.assertEqual(7, view.count())
+
+        state.applyMove(0, 'East')
+        self.assertEqual(7, state.getNumFood())
+        self.assertEqual(7, child.getNumFood())
+        self.assertEqual(7, view.count())
+
+    def test_capture_view_during_move(self):
+        random.seed(8)
+
+        state = CaptureGameState(getLayout('tinyCapture'), 1000)
+        record = state.applyMove(0, 'Stop')
+        redFood = state.getRedFood()
+        blueFood = state.getBlueFood()
+        expected = (redFood.copy(), blueFood.copy())
+        state.undoMove(record)
+
+        # Eat (in place) until some food is gone.
+        numFood = state.getNumFood()
+        for i in range(1000):
+            if (state.isOver() or state.getNumFood() < numFood):
+                break
+
+            agentIndex = i % state.getNumAgents()
+            state.applyMove(agentIndex, random.choice(state.getLegalActions(agentIndex)))
+
+        self.assertLess(state.getNumFood(), numFood)
+        self.assertEqual(expected, (redFood, blueFood))
+
+    def test_shared_agent_states(self):
+        state = PacmanGameState(getLayout('mediumClassic'))
+        start = state.getPacmanPosition()
+
+        successor = state.generateSuccessor(0, state.getLegalActions(0)[0])
+
+        # Only the agent that moved gets a new state.
+        self.assertEqual(start, state.getPacmanPosition())
+        self.assertNotEqual(start, successor.getPacmanPosition())
+        self.assertIsNot(state.getAgentState(0), successor.getAgentState(0))
+        for index in state.getGhostIndexes():
+            self.assertIs(state.getAgentState(index), successor.getAgentState(index))
+
+        # Writes through either state must not leak into the other.
+        successor.editAgentState(1).setScaredTimer(10)
+        state.editAgentState(2).setScaredTimer(20)
+        self.assertEqual(0, state.getAgentState(1).getScaredTimer())
+        self.assertEqual(10, successor.getAgentState(1).getScaredTimer())
+        self.assertEqual(20, state.getAgentState(2).getScaredTimer())
+        self.assertEqual(0, successor.getAgentState(2).getScaredTimer())
+
+    def test_food_lists(self):
+        random.seed(6)
+
+        for state in [PacmanGameState(getLayout('smallClassic')),
+                CaptureGameState(getLayout('tinyCapture'), 1000)]:
+            self._checkFoodLists(state)
+
+            for i in range(1000):
+                if (state.isOver()):
+                    break
+
+                agentIndex = i % state.getNumAgents()
+                action = random.choice(state.getLegalActions(agentIndex))
+                successor = state.generateSuccessor(agentIndex, action)
+
+                # Eating in the successor must not change the parent's lists.
+                before = list(state.getFoodList())
+                self._checkFoodLists(successor)
+                self.assertEqual(before, state.getFoodList())
+
+                state = successor
+
+            self.assertLess(state.getNumFood(), state.getInitialLayout().food.count())
+
+    def test_hash_random_play(self):
+        random.seed(4)
+
+        for state in [PacmanGameState(getLayout('smallClassic')),
+                CaptureGameState(getLayout('tinyCapture'), 200)]:
+            # Group states by their contents, equal states must always have equal hashes.
+            hashes = {}
+
+            for i in range(300):
+                if (state.isOver()):
+                    break
+
+                agentIndex = i % state.getNumAgents()
+                action = random.choice(state.getLegalActions(agentIndex))
+                state = state.generateSuccessor(agentIndex, action)
+
+                key = (state.getScore(), state.isOver(), tuple(state.getCapsules()),
+                        tuple(state.getFood().asList()),
+                        tuple((agentState.getPosition(), agentState.getDirection(),
+                            agentState.isPacman(), agentState.getScaredTimer())
+                            for agentState in state.getAgentStates()))
+                hashes.setdefault(key, set()).add(hash(state))
+
+            for values in hashes.values():
+                self.assertEqual(1, len(values))
+
+    def test_generate_all_successors(self):
+        random.seed(7)
+
+        for state in [PacmanGameState(getLayout('smallClassic')),
+                CaptureGameState(getLayout('tinyCapture'), 300)]:
+            for i in range(300):
+                if (state.isOver()):
+                    break
+
+                agentIndex = i % state.getNumAgents()
+                successors = state.generateAllSuccessors(agentIndex)
+                lazy = state.generateAllSuccessors(agentIndex, lazy = True)
+
+                self.assertEqual(state.getLegalActions(agentIndex),
+                        [action for (action, successor) in successors])
+
+                # Both forms match generating each successor on its own.
+                for ((action, successor), (lazyAction, lazySuccessor)) in zip(successors, lazy):
+                    expected = state.generateSuccessor(agentIndex, action)
+                    self.assertEqual(action, lazyAction)
+
+                    for actual in [successor, lazySuccessor]:
+                        self.assertEqual(_snapshot(expected), _snapshot(actual))
+                        self.assertEqual(hash(expected), hash(actual))
+                        self._checkFoodLists(actual)
+
+                state = random.choice(successors)[1]
+
+        state = PacmanGameState(getLayout('smallClassic'))
+        state.endGame(False)
+        self.assertRaises(RuntimeError, state.generateAllSuccessors, 0)
+
+    def _checkFoodLists(self, state):
+        self.assertEqual(state.getFood().asList(), state.getFoodList())
+        self.assertEqual(state.getFood().count(), state.getNumFood())
+
+        if (isinstance(state, CaptureGameState)):
+            self.assertEqual(state.getRedFood().asList(), state.getRedFoodList())
+            self.assertEqual(state.getBlueFood().asList(), state.getBlueFoodList())
+
+def _snapshot(state):
+    agents = tuple((agentState.getPosition(), agentState.getDirection(),
+        agentState.isPacman(), agentState.getScaredTimer())
+        for agentState in state.getAgentStates())
+
+    snapshot = [hash(state), state.getScore(), state.isOver(), state.isWin(),
+            state.getLastAgentMoved(), state.getLastFoodEaten(), state.getLastCapsuleEaten(),
+            tuple(state.getCapsules()), tuple(state.getFood().asList()), agents]
+
+    if (isinstance(state, CaptureGameState)):
+        snapshot += [state.getTimeleft(), tuple(state.getRedFood().asList()),
+                tuple(state.getBlueFood().asList()),
+                tuple(state.getRedCapsules()), tuple(state.getBlueCapsules())]
+
+    return snapshot
+
+if __name__ == '__main__':
+    unittest.main()
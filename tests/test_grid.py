@@ -0,0 +1,144 @@
+import pickle
+import unittest
+
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.grid import Grid
+from pacai.core.grid import GridView
+from pacai.core.layout import getLayout
+
+"""
+Test the packed boolean grid.
+"""
+class GridTest(unittest.TestCase):
+    def test_access(self):
+        grid = Grid(3, 4)
+        self.assertEqual(0, grid.count())
+        self.assertEqual(12, grid.count(False))
+
+        grid[1] = [False, False, True, False]
+        grid.set(2, 3, True)
+
+        self.assertTrue(grid[1][2])
+        self.assertTrue(grid.get(2, 3))
+        self.assertFalse(grid[0][0])
+        self.assertEqual(4, len(grid[0]))
+        self.assertEqual(2, grid.count())
+        self.assertEqual([(1, 2), (2, 3)], grid.asList())
+        self.assertEqual(10, len(grid.asList(False)))
+
+        with self.assertRaises(IndexError):
+            grid[0][4]
+
+    def test_copy(self):
+        grid = Grid(3, 4)
+        grid.set(1, 1, True)
+
+        other = grid.copy()
+        self.assertEqual(grid, other)
+        self.assertEqual(hash(grid), hash(other))
+
+        other.set(1, 1, False)
+        self.assertTrue(grid[1][1])
+        self.assertNotEqual(grid, other)
+        self.assertNotEqual(hash(grid), hash(other))
+
+        other.set(1, 1, True)
+        self.assertEqual(grid, other)
+        self.assertEqual(hash(grid), hash(other))
+
+    def test_hash(self):
+        # The hash is the grid read as a binary number, bit (x * height + y) for cell (x, y).
+        grid = Grid(2, 2)
+        grid.set(0, 1, True)
+        grid.set(1, 0, True)
+        self.assertEqual(hash(0b0110), hash(grid))
+
+        grid.set(1, 1, True)
+        self.assertEqual(hash(0b1110), hash(grid))
+
+    def test_read_only_columns(self):
+        grid = Grid(3, 4)
+        column = grid[1]
+        self.assertEqual(hash(Grid(3, 4)), hash(grid))
+
+        # Columns can not be written to (which would leave a stale cached hash).
+        with self.assertRaises(TypeError):
+            column[2] = True
+
+        grid[1] = [False, False, True, False]
+        grid.set(2, 3, True)
+        self.assertTrue(grid[1][2])
+        self.assertEqual([(1, 2), (2, 3)], grid.asList())
+        self.assertEqual(hash(0b100001000000), hash(grid))
+
+    def test_shallow_copy(self):
+        grid = Grid(3, 4)
+        other = grid.shallowCopy()
+
+        # Writes through either grid must keep equal grids hashing equally.
+        other.set(1, 1, True)
+        self.assertFalse(grid.get(1, 1))
+        self.assertNotEqual(grid, other)
+
+        grid.set(1, 1, True)
+        self.assertEqual(grid, other)
+        self.assertEqual(hash(grid), hash(other))
+
+    def test_pickle(self):
+        grid = Grid(3, 4, initialValue = True)
+        grid.set(2, 0, False)
+
+        other = pickle.loads(pickle.dumps(grid))
+        self.assertEqual(grid, other)
+        self.assertFalse(other[2][0])
+        self.assertEqual(str(grid), str(other))
+
+    def test_view(self):
+        grid = Grid(3, 4)
+        grid.set(1, 2, True)
+
+        view = GridView(grid)
+        self.assertEqual(grid, view)
+        self.assertEqual(hash(grid), hash(view))
+        self.assertTrue(view[1][2])
+        self.assertTrue(view.get(1, 2))
+        self.assertEqual([(1, 2)], view.asList())
+        self.assertEqual(str(grid), str(view))
+
+        with self.assertRaises(TypeError):
+            view.set(0, 0, True)
+
+        with self.assertRaises(TypeError):
+            view[0] = [True] * 4
+
+        with self.assertRaises(TypeError):
+            view[0][0] = True
+
+        self.assertIsInstance(view.shallowCopy(), GridView)
+
+        # Copies are regular grids.
+        other = view.copy()
+        self.assertIs(Grid, type(other))
+        other.set(0, 0, True)
+        self.assertFalse(grid.get(0, 0))
+
+    def test_state_food_view(self):
+        state = PacmanGameState(getLayout('smallClassic'))
+        view = state.getFoodView()
+        self.assertEqual(state.getFood(), view)
+
+        # Eating after handing out a view must not change the view (even in place).
+        expected = view.copy()
+        for i in range(50):
+            if (state.isOver()):
+                break
+
+            state.applyMove(0, state.getLegalActions(0)[-1])
+            if (state.getNumFood() < expected.count()):
+                break
+
+        self.assertLess(state.getNumFood(), expected.count())
+        self.assertEqual(expected, view)
+
+if __name__ == '__main__':
+    unittest.main()
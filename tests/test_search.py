@@ -0,0 +1,292 @@
+import tracemalloc
+import unittest
+
+from pacai.agents.search.base import SearchAgent
+from pacai.bin import pacman
+from pacai.bin.pacman import PacmanGameState
+from pacai.core.layout import Layout
+from pacai.core.layout import getLayout
+from pacai.core.search import engine
+from pacai.core.search import food
+from pacai.core.search import heuristic
+from pacai.core.search import junction
+from pacai.core.search import tour
+from pacai.core.search.position import PositionSearchProblem
+from pacai.student.search import aStarSearch
+from pacai.student.search import uniformCostSearch
+
+"""
+Test search problems.
+"""
+class JunctionTest(unittest.TestCase):
+    def test_graph(self):
+        graph = junction.getGraph(getLayout('tinyMaze'))
+        self.assertEqual([(1, 1), (2, 2)], sorted(graph.getNodes()))
+
+        # Every edge walks a path of open cells that ends on a node.
+        layout = getLayout('bigMaze')
+        graph = junction.JunctionGraph(layout.walls)
+        for node in graph.getNodes():
+            for (end, actions, cells) in graph.getEdges(node):
+                self.assertTrue(graph.isNode(end))
+                self.assertEqual(end, cells[-1])
+                self.assertEqual(len(actions), len(cells))
+                for (x, y) in cells:
+                    self.assertFalse(layout.walls[x][y])
+
+    def test_loop(self):
+        # A ring of corridor cells with no junctions at all.
+        layout = Layout([
+            '%%%%%',
+            '%P  %',
+            '% % %',
+            '%   %',
+            '%%%%%',
+        ])
+
+        graph = junction.JunctionGraph(layout.walls)
+        self.assertEqual(1, len(graph.getNodes()))
+
+        state = PacmanGameState(layout)
+        problem = junction.JunctionPositionSearchProblem(state, goal = (3, 1))
+        actions = problem.expandActions(uniformCostSearch(problem))
+        self.assertEqual(4, problem.actionsCost(actions))
+
+    def test_same_cost(self):
+        for name in ['tinyMaze', 'mediumMaze', 'bigMaze']:
+            state = PacmanGameState(getLayout(name))
+            positions = state.getWalls().asList(False)
+
+            # The default goal, and some goals in the middle of corridors.
+            for goal in [(1, 1)] + positions[::37]:
+                expected = PositionSearchProblem(state, goal = goal)
+                expectedCost = expected.actionsCost(uniformCostSearch(expected))
+
+                problem = junction.JunctionPositionSearchProblem(state, goal = goal)
+                actions = problem.expandActions(uniformCostSearch(problem))
+
+                self.assertEqual(expectedCost, problem.actionsCost(actions))
+                self.assertLessEqual(problem.getExpandedCount(), expected.getExpandedCount())
+
+                # Heuristics can read the wrapped problem's goal.
+                problem = junction.JunctionPositionSearchProblem(state, goal = goal)
+                actions = problem.expandActions(aStarSearch(problem, heuristic.manhattan))
+                self.assertEqual(expectedCost, problem.actionsCost(actions))
+
+    def test_search_agent(self):
+        pacman.main(['--null-graphics', '--layout', 'mediumMaze', '--pacman', 'SearchAgent',
+            '--agent-args',
+            'fn=pacai.student.search.uniformCostSearch,'
+                + 'prob=pacai.core.search.junction.JunctionPositionSearchProblem'])
+
+        pacman.main(['--null-graphics', '--layout', 'mediumMaze', '--pacman', 'SearchAgent',
+            '--agent-args',
+            'fn=pacai.student.search.aStarSearch,'
+                + 'heuristic=pacai.core.search.heuristic.manhattan,'
+                + 'prob=pacai.core.search.junction.JunctionPositionSearchProblem'])
+
+class EngineTest(unittest.TestCase):
+    def test_same_cost(self):
+        for name in ['tinyMaze', 'mediumMaze', 'bigMaze']:
+            state = PacmanGameState(getLayout(name))
+
+            expected = PositionSearchProblem(state)
+            expectedCost = expected.actionsCost(uniformCostSearch(expected))
+
+            searches = [
+                engine.bfs,
+                engine.ucs,
+                lambda problem: engine.astar(problem, heuristic.manhattan),
+            ]
+
+            for search in searches:
+                problem = PositionSearchProblem(state)
+                actions = search(problem)
+                self.assertEqual(expectedCost, problem.actionsCost(actions))
+                self.assertEqual(expectedCost, problem.getSearchStats().pathCost)
+                self.assertEqual(len(actions), problem.getSearchStats().pathLength)
+
+            problem = PositionSearchProblem(state)
+            actions = engine.wastar(problem, heuristic.manhattan, weight = 2.0)
+            self.assertLessEqual(problem.actionsCost(actions), 2 * expectedCost)
+
+            problem = PositionSearchProblem(state)
+            actions = engine.greedy(problem, heuristic.manhattan)
+            self.assertGreaterEqual(problem.actionsCost(actions), expectedCost)
+
+            # Expanding an admissible heuristic never takes more nodes than no heuristic.
+            ucsProblem = PositionSearchProblem(state)
+            engine.ucs(ucsProblem)
+            astarProblem = PositionSearchProblem(state)
+            engine.astar(astarProblem, heuristic.manhattan)
+            self.assertLessEqual(astarProblem.getSearchStats().expanded,
+                    ucsProblem.getSearchStats().expanded)
+
+    def test_stats(self):
+        state = PacmanGameState(getLayout('mediumMaze'))
+
+        problem = PositionSearchProblem(state)
+        engine.ucs(problem)
+        stats = problem.getSearchStats()
+
+        self.assertEqual(problem.getExpandedCount(), stats.expanded)
+        self.assertGreater(stats.peakFrontier, 0)
+        self.assertEqual(stats.generated + 1, stats.numNodes)
+        self.assertIsNone(stats.peakMemory)
+        self.assertGreaterEqual(stats.getNodesPerSecond(), 0)
+
+        problem = PositionSearchProblem(state)
+        engine.bfs(problem, trackMemory = True)
+        peakMemory = problem.getSearchStats().peakMemory
+        self.assertGreater(peakMemory, 0)
+
+        # A peak from before the search (while something else is tracing) is not counted.
+        tracemalloc.start()
+        try:
+            garbage = bytearray(100 * peakMemory)
+            del garbage
+
+            problem = PositionSearchProblem(state)
+            engine.bfs(problem, trackMemory = True)
+            self.assertTrue(tracemalloc.is_tracing())
+        finally:
+            tracemalloc.stop()
+
+        if (hasattr(tracemalloc, 'reset_peak')):
+            self.assertLess(problem.getSearchStats().peakMemory, 10 * peakMemory)
+
+    def test_no_path(self):
+        layout = Layout([
+            '%%%%%',
+            '%P%.%',
+            '%%%%%',
+        ])
+
+        state = PacmanGameState(layout)
+        for search in [engine.bfs, engine.ucs, engine.astar]:
+            problem = PositionSearchProblem(state, goal = (3, 1))
+            self.assertIsNone(search(problem))
+
+    def test_search_agent(self):
+        pacman.main(['--null-graphics', '--layout', 'mediumMaze', '--pacman', 'SearchAgent',
+            '--agent-args', 'fn=astar,heuristic=pacai.core.search.heuristic.manhattan'])
+
+        pacman.main(['--null-graphics', '--layout', 'mediumMaze', '--pacman', 'SearchAgent',
+            '--agent-args',
+            'fn=pacai.core.search.engine.bfs,'
+                + 'prob=pacai.core.search.junction.JunctionPositionSearchProblem'])
+
+        pacman.main(['--null-graphics', '--layout', 'mediumMaze', '--pacman', 'SearchAgent',
+            '--agent-args',
+            'fn=wastar,heuristic=pacai.core.search.heuristic.manhattan,'
+                + 'weight=1.5,trackMemory=true'])
+
+        agent = SearchAgent(0, fn = 'wastar', weight = '1.5', trackMemory = 'true')
+        problem = PositionSearchProblem(PacmanGameState(getLayout('mediumMaze')))
+        agent.searchFunction(problem)
+        self.assertIn('w = 1.5', problem.getSearchStats().algorithm)
+        self.assertIsNotNone(problem.getSearchStats().peakMemory)
+
+        # Options have to be taken by the search.
+        with self.assertRaises(ValueError):
+            SearchAgent(0, fn = 'bfs', weight = '1.5')
+
+        # Only searches can be picked by a bare name, not anything else in the engine module.
+        for name in ['SearchStats', 'time', 'bestFirstSearch', 'noSuchSearch']:
+            with self.assertRaises(ValueError):
+                SearchAgent(0, fn = name)
+
+class BitmaskFoodTest(unittest.TestCase):
+    def test_same_cost(self):
+        for name in ['testSearch', 'tinySearch']:
+            state = PacmanGameState(getLayout(name))
+
+            expected = food.FoodSearchProblem(state)
+            expectedCost = expected.actionsCost(engine.ucs(expected))
+
+            for search in [engine.ucs, lambda problem: engine.astar(problem, heuristic.numFood),
+                    lambda problem: engine.astar(problem, heuristic.farthestFood)]:
+                problem = food.BitmaskFoodSearchProblem(state)
+                self.assertEqual(expectedCost, problem.actionsCost(search(problem)))
+
+    def test_state(self):
+        state = PacmanGameState(getLayout('tinySearch'))
+        problem = food.BitmaskFoodSearchProblem(state)
+
+        position, mask = problem.startingState()
+        self.assertEqual(state.getFoodList(), problem.getFoodPositions(mask))
+        self.assertEqual(state.getNumFood(), problem.getNumFood(mask))
+
+        # Stepping on food clears its bit (and only its bit).
+        for (successor, action, cost) in problem.successorStates(problem.startingState()):
+            nextPosition, nextMask = successor
+            expected = [position for position in state.getFoodList() if position != nextPosition]
+            self.assertEqual(expected, problem.getFoodPositions(nextMask))
+
+    def test_search_agent(self):
+        pacman.main(['--null-graphics', '--layout', 'trickySearch', '--pacman', 'SearchAgent',
+            '--agent-args', 'fn=astar,prob=pacai.core.search.food.BitmaskFoodSearchProblem,'
+                + 'heuristic=pacai.core.search.heuristic.farthestFood'])
+
+class TourTest(unittest.TestCase):
+    def test_exact(self):
+        for name in ['testSearch', 'tinySearch', 'trickySearch']:
+            state = PacmanGameState(getLayout(name))
+
+            problem = food.BitmaskFoodSearchProblem(state)
+            expectedCost = problem.actionsCost(engine.astar(problem, heuristic.farthestFood))
+
+            foodTour = tour.solveTour(state.getInitialLayout(), state.getPacmanPosition(),
+                    state.getFoodList())
+            self.assertTrue(foodTour.isExact)
+            self.assertEqual(expectedCost, foodTour.cost)
+            self._checkTour(state, foodTour)
+
+    def test_approximate(self):
+        state = PacmanGameState(getLayout('trickySearch'))
+        layout = state.getInitialLayout()
+        start = state.getPacmanPosition()
+
+        exact = tour.solveTour(layout, start, state.getFoodList())
+        approximate = tour.solveTour(layout, start, state.getFoodList(), maxExactTargets = 4)
+
+        self.assertFalse(approximate.isExact)
+        self.assertLessEqual(exact.cost, approximate.cost)
+        self._checkTour(state, approximate)
+
+        # 2-opt never makes a tour longer.
+        table = tour.distanceCalculator.getDistances(layout)
+        indexes = table.getIndexes([start] + state.getFoodList())
+        matrix = table.getMatrix()[indexes][:, indexes].astype(int).tolist()
+
+        order, cost = tour.nearestNeighbor(matrix)
+        self.assertGreaterEqual(cost, tour.twoOpt(matrix, order)[1])
+
+        # Held-Karp's tables grow too fast to allow any more exact targets.
+        with self.assertRaises(ValueError):
+            tour.solveTour(layout, start, state.getFoodList(),
+                    maxExactTargets = tour.MAX_EXACT_TARGETS + 1)
+
+    def test_unreachable(self):
+        layout = Layout([
+            '%%%%%',
+            '%P%.%',
+            '%%%%%',
+        ])
+
+        self.assertIsNone(tour.solveTour(layout, (1, 1), [(3, 1)]))
+        self.assertEqual([], tour.solveTour(layout, (1, 1), []).actions)
+
+    def test_agent(self):
+        pacman.main(['--null-graphics', '--layout', 'trickySearch',
+            '--pacman', 'TourFoodSearchAgent'])
+
+    def _checkTour(self, state, foodTour):
+        for action in foodTour.actions:
+            state = state.generateSuccessor(0, action)
+
+        self.assertEqual(0, state.getNumFood())
+        self.assertEqual(foodTour.cost, len(foodTour.actions))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,3 +1,4 @@
+import random
 import unittest
 
 from pacai.util import priorityQueue
@@ -52,5 +53,78 @@ class UtilContainersTest(unittest.TestCase):
         for val, pri in reversed(val_list):
             self.assertEqual(val, testPriorityQueue.pop())
 
+    def test_priority_queue_ties(self):
+        # Items without an ordering, ties must be broken by insertion order.
+        items = [object() for i in range(5)]
+
+        for testPriorityQueue in [priorityQueue.PriorityQueue(),
+                priorityQueue.IndexedPriorityQueue(), priorityQueue.BucketQueue()]:
+            for item in items:
+                testPriorityQueue.push(item, 1)
+            testPriorityQueue.push('first', 0)
+
+            self.assertEqual('first', testPriorityQueue.pop())
+            for item in items:
+                self.assertIs(item, testPriorityQueue.pop())
+
+            self.assertTrue(testPriorityQueue.isEmpty())
+
+    def test_indexed_priority_queue(self):
+        random.seed(3)
+
+        testPriorityQueue = priorityQueue.IndexedPriorityQueue()
+        priorities = {}
+
+        for i in range(200):
+            item = random.randrange(100)
+            priority = random.randrange(1000)
+
+            testPriorityQueue.push(item, priority)
+            priorities[item] = min(priority, priorities.get(item, priority))
+
+            if (i % 5 == 0):
+                item = random.choice(list(priorities))
+                priorities[item] -= 10
+                testPriorityQueue.decreaseKey(item, priorities[item])
+
+        self.assertEqual(len(priorities), len(testPriorityQueue))
+        self.assertIn(item, testPriorityQueue)
+        self.assertEqual(priorities[item], testPriorityQueue.getPriority(item))
+
+        with self.assertRaises(ValueError):
+            testPriorityQueue.decreaseKey(item, priorities[item] + 1)
+
+        with self.assertRaises(KeyError):
+            testPriorityQueue.decreaseKey(1000, 0)
+
+        popped = []
+        while (not testPriorityQueue.isEmpty()):
+            popped.append(testPriorityQueue.pop())
+
+        self.assertEqual(sorted(priorities, key = lambda item: priorities[item]),
+                sorted(popped, key = lambda item: priorities[item]))
+        self.assertEqual(sorted(priorities.values()), [priorities[item] for item in popped])
+
+    def test_bucket_queue(self):
+        testPriorityQueue = priorityQueue.BucketQueue()
+
+        for (item, priority) in [('c', 5), ('a', 2), ('b', 3), ('d', 5), ('z', 0)]:
+            testPriorityQueue.push(item, priority)
+
+        self.assertEqual(5, len(testPriorityQueue))
+        self.assertEqual('z', testPriorityQueue.pop())
+        self.assertEqual('a', testPriorityQueue.pop())
+
+        # Pushing below the last popped priority still works.
+        testPriorityQueue.push('y', 1)
+        self.assertEqual(['y', 'b', 'c', 'd'],
+                [testPriorityQueue.pop() for i in range(len(testPriorityQueue))])
+
+        with self.assertRaises(ValueError):
+            testPriorityQueue.push('x', 1.5)
+
+        with self.assertRaises(IndexError):
+            testPriorityQueue.pop()
+
 if __name__ == '__main__':
     unittest.main()